@@ -0,0 +1,108 @@
+"""
+Batched counterparts of `math_utils`, operating on arrays of vectors with NumPy.
+
+Vectors are the last axis of the arrays, (N,2) for 2D and (N,3) for 3D, any other leading
+dimensions are broadcast. Every function does its floating point operations in the same order
+as its `math_utils` counterpart, so results are bit for bit the same as the scalar version.
+"""
+import numpy as np
+
+
+def dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Dot products of 3D vectors, see `math_utils.Vec3.dot`.
+    """
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1] + a[..., 2] * b[..., 2]
+
+
+def cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Cross products of 3D vectors, see `math_utils.Vec3.cross`.
+    """
+    ax, ay, az = a[..., 0], a[..., 1], a[..., 2]
+    bx, by, bz = b[..., 0], b[..., 1], b[..., 2]
+    return np.stack([ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx], axis=-1)
+
+
+def magnitude(a: np.ndarray) -> np.ndarray:
+    """
+    Lengths of 3D vectors, see `math_utils.Vec3.magnitude`.
+    """
+    x, y, z = a[..., 0], a[..., 1], a[..., 2]
+    return np.sqrt(x * x + y * y + z * z)
+
+
+def normalize(a: np.ndarray) -> np.ndarray:
+    """
+    Unitary 3D vectors, see `math_utils.Vec3.normalized`. Null vectors become NaN, without
+    warnings.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return a / magnitude(a)[..., np.newaxis]
+
+
+def triangle_areas(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """
+    Twice the oriented areas of triangles (p0, p1, p2), only x and y are used, see
+    `math_utils.Vec3.triangle_area`.
+    """
+    return (p1[..., 0] - p0[..., 0]) * (p2[..., 1] - p0[..., 1]) - (p1[..., 1] - p0[..., 1]) * (
+        p2[..., 0] - p0[..., 0]
+    )
+
+
+def is_counterclockwise(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """
+    See `math_utils.Vec3.is_counterclockwise`.
+    """
+    return triangle_areas(p0, p1, p2) > 0
+
+
+def barycentric_denominators(v0: np.ndarray, v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """
+    Denominators of the barycentric weights of triangles (v0, v1, v2), which are 0 for triangles
+    without area.
+    """
+    return (v1[..., 1] - v2[..., 1]) * (v0[..., 0] - v2[..., 0]) + (v2[..., 0] - v1[..., 0]) * (
+        v0[..., 1] - v2[..., 1]
+    )
+
+
+def barycentric_weights(p: np.ndarray, v0: np.ndarray, v1: np.ndarray, v2: np.ndarray):
+    """
+    Barycentric weights of points `p` in triangles (v0, v1, v2), see
+    `math_utils.Vec2.obtain_barycentric_weights`. Points and triangles are broadcast against each
+    other, so many points can be tested against one triangle or against one triangle each.
+
+    :param p:
+        (...,2) points, or a tuple (x, y) of coordinates broadcast against each other. The latter
+        avoids creating a full array for grids of points (x of shape (1,W), y of shape (H,1)),
+        only the weights themselves have the shape of the grid.
+    :return:
+        A tuple (w1, w2, w3) of arrays, the weights are -1 for triangles without area.
+    """
+    px, py = p if isinstance(p, tuple) else (p[..., 0], p[..., 1])
+    v0x, v0y = v0[..., 0], v0[..., 1]
+    v1x, v1y = v1[..., 0], v1[..., 1]
+    v2x, v2y = v2[..., 0], v2[..., 1]
+    denominator = barycentric_denominators(v0, v1, v2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w1 = ((v1y - v2y) * (px - v2x) + (v2x - v1x) * (py - v2y)) / denominator
+        w2 = ((v2y - v0y) * (px - v2x) + (v0x - v2x) * (py - v2y)) / denominator
+    w3 = 1 - w1 - w2
+    if np.any(denominator == 0):
+        degenerated = np.broadcast_to(denominator == 0, w1.shape)
+        w1, w2, w3 = (np.where(degenerated, -1.0, w) for w in (w1, w2, w3))
+    return w1, w2, w3
+
+
+def apply_weights(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Interpolates per triangle vertex `values` (N,3) or (N,3,C) with `weights` (N,3), see
+    `math_utils.apply_weights`.
+    """
+    if values.ndim == weights.ndim + 1:
+        weights = weights[..., np.newaxis]
+    return (
+        values[:, 0] * weights[:, 0] + values[:, 1] * weights[:, 1] + values[:, 2] * weights[:, 2]
+    )
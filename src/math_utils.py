@@ -6,8 +6,14 @@ class Vec2:
     """
     I know, you're reading this and thinking "WTF? Why is he not using numpy for this?", it's
     because I want to refresh my basic math skills.
+
+    Vectors use `__slots__`, so they don't carry a `__dict__` and are cheaper to create, the
+    renderer creates millions of them per frame. Methods returning a vector allocate a new one,
+    the in-place variants (`iadd`, `isub`, `normalize_inplace`) modify and return `self`.
     """
 
+    __slots__ = ("x", "y")
+
     def __init__(self, x=0.0, y=0.0):
         self.x = x
         self.y = y
@@ -26,6 +32,16 @@ class Vec2:
     def sub(self, other):
         return Vec2(self.x - other.x, self.y - other.y)
 
+    def iadd(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def isub(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
     def dot(self, other):
         return self.x * other.x + self.y * other.y
 
@@ -36,6 +52,12 @@ class Vec2:
         mag = self.magnitude()
         return Vec2(self.x / mag, self.y / mag)
 
+    def normalize_inplace(self):
+        mag = self.magnitude()
+        self.x /= mag
+        self.y /= mag
+        return self
+
     def angle_to(self, other):
         """
         Returns the radian angles to other Vec2
@@ -62,6 +84,12 @@ class Vec2:
 
 
 class Vec3:
+    """
+    See `Vec2`.
+    """
+
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x=0.0, y=0.0, z=0.0):
         self.x = x
         self.y = y
@@ -84,6 +112,18 @@ class Vec3:
     def sub(self, other):
         return Vec3(self.x - other.x, self.y - other.y, self.z - other.z)
 
+    def iadd(self, other):
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def isub(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        self.z -= other.z
+        return self
+
     def dot(self, other):
         return self.x * other.x + self.y * other.y + self.z * other.z
 
@@ -101,6 +141,13 @@ class Vec3:
         mag = self.magnitude()
         return Vec3(self.x / mag, self.y / mag, self.z / mag)
 
+    def normalize_inplace(self):
+        mag = self.magnitude()
+        self.x /= mag
+        self.y /= mag
+        self.z /= mag
+        return self
+
     def angle_to(self, other):
         """
         Returns the radian angles to other Vec2
@@ -0,0 +1,137 @@
+"""
+Micro-benchmarks of the `math_utils` vectors and of their cost in the "python" backend.
+
+Reports the memory used by each vector, the time of the most common operations, how many vectors
+a frame of the scalar renderer allocates and the time of the frame. Run it on different versions
+of `math_utils` to compare them.
+
+Usage:
+    python -m tiny_renderer._benchmarks.bench_math_utils [--faces 2000] [--resolution 400]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import contextmanager
+from pathlib import Path
+
+from math_utils import Vec2, Vec3
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+
+OPERATIONS = {
+    "Vec3()": "Vec3(1.0, 2.0, 3.0)",
+    "add": "a.add(b)",
+    "iadd": "a.iadd(b)",
+    "cross": "a.cross(b)",
+    "normalized": "a.normalized()",
+    "normalize_inplace": "a.normalize_inplace()",
+    "distance": "a.distance(b)",
+}
+
+
+def instance_size(vector) -> int:
+    """
+    Bytes used by `vector`, including its `__dict__` if it has one.
+    """
+    size = sys.getsizeof(vector)
+    if hasattr(vector, "__dict__"):
+        size += sys.getsizeof(vector.__dict__)
+    return size
+
+
+@contextmanager
+def count_vectors():
+    """
+    Counts the vectors created inside the `with` block, yields a dict updated with the counts.
+    """
+    counts = {"Vec2": 0, "Vec3": 0}
+    originals = {cls: cls.__init__ for cls in (Vec2, Vec3)}
+
+    def counting_init(cls):
+        original = originals[cls]
+
+        def __init__(self, *args, **kwargs):
+            counts[cls.__name__] += 1
+            original(self, *args, **kwargs)
+
+        return __init__
+
+    for cls in originals:
+        cls.__init__ = counting_init(cls)
+    try:
+        yield counts
+    finally:
+        for cls, original in originals.items():
+            cls.__init__ = original
+
+
+def bench_operations(number: int) -> dict:
+    """
+    Returns the time, in nanoseconds, of each one of `OPERATIONS`.
+    """
+    namespace = {"Vec3": Vec3}
+    setup = "a = Vec3(1.0, 2.0, 3.0); b = Vec3(0.5, 0.25, 0.125)"
+    return {
+        name: min(timeit.repeat(statement, setup, number=number, repeat=3, globals=namespace))
+        / number
+        * 1e9
+        for name, statement in OPERATIONS.items()
+    }
+
+
+def bench_frame(num_faces: int, resolution: int, repeat: int) -> dict:
+    """
+    Renders a synthetic sphere with the "python" backend, returns the number of vectors created
+    by a frame and the time of the fastest frame.
+    """
+    render_mode, light_mode = RenderingMode.Texturized, LightingMode.Smooth
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_filename = Path(tmp_dir) / "sphere.obj"
+        texture_filename = Path(tmp_dir) / "texture.png"
+        write_sphere_obj(model_filename, num_faces)
+        write_texture(texture_filename)
+        renderer = TinyRenderer(bind_texture=False, backend="python")
+        renderer.setup_model(model_filename, texture_filename)
+    renderer.set_resolution(resolution, resolution)
+
+    with count_vectors() as counts:
+        renderer.render(render_mode, light_mode)
+
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        renderer.render(render_mode, light_mode)
+        timings.append(time.perf_counter() - t)
+
+    vectors = counts["Vec2"] + counts["Vec3"]
+    bytes_per_vector = instance_size(Vec3(0.0, 0.0, 0.0))
+    return {
+        "vectors_per_frame": vectors,
+        "vector_megabytes_per_frame": vectors * bytes_per_vector / 1e6,
+        "seconds_per_frame": min(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--faces", type=int, default=2_000)
+    parser.add_argument("--resolution", type=int, default=400)
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Vec2: {instance_size(Vec2(0.0, 0.0))} bytes, Vec3: {instance_size(Vec3())} bytes")
+    for name, nanoseconds in bench_operations(args.number).items():
+        print(f"{name:>18}: {nanoseconds:6.1f}ns")
+
+    frame = bench_frame(args.faces, args.resolution, args.repeat)
+    print(
+        f"Frame: {frame['vectors_per_frame']} vectors "
+        f"({frame['vector_megabytes_per_frame']:.1f} MB), {frame['seconds_per_frame']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures the throughput of `Model.load_from_obj` on synthetic meshes.
+
+Usage:
+    python -m tiny_renderer._benchmarks.bench_obj_loader [--faces 2000000] [--repeat 3]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj
+from tiny_renderer.model import Model
+
+
+def bench_obj_loader(num_faces: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = Path(tmp_dir) / "sphere.obj"
+        write_sphere_obj(filename, num_faces)
+        size = filename.stat().st_size
+
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            model = Model()
+            model.load_from_obj(filename)
+            timings.append(time.perf_counter() - t)
+
+    best = min(timings)
+    return {
+        "faces": model.num_faces(),
+        "megabytes": size / 1e6,
+        "seconds": best,
+        "megabytes_per_second": size / 1e6 / best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--faces", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    result = bench_obj_loader(args.faces, args.repeat)
+    print(
+        f"{result['faces']} faces, {result['megabytes']:.1f} MB: "
+        f"{result['seconds']:.2f}s ({result['megabytes_per_second']:.1f} MB/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
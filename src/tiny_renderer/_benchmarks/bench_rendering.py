@@ -0,0 +1,214 @@
+"""
+Headless rendering benchmarks of `TinyRenderer`.
+
+Times model loading and the rendering of every `RenderingMode` x `LightingMode` combination for
+synthetic meshes of increasing face count at several resolutions. The `FrameStats` of each
+combination (time spent in each stage of the pipeline plus counters) are recorded as well.
+Results are written as JSON, so different versions can be compared.
+
+Usage:
+    python -m tiny_renderer._benchmarks.bench_rendering --output results.json
+    python -m tiny_renderer._benchmarks.bench_rendering --faces 1000 --backends python numpy
+    python -m tiny_renderer._benchmarks.bench_rendering --faces 1000 --backends python \
+        --rasterization BoundingBox EdgeFunction
+    python -m tiny_renderer._benchmarks.bench_rendering --faces 100000 --shells 8 \
+        --hierarchical-z
+    python -m tiny_renderer._benchmarks.bench_rendering --depth-metrics Distance ScreenZ
+    python -m tiny_renderer._benchmarks.bench_rendering --faces 100000 --cache-setup
+"""
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from tiny_renderer import mesh_cache
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.framebuffer import DepthMetric
+from tiny_renderer.model import Model
+from tiny_renderer.tiny_renderer import (
+    LightingMode, RasterizationStrategy, RenderingMode, TinyRenderer)
+
+DEFAULT_FACES = (1_000, 10_000, 100_000)
+DEFAULT_RESOLUTIONS = (400, 800, 1600)
+
+
+def _best_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t)
+    return min(timings)
+
+
+def _render_with_stats(renderer: TinyRenderer, render_mode, light_mode, repeat: int) -> dict:
+    """
+    Renders `repeat` times collecting `FrameStats`, returns the stats of the fastest frame.
+    """
+    best = None
+    for _ in range(repeat):
+        renderer.render(render_mode, light_mode, stats=True)
+        stats = renderer.last_frame_stats
+        if best is None or stats.total_time < best.total_time:
+            best = stats
+    return best.as_dict()
+
+
+def bench_rendering(
+    face_counts: Sequence[int] = DEFAULT_FACES,
+    resolutions: Sequence[int] = DEFAULT_RESOLUTIONS,
+    backends: Sequence[str] = ("numpy",),
+    repeat: int = 3,
+    rasterization: Sequence[str] = ("BoundingBox",),
+    shells: int = 1,
+    hierarchical_z=False,
+    depth_metrics: Sequence[str] = ("Distance",),
+    cache_setup=False,
+) -> dict:
+    """
+    Runs the benchmarks, returns a JSON serializable dict.
+
+    :param rasterization:
+        Names of the `RasterizationStrategy`s benchmarked with the "python" backend.
+    :param shells:
+        Number of concentric spheres of the meshes, see `write_sphere_obj`. Pixels are drawn
+        about `shells` times.
+    :param hierarchical_z:
+        Whether occluded triangles are skipped (see `TinyRenderer.hierarchical_z`), sorting them
+        front to back with the "numpy" backend.
+    :param depth_metrics:
+        Names of the `DepthMetric`s benchmarked.
+    :param cache_setup:
+        Whether frames reuse the setup and visibility of the previous ones (see
+        `TinyRenderer.cache_setup`), so every combination but the first one of each resolution
+        measures switching the render or lighting mode. By default every frame is rendered from
+        scratch.
+    """
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "load": [],
+        "render": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        texture_filename = Path(tmp_dir) / "texture.png"
+        write_texture(texture_filename)
+
+        for num_faces in face_counts:
+            model_filename = Path(tmp_dir) / f"sphere_{num_faces}.obj"
+            write_sphere_obj(model_filename, num_faces, shells)
+            cache_dir = Path(tmp_dir) / "cache"
+            mesh_cache.build(model_filename, cache_dir)
+            model = Model()
+            model.load_from_obj(model_filename)
+            results["load"].append(
+                {
+                    "faces": model.num_faces(),
+                    "parse": _best_time(lambda: Model().load_from_obj(model_filename), repeat),
+                    "mesh_cache": _best_time(
+                        lambda: mesh_cache.load_model(model_filename, cache_dir=cache_dir), repeat
+                    ),
+                }
+            )
+
+            configurations = [
+                (backend, strategy, depth_metric)
+                for backend in backends
+                for strategy in (rasterization if backend == "python" else ["BoundingBox"])
+                for depth_metric in depth_metrics
+            ]
+            for backend, strategy, depth_metric in configurations:
+                renderer = TinyRenderer(
+                    bind_texture=False,
+                    backend=backend,
+                    rasterization=RasterizationStrategy[strategy],
+                    depth_metric=DepthMetric[depth_metric],
+                    hierarchical_z=hierarchical_z,
+                    sort_front_to_back=hierarchical_z and backend == "numpy",
+                    cache_setup=cache_setup,
+                )
+                renderer.setup_model(model_filename, texture_filename)
+                for resolution in resolutions:
+                    renderer.set_resolution(resolution, resolution)
+                    for render_mode in RenderingMode:
+                        for light_mode in LightingMode:
+                            entry = {
+                                "backend": backend,
+                                "rasterization": strategy,
+                                "depth_metric": depth_metric,
+                                "cache_setup": cache_setup,
+                                "faces": model.num_faces(),
+                                "shells": shells,
+                                "hierarchical_z": hierarchical_z,
+                                "resolution": resolution,
+                                "render_mode": render_mode.name,
+                                "light_mode": light_mode.name,
+                                "total": _best_time(
+                                    lambda: renderer.render(render_mode, light_mode), repeat
+                                ),
+                            }
+                            entry["stats"] = _render_with_stats(
+                                renderer, render_mode, light_mode, repeat
+                            )
+                            results["render"].append(entry)
+                            print(
+                                f"{backend:>6} {strategy:>12} {depth_metric:>8} "
+                                f"{entry['faces']:>8} faces {resolution:>5}px "
+                                f"{render_mode.name:>12} {light_mode.name:>6}: "
+                                f"{entry['total'] * 1000:9.1f}ms"
+                            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--faces", type=int, nargs="+", default=DEFAULT_FACES)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=DEFAULT_RESOLUTIONS)
+    parser.add_argument("--backends", nargs="+", default=["numpy"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--rasterization",
+        nargs="+",
+        default=["BoundingBox"],
+        choices=[x.name for x in RasterizationStrategy],
+    )
+    parser.add_argument("--shells", type=int, default=1)
+    parser.add_argument("--hierarchical-z", action="store_true")
+    parser.add_argument(
+        "--depth-metrics",
+        nargs="+",
+        default=["Distance"],
+        choices=[x.name for x in DepthMetric],
+    )
+    parser.add_argument(
+        "--cache-setup", action="store_true", help="reuse the setup of the previous frames"
+    )
+    parser.add_argument("--output", type=Path, default=Path("bench_rendering.json"))
+    args = parser.parse_args()
+
+    results = bench_rendering(
+        args.faces,
+        args.resolutions,
+        args.backends,
+        args.repeat,
+        args.rasterization,
+        args.shells,
+        args.hierarchical_z,
+        args.depth_metrics,
+        args.cache_setup,
+    )
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Synthetic meshes of arbitrary size used by the benchmarks.
+"""
+from math import ceil, sqrt
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+from PIL import Image
+
+
+def write_sphere_obj(filename: Union[str, Path], num_faces: int, shells: int = 1):
+    """
+    Writes a UV sphere (with texture coordinates and normals) with approximately `num_faces`
+    triangles to a wavefront .obj file.
+
+    :param shells:
+        Number of concentric spheres sharing the `num_faces` triangles, written from the
+        innermost one, so every pixel is drawn about `shells` times (the worst order for depth
+        testing).
+    """
+    num_faces = max(1, num_faces // shells)
+    segments = max(3, ceil(sqrt(num_faces)))
+    rings = max(2, ceil(num_faces / (2 * segments)))
+
+    theta = np.linspace(0.0, np.pi, rings + 1)
+    phi = np.linspace(0.0, 2.0 * np.pi, segments + 1)
+    theta, phi = np.meshgrid(theta, phi, indexing="ij")
+    normals = np.stack(
+        [np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)], axis=-1
+    ).reshape(-1, 3)
+    uvs = np.stack([phi / (2.0 * np.pi), 1.0 - theta / np.pi], axis=-1).reshape(-1, 2)
+    # keep uvs inside [0, 1) so nearest texture lookups never go past the last texel
+    uvs *= 0.999
+    radii = 0.9 * np.arange(1, shells + 1) / shells
+    vertices = np.concatenate([normals * radius for radius in radii])
+    normals = np.tile(normals, (shells, 1))
+    uvs = np.tile(uvs, (shells, 1))
+
+    index = np.arange((rings + 1) * (segments + 1)).reshape(rings + 1, segments + 1)
+    a, b = index[:-1, :-1].ravel(), index[:-1, 1:].ravel()
+    c, d = index[1:, :-1].ravel(), index[1:, 1:].ravel()
+    faces = np.concatenate([np.stack([a, c, b], axis=1), np.stack([b, c, d], axis=1)]) + 1
+    faces = np.concatenate([faces + shell * index.size for shell in range(shells)])
+
+    with open(filename, mode="w") as f:
+        f.write(f"# synthetic sphere, {len(faces)} faces, {shells} shells\n")
+        np.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(f, uvs, fmt="vt %.6f %.6f 0.000000")
+        np.savetxt(f, normals, fmt="vn %.6f %.6f %.6f")
+        face_vertices = np.repeat(faces, 3, axis=1)
+        np.savetxt(f, face_vertices, fmt="f %d/%d/%d %d/%d/%d %d/%d/%d")
+
+
+def write_texture(filename: Union[str, Path], size: int = 1024):
+    """
+    Writes a `size` x `size` RGB checkerboard texture.
+    """
+    y, x = np.mgrid[0:size, 0:size]
+    checker = ((x // 64 + y // 64) % 2).astype(bool)
+    pixels = np.zeros((size, size, 3), np.uint8)
+    pixels[checker] = (230, 180, 40)
+    pixels[~checker] = (40, 90, 200)
+    Image.fromarray(pixels).save(filename)
@@ -0,0 +1,130 @@
+import threading
+
+import numpy as np
+import pytest
+
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.background_renderer import BackgroundRenderer
+from tiny_renderer.tiny_renderer import LightingMode, RenderCancelled, RenderingMode, TinyRenderer
+
+
+@pytest.fixture(params=[("python", 1), ("numpy", 1), ("numpy", 2)])
+def renderer(tmp_path, request):
+    backend, workers = request.param
+    model_filename = tmp_path / "sphere.obj"
+    texture_filename = tmp_path / "texture.png"
+    write_sphere_obj(model_filename, 2000)
+    write_texture(texture_filename, 64)
+    result = TinyRenderer(bind_texture=False, backend=backend, workers=workers, tile_size=32)
+    result.setup_model(model_filename, texture_filename)
+    result.set_resolution(96, 96)
+    yield result
+    result.close()
+
+
+def test_render_progress(renderer):
+    renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+    expected = renderer.get_image().copy()
+
+    fractions = []
+    renderer.render(RenderingMode.Texturized, LightingMode.Smooth, progress=fractions.append)
+    np.testing.assert_array_equal(renderer.get_image(), expected)
+    assert len(fractions) > 2
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+
+def test_render_cancelled(renderer):
+    def cancel(fraction):
+        if fraction > 0:
+            raise RenderCancelled()
+
+    with pytest.raises(RenderCancelled):
+        renderer.render(RenderingMode.RandomColors, LightingMode.Flat, stats=True, progress=cancel)
+    assert renderer.last_frame_stats is None
+
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat, stats=True)
+    assert renderer.last_frame_stats.pixels_covered > 0
+
+
+def test_background_renderer(renderer):
+    renderer.render(RenderingMode.LightOnly, LightingMode.Flat)
+    expected = renderer.get_image().copy()
+
+    background = BackgroundRenderer(renderer)
+    try:
+        request_id = background.submit(RenderingMode.LightOnly, LightingMode.Flat)
+        assert background.wait(timeout=60)
+        assert not background.busy
+        assert background.progress is None
+        result = background.take_result()
+        assert result.request_id == request_id
+        np.testing.assert_array_equal(result.image, expected)
+        assert result.stats.pixels_covered > 0
+        assert background.take_result() is None
+    finally:
+        background.close()
+
+
+def test_background_renderer_supersedes_requests(renderer):
+    started = threading.Event()
+    release = threading.Event()
+
+    def block(_renderer):
+        started.set()
+        release.wait()
+
+    background = BackgroundRenderer(renderer)
+    try:
+        background.submit(RenderingMode.LightOnly, LightingMode.Flat, block)
+        assert started.wait(timeout=60)
+        assert background.busy
+        request_id = background.submit(RenderingMode.RandomColors, LightingMode.Flat)
+        release.set()
+        assert background.wait(timeout=60)
+        assert background.take_result().request_id == request_id
+
+        started.clear()
+        release.clear()
+        background.submit(RenderingMode.LightOnly, LightingMode.Flat, block)
+        assert started.wait(timeout=60)
+        background.cancel()
+        release.set()
+        assert background.wait(timeout=60)
+        assert background.take_result() is None
+    finally:
+        background.close()
+
+
+def test_background_renderer_errors(renderer):
+    def fail(_renderer):
+        raise ValueError("invalid settings")
+
+    background = BackgroundRenderer(renderer)
+    try:
+        background.submit(RenderingMode.LightOnly, LightingMode.Flat, fail)
+        assert background.wait(timeout=60)
+        assert isinstance(background.error, ValueError)
+        assert background.take_result() is None
+
+        background.submit(RenderingMode.LightOnly, LightingMode.Flat)
+        assert background.wait(timeout=60)
+        assert background.error is None
+        assert background.take_result() is not None
+    finally:
+        background.close()
+
+
+def test_background_renderer_progressive(renderer):
+    renderer.render(RenderingMode.Texturized, LightingMode.Flat)
+    expected = renderer.get_image().copy()
+
+    background = BackgroundRenderer(renderer)
+    try:
+        background.submit(RenderingMode.Texturized, LightingMode.Flat, progressive=True)
+        assert background.wait(timeout=60)
+        result = background.take_result()
+        assert result.step == 1
+        np.testing.assert_array_equal(result.image, expected)
+    finally:
+        background.close()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import batch_math
+from math_utils import Vec2, Vec3, apply_weights
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(50, 3)), rng.normal(size=(50, 3))
+
+
+def test_vector_operations_match_math_utils(vectors):
+    a, b = vectors
+    dot = batch_math.dot(a, b)
+    cross = batch_math.cross(a, b)
+    normalized = batch_math.normalize(a)
+    for i in range(len(a)):
+        u, v = Vec3(*a[i]), Vec3(*b[i])
+        assert dot[i] == u.dot(v)
+        c = u.cross(v)
+        assert cross[i].tolist() == [c.x, c.y, c.z]
+        n = u.normalized()
+        assert normalized[i].tolist() == [n.x, n.y, n.z]
+
+
+def test_normalize_null_vector():
+    result = batch_math.normalize(np.zeros((1, 3)))
+    assert np.isnan(result).all()
+
+
+def test_triangle_areas():
+    p0, p1, p2 = np.array([[0, 0], [0, 0]]), np.array([[4, 0], [0, 4]]), np.array([[0, 4], [4, 0]])
+    np.testing.assert_array_equal(batch_math.triangle_areas(p0, p1, p2), [16, -16])
+    np.testing.assert_array_equal(batch_math.is_counterclockwise(p0, p1, p2), [True, False])
+    assert Vec3.is_counterclockwise(Vec3(0, 0), Vec3(4, 0), Vec3(0, 4))
+
+
+def test_barycentric_weights_match_math_utils():
+    rng = np.random.default_rng(0)
+    points = rng.integers(0, 20, size=(100, 2))
+    triangle = np.array([[1, 2], [17, 5], [6, 18]])
+    weights = batch_math.barycentric_weights(points, *triangle)
+
+    for i, p in enumerate(points.tolist()):
+        v0, v1, v2 = (Vec2(*v) for v in triangle.tolist())
+        expected = Vec2.obtain_barycentric_weights(Vec2(*p), v0, v1, v2)
+        assert tuple(w[i] for w in weights) == expected
+
+    # a grid of points given as broadcast coordinates
+    y, x = np.mgrid[0:20, 0:20]
+    grid_weights = batch_math.barycentric_weights((x[0:1], y[:, 0:1]), *triangle)
+    for w, grid_w in zip(
+        batch_math.barycentric_weights(np.stack([x, y], -1), *triangle), grid_weights
+    ):
+        np.testing.assert_array_equal(w, grid_w)
+
+
+def test_barycentric_weights_of_degenerated_triangles():
+    triangles = np.array([[[0, 0], [4, 0], [0, 4]], [[0, 0], [1, 1], [2, 2]]])
+    points = np.array([[1, 1], [1, 1]])
+    w1, w2, w3 = batch_math.barycentric_weights(points, *triangles.transpose(1, 0, 2))
+    assert (w1[1], w2[1], w3[1]) == (-1, -1, -1)
+    assert w1[0] + w2[0] + w3[0] == pytest.approx(1.0)
+
+
+def test_apply_weights_matches_math_utils():
+    rng = np.random.default_rng(0)
+    values, weights = rng.normal(size=(10, 3, 2)), rng.random(size=(10, 3))
+    result = batch_math.apply_weights(values, weights)
+    for i in range(len(values)):
+        assert result[i, 0] == apply_weights(values[i, :, 0].tolist(), weights[i].tolist())
+        assert result[i, 1] == apply_weights(values[i, :, 1].tolist(), weights[i].tolist())
@@ -0,0 +1,56 @@
+import json
+
+from tiny_renderer._benchmarks.bench_math_utils import OPERATIONS, bench_frame, bench_operations
+from tiny_renderer._benchmarks.bench_rendering import bench_rendering
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode
+
+
+def test_bench_rendering():
+    results = bench_rendering(face_counts=[200], resolutions=[64], backends=["numpy"], repeat=1)
+    json.dumps(results)
+
+    assert len(results["load"]) == 1
+    assert len(results["render"]) == len(RenderingMode) * len(LightingMode)
+    texturized = [r for r in results["render"] if r["render_mode"] == "Texturized"][0]
+    assert texturized["resolution"] == 64
+    assert set(texturized["stats"]["stage_times"]) == {
+        "clear",
+        "transform",
+        "setup",
+        "rasterize",
+        "shade",
+    }
+    assert texturized["stats"]["triangles_submitted"] == texturized["faces"]
+
+
+def test_bench_rendering_strategies():
+    results = bench_rendering(
+        face_counts=[50],
+        resolutions=[32],
+        backends=["python", "numpy"],
+        repeat=1,
+        rasterization=["BoundingBox", "EdgeFunction"],
+        depth_metrics=["Distance", "ScreenZ"],
+    )
+    configurations = {(r["backend"], r["rasterization"]) for r in results["render"]}
+    assert configurations == {
+        ("python", "BoundingBox"),
+        ("python", "EdgeFunction"),
+        ("numpy", "BoundingBox"),
+    }
+    assert {r["depth_metric"] for r in results["render"]} == {"Distance", "ScreenZ"}
+
+
+def test_bench_rendering_hierarchical_z():
+    results = bench_rendering(
+        face_counts=[400], resolutions=[32], repeat=1, shells=2, hierarchical_z=True
+    )
+    entry = results["render"][0]
+    assert entry["shells"] == 2 and entry["hierarchical_z"]
+    assert "triangles_occluded" in entry["stats"]
+
+
+def test_bench_math_utils():
+    assert set(bench_operations(number=10)) == set(OPERATIONS)
+    frame = bench_frame(num_faces=20, resolution=16, repeat=1)
+    assert frame["vectors_per_frame"] > 0
@@ -0,0 +1,153 @@
+"""
+`Bitmap` needs an OpenGL context. The tests create one without any window through EGL (Mesa's
+surfaceless platform), in a subprocess because PyOpenGL picks its platform when first imported.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+_EGL_UNAVAILABLE = 77
+
+_CONTEXT_SCRIPT = f"""
+import ctypes
+import sys
+
+import numpy as np
+from OpenGL import EGL
+from OpenGL.GL import *
+
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+try:
+    display = EGL.eglGetPlatformDisplay(
+        EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None
+    )
+    assert EGL.eglInitialize(display, None, None)
+    # no surface is used, Mesa creates contexts without a matching config
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    attributes = (EGL.EGLint * 3)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+    assert EGL.eglChooseConfig(
+        display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count)
+    )
+    assert EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    attributes = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+        EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE,
+    )
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, attributes)
+    assert EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context)
+except Exception:
+    sys.exit({_EGL_UNAVAILABLE})
+
+from tiny_renderer.bitmap import Bitmap
+
+
+def read_texture(bitmap, channels):
+    # read as RGBA, the missing channels of the texture are read as 0 (or 255 for alpha)
+    glBindTexture(GL_TEXTURE_2D, bitmap.get_texture_id())
+    data = glGetTexImage(GL_TEXTURE_2D, 0, GL_RGBA, GL_UNSIGNED_BYTE)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    shape = (bitmap.get_height(), bitmap.get_width(), 4)
+    return np.frombuffer(data, np.uint8).reshape(shape)[..., :channels]
+
+
+def is_immutable(bitmap):
+    glBindTexture(GL_TEXTURE_2D, bitmap.get_texture_id())
+    result = glGetTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_IMMUTABLE_FORMAT)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return bool(result)
+
+
+rng = np.random.default_rng(0)
+"""
+
+
+def run_with_gl_context(code):
+    env = dict(os.environ, PYOPENGL_PLATFORM="egl")
+    src_dir = str(Path(__file__).parents[2])
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    process = subprocess.run(
+        [sys.executable, "-c", _CONTEXT_SCRIPT + textwrap.dedent(code)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode == _EGL_UNAVAILABLE:
+        pytest.skip("no OpenGL context available through EGL")
+    assert process.returncode == 0, process.stderr
+
+
+@pytest.mark.parametrize("use_pbo", [False, True])
+def test_bind_texture(use_pbo):
+    run_with_gl_context(
+        f"""
+        bitmap = Bitmap(rng.integers(0, 256, (5, 7, 3), dtype=np.uint8), use_pbo={use_pbo})
+        bitmap.bind_texture()
+        texture_id = bitmap.get_texture_id()
+        assert (bitmap.get_width(), bitmap.get_height()) == (7, 5)
+        assert is_immutable(bitmap)
+        assert bitmap.get_uvs() == ((0, 0), (1, 1))
+
+        # uploads of the same size reuse the storage
+        for _ in range(3):
+            pixels = rng.integers(0, 256, (5, 7, 3), dtype=np.uint8)
+            bitmap.bind_texture(pixels=pixels)
+            assert bitmap.get_texture_id() == texture_id
+            assert np.array_equal(read_texture(bitmap, 3), pixels)
+
+        # a new size needs a new texture
+        pixels = rng.integers(0, 256, (9, 4, 3), dtype=np.uint8)
+        bitmap.bind_texture(pixels=pixels)
+        assert (bitmap.get_width(), bitmap.get_height()) == (4, 9)
+        assert np.array_equal(read_texture(bitmap, 3), pixels)
+        bitmap.dispose()
+        """
+    )
+
+
+def test_bind_flipped_texture():
+    run_with_gl_context(
+        """
+        bottom_up = rng.integers(0, 256, (6, 5, 3), dtype=np.uint8)
+        bitmap = Bitmap(np.flipud(bottom_up))
+        bitmap.bind_texture()
+        # uploaded the way it's stored, flipped by the texture coordinates
+        assert np.array_equal(read_texture(bitmap, 3), bottom_up)
+        assert bitmap.get_uvs() == ((0, 1), (1, 0))
+
+        bitmap.bind_texture(pixels=bottom_up)
+        assert bitmap.get_uvs() == ((0, 0), (1, 1))
+        bitmap.dispose()
+        """
+    )
+
+
+def test_bind_texture_channels():
+    run_with_gl_context(
+        """
+        gray = rng.integers(0, 256, (4, 3), dtype=np.uint8)
+        bitmap = Bitmap(gray)
+        bitmap.bind_texture()
+        assert np.array_equal(read_texture(bitmap, 1)[..., 0], gray)
+
+        for channels in [1, 2, 4]:
+            pixels = rng.integers(0, 256, (4, 3, channels), dtype=np.uint8)
+            bitmap.bind_texture(pixels=pixels)
+            assert np.array_equal(read_texture(bitmap, channels), pixels)
+
+        for pixels in [np.zeros((4, 3, 5), np.uint8), np.zeros((2, 4, 3, 3), np.uint8)]:
+            try:
+                bitmap.bind_texture(pixels=pixels)
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("RuntimeError not raised")
+        bitmap.dispose()
+        """
+    )
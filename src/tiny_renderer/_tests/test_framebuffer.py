@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from tiny_renderer import rasterizer
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.framebuffer import DepthFormat, DepthMetric, FrameBuffer
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+
+
+@pytest.fixture(scope="module")
+def model_files(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("model")
+    model_filename = tmp_path / "sphere.obj"
+    texture_filename = tmp_path / "texture.png"
+    write_sphere_obj(model_filename, 2000)
+    write_texture(texture_filename, 64)
+    return model_filename, texture_filename
+
+
+def test_clear_in_place():
+    framebuffer = FrameBuffer(4, 3)
+    image, z_buffer = framebuffer.image, framebuffer.z_buffer
+    assert framebuffer.buffers.face_buffer is None
+
+    image[1, 2] = 255
+    z_buffer[1, 2] = 5.0
+    assert framebuffer.count_covered_pixels() == 1
+    assert framebuffer.get_image()[1, 2].tolist() == [255, 255, 255]
+    assert np.shares_memory(framebuffer.get_image(), image)
+
+    framebuffer.clear(deferred=True)
+    assert framebuffer.image is image and framebuffer.z_buffer is z_buffer
+    assert not image.any()
+    assert framebuffer.count_covered_pixels() == 0
+    face_buffer = framebuffer.buffers.face_buffer
+    assert face_buffer.shape == (3, 4) and (face_buffer == -1).all()
+    framebuffer.clear(deferred=True)
+    assert framebuffer.buffers.face_buffer is face_buffer
+
+
+@pytest.mark.parametrize(
+    "depth_format, dtype",
+    [
+        (DepthFormat.Float64, np.float64),
+        (DepthFormat.Float32, np.float32),
+        (DepthFormat.UInt16, np.uint16),
+        (DepthFormat.UInt24, np.uint32),
+    ],
+)
+def test_depth_formats(depth_format, dtype):
+    framebuffer = FrameBuffer(4, 3, depth_format)
+    assert framebuffer.z_buffer.dtype == dtype
+    assert FrameBuffer.get_depth_dtype(depth_format) == dtype
+    assert framebuffer.count_covered_pixels() == 0
+
+    framebuffer.set_depth_range(10.0)
+    encoded = rasterizer.encode_depth(np.array([0.0, 2.5, 10.0, 20.0]), framebuffer.depth_encoding)
+    if depth_format == DepthFormat.Float64:
+        np.testing.assert_array_equal(encoded, [0.0, 2.5, 10.0, 20.0])
+    elif depth_format == DepthFormat.Float32:
+        assert encoded.dtype == np.float32
+    else:
+        max_level = np.iinfo(np.uint16).max - 1 if dtype == np.uint16 else (1 << 24) - 2
+        np.testing.assert_array_equal(encoded, [0, max_level // 4, max_level, max_level])
+
+    other_format = (
+        DepthFormat.UInt16 if depth_format == DepthFormat.Float64 else DepthFormat.Float64
+    )
+    with pytest.raises(ValueError, match="must be"):
+        FrameBuffer(4, 3, depth_format, buffers=FrameBuffer(4, 3, other_format).buffers)
+    assert DepthFormat.get_captions()[depth_format] == DepthFormat.get_caption(depth_format)
+
+
+def test_depth_metric():
+    framebuffer = FrameBuffer(4, 3, DepthFormat.UInt16)
+    framebuffer.set_depth_range(10.0)
+    assert framebuffer.depth_metric == DepthMetric.Distance
+    assert not framebuffer.depth_encoding.screen_z
+
+    framebuffer.set_depth_metric(DepthMetric.ScreenZ)
+    assert framebuffer.depth_encoding.screen_z
+    assert framebuffer.depth_encoding.scale == (np.iinfo(np.uint16).max - 1) / 10.0
+    assert framebuffer.copy().depth_metric == DepthMetric.ScreenZ
+
+    camera = np.array([0.0, 0.0, -1.0])
+    x, y, z = np.array([3.0]), np.array([4.0]), np.array([0.4])
+    encoding = rasterizer.FLOAT64_DEPTH
+    assert rasterizer.camera_depth(x, y, z, camera, encoding) == pytest.approx(np.sqrt(26.0))
+    encoding = encoding._replace(screen_z=True)
+    assert rasterizer.camera_depth(x, y, z, camera, encoding) == pytest.approx(1.4)
+    assert DepthMetric.get_captions()[DepthMetric.ScreenZ] == "Screen space z"
+
+
+@pytest.mark.parametrize("depth_format", list(DepthFormat))
+@pytest.mark.parametrize("depth_metric", list(DepthMetric))
+def test_render_depth_formats(model_files, depth_format, depth_metric):
+    """
+    Every backend produces the same image with any depth format and metric, close to the one
+    rendered with `DepthFormat.Float64`.
+    """
+    reference = TinyRenderer(bind_texture=False, backend="numpy")
+    reference.setup_model(*model_files)
+    reference.set_resolution(96, 96)
+    reference.render(RenderingMode.Texturized, LightingMode.Smooth)
+
+    images = []
+    for options in [
+        dict(backend="python", jit=False),
+        dict(backend="python"),
+        dict(backend="numpy"),
+        dict(backend="numpy", workers=2, tile_size=32),
+    ]:
+        renderer = TinyRenderer(
+            bind_texture=False, depth_format=depth_format, depth_metric=depth_metric, **options
+        )
+        renderer.setup_model(*model_files)
+        renderer.set_resolution(96, 96)
+        assert renderer.depth_format == depth_format
+        renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+        images.append(renderer.get_image().copy())
+        renderer.close()
+
+    for image in images[1:]:
+        np.testing.assert_array_equal(image, images[0])
+    different = np.count_nonzero((images[0] != reference.get_image()).any(axis=2))
+    assert different <= 0.01 * 96 * 96
+
+
+def test_render_reuses_buffers(model_files):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(*model_files)
+    renderer.set_resolution(64, 48)
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth, stats=True)
+    image = renderer.get_image()
+    expected = image.copy()
+    covered = renderer.last_frame_stats.pixels_covered
+    assert covered > 0
+
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth, stats=True)
+    assert np.shares_memory(renderer.get_image(), image)
+    np.testing.assert_array_equal(renderer.get_image(), expected)
+    assert renderer.last_frame_stats.pixels_covered == covered
+
+    renderer.set_depth_format(DepthFormat.UInt16)
+    assert not np.shares_memory(renderer.get_image(), image)
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth, stats=True)
+    assert renderer.last_frame_stats.pixels_covered == covered
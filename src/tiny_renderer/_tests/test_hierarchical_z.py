@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.framebuffer import DepthFormat, DepthMetric
+from tiny_renderer.hierarchical_z import HierarchicalZ, nearest_distance, nearest_distances
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+
+
+@pytest.fixture(scope="module")
+def model_files(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("model")
+    model_filename = tmp_path / "shells.obj"
+    texture_filename = tmp_path / "texture.png"
+    # the outermost shell is written last, reverse the faces so it's drawn first and hides
+    # the inner shells from the "python" backend too
+    write_sphere_obj(model_filename, 3000, shells=3)
+    lines = model_filename.read_text().splitlines()
+    faces = [line for line in lines if line.startswith("f ")]
+    others = [line for line in lines if not line.startswith("f ")]
+    model_filename.write_text("\n".join(others + faces[::-1]) + "\n")
+    write_texture(texture_filename, 64)
+    return model_filename, texture_filename
+
+
+def test_tiles():
+    rng = np.random.default_rng(0)
+    z_buffer = rng.random((20, 27))
+    hierarchical_z = HierarchicalZ(z_buffer, tile_size=8)
+    assert hierarchical_z.tiles.shape == (3, 4)
+    assert hierarchical_z.tiles[1, 3] == z_buffer[8:16, 24:].max()
+    assert hierarchical_z.max_depth((0, 0, 26, 19)) == z_buffer.max()
+
+    z_buffer[:] = 0.5
+    assert hierarchical_z.max_depth((9, 9, 10, 10)) > 0.5
+    hierarchical_z.update((9, 9, 10, 10))
+    assert hierarchical_z.max_depth((9, 9, 10, 10)) == 0.5
+
+    # a region aligned to the tiles of the buffer, not to its corner
+    region = HierarchicalZ(z_buffer, (12, 4, 26, 19), tile_size=8)
+    assert region.tiles.shape == (3, 3)
+    assert region.max_depth((12, 4, 15, 7)) == 0.5
+
+
+def test_max_depths():
+    rng = np.random.default_rng(1)
+    z_buffer = rng.random((70, 90))
+    hierarchical_z = HierarchicalZ(z_buffer, (5, 3, 89, 69))
+    min_xy = rng.integers(0, 60, (200, 2))
+    boxes = np.concatenate([min_xy, min_xy + rng.integers(0, 30, (200, 2))], axis=1)
+    boxes[:, 2] = np.minimum(boxes[:, 2], 89)
+    boxes[:, 3] = np.minimum(boxes[:, 3], 69)
+
+    expected = [hierarchical_z.max_depth(box) for box in boxes]
+    assert (hierarchical_z.max_depths(boxes) >= expected).all()
+    # boxes inside a single tile are exact
+    single = (boxes[:, :2] // 8 == boxes[:, 2:] // 8).all(axis=1)
+    np.testing.assert_array_equal(
+        hierarchical_z.max_depths(boxes[single]), np.array(expected)[single]
+    )
+
+
+def test_nearest_distances():
+    rng = np.random.default_rng(2)
+    triangles = rng.random((50, 3, 3)) * [40, 40, 30]
+    triangles[..., :2] = np.round(triangles[..., :2])
+    boxes = np.concatenate(
+        [triangles[..., :2].min(axis=1), triangles[..., :2].max(axis=1)], axis=1
+    ).astype(np.int64)
+    camera = np.array([20.0, 20.0, -10.0])
+
+    nearest = nearest_distances(triangles, boxes, camera)
+    for triangle, box, bound in zip(triangles, boxes, nearest):
+        z = triangle[:, 2]
+        assert nearest_distance(tuple(box), z.min(), z.max(), camera) == pytest.approx(bound)
+        # every vertex, with the depth rounded like pixels, is farther than the bound
+        distances = np.linalg.norm(np.round(triangle) - camera, axis=1)
+        assert (distances >= bound).all()
+
+    nearest = nearest_distances(triangles, boxes, camera, screen_z=True)
+    for triangle, box, bound in zip(triangles, boxes, nearest):
+        z = triangle[:, 2]
+        screen_z = nearest_distance(tuple(box), z.min(), z.max(), camera, screen_z=True)
+        assert screen_z == pytest.approx(bound)
+        assert (np.abs(z - camera[2]) >= bound).all()
+
+
+@pytest.mark.parametrize(
+    "depth_format, depth_metric",
+    [
+        (DepthFormat.Float64, DepthMetric.Distance),
+        (DepthFormat.UInt16, DepthMetric.Distance),
+        (DepthFormat.Float64, DepthMetric.ScreenZ),
+    ],
+)
+def test_render_hierarchical_z(model_files, depth_format, depth_metric):
+    """
+    Skipping occluded triangles doesn't change the image of any backend.
+    """
+    images = []
+    for options in [
+        dict(backend="python", jit=False),
+        dict(backend="python", jit=False, hierarchical_z=True),
+        dict(backend="python", hierarchical_z=True),
+        dict(backend="numpy"),
+        dict(backend="numpy", hierarchical_z=True),
+        dict(backend="numpy", hierarchical_z=True, sort_front_to_back=True),
+        dict(backend="numpy", sort_front_to_back=True, workers=2, tile_size=32),
+    ]:
+        renderer = TinyRenderer(
+            bind_texture=False, depth_format=depth_format, depth_metric=depth_metric, **options
+        )
+        renderer.setup_model(*model_files)
+        renderer.set_resolution(64, 64)
+        renderer.render(RenderingMode.Texturized, LightingMode.Smooth, stats=True)
+        images.append(renderer.get_image().copy())
+        renderer.close()
+
+        stats = renderer.last_frame_stats
+        if options.get("hierarchical_z"):
+            assert stats.triangles_occluded > 0
+            assert stats.pixels_tested < reference_stats.pixels_tested
+        else:
+            assert stats.triangles_occluded == 0
+            reference_stats = stats
+
+    for image in images[1:]:
+        np.testing.assert_array_equal(image, images[0])
+
+
+def test_render_hierarchical_z_progressive(model_files):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(*model_files)
+    renderer.set_resolution(48, 48)
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat)
+    expected = renderer.get_image().copy()
+
+    renderer.hierarchical_z = True
+    renderer.sort_front_to_back = True
+    previews = []
+    renderer.render_progressive(
+        RenderingMode.RandomColors,
+        LightingMode.Flat,
+        lambda step, image: previews.append(image),
+        stats=True,
+    )
+    np.testing.assert_array_equal(previews[-1], expected)
+    assert renderer.last_frame_stats.triangles_occluded > 0
+
+
+def test_sort_front_to_back_requires_numpy():
+    with pytest.raises(ValueError, match="numpy"):
+        TinyRenderer(bind_texture=False, sort_front_to_back=True)
+    renderer = TinyRenderer(bind_texture=False, hierarchical_z=True)
+    assert renderer.hierarchical_z and not renderer.sort_front_to_back
+    with pytest.raises(ValueError, match="numpy"):
+        renderer.sort_front_to_back = True
@@ -0,0 +1,25 @@
+import pytest
+
+from math_utils import Vec2, Vec3
+
+
+def test_vectors_have_no_dict():
+    for vector in (Vec2(1.0, 2.0), Vec3(1.0, 2.0, 3.0)):
+        assert not hasattr(vector, "__dict__")
+        with pytest.raises(AttributeError):
+            vector.w = 1.0
+
+
+def test_inplace_operations():
+    a = Vec3(1.0, 2.0, 3.0)
+    assert a.iadd(Vec3(1.0, 1.0, 1.0)) is a
+    assert a == Vec3(2.0, 3.0, 4.0)
+    assert a.isub(Vec3(2.0, 3.0, 1.0)) is a
+    assert a == Vec3(0.0, 0.0, 3.0)
+    assert a.normalize_inplace() is a
+    assert a == Vec3(0.0, 0.0, 1.0)
+
+    b = Vec2(3.0, 4.0)
+    assert b.normalized() == Vec2(0.6, 0.8)
+    b.iadd(Vec2(1.0, 0.0)).isub(Vec2(0.0, 4.0)).normalize_inplace()
+    assert b == Vec2(1.0, 0.0)
@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from tiny_renderer import mesh_cache
+from tiny_renderer.model import Model
+
+TRIANGLE_OBJ = """\
+v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 1.0 1.0 0.5
+vt 0.0 0.0
+vt 1.0 0.0
+vt 1.0 1.0
+vn 0.0 0.0 1.0
+f 1/1/1 2/2/1 3/3/1
+"""
+
+
+@pytest.fixture
+def obj_filename(tmp_path):
+    filename = tmp_path / "triangle.obj"
+    filename.write_text(TRIANGLE_OBJ)
+    return filename
+
+
+def assert_models_equal(model, expected):
+    for name in ("vertices", "faces", "uvs", "texture_coordinates_indexes", "normals"):
+        np.testing.assert_array_equal(getattr(model, name), getattr(expected, name))
+
+
+def test_load_model_from_cache(obj_filename, mocker):
+    expected = Model()
+    expected.load_from_obj(obj_filename)
+
+    model = mesh_cache.load_model(obj_filename)
+    assert_models_equal(model, expected)
+    cache_path = mesh_cache.get_cache_path(obj_filename)
+    assert cache_path.parent == obj_filename.parent / ".mesh_cache"
+    assert (cache_path / "vertices.npy").is_file()
+
+    build = mocker.spy(mesh_cache, "build")
+    model = mesh_cache.load_model(obj_filename)
+    assert build.call_count == 0
+    assert isinstance(model.vertices.base, np.memmap)
+    assert_models_equal(model, expected)
+
+
+def test_load_model_rebuilds_when_source_changes(obj_filename, tmp_path, mocker):
+    cache_dir = tmp_path / "cache"
+    mesh_cache.load_model(obj_filename, cache_dir=cache_dir)
+    build = mocker.spy(mesh_cache, "build")
+
+    # same content, different modification time: the content hash is checked
+    stat = obj_filename.stat()
+    os.utime(obj_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    mesh_cache.load_model(obj_filename, cache_dir=cache_dir)
+    assert build.call_count == 0
+
+    obj_filename.write_text(TRIANGLE_OBJ.replace("v 1.0 1.0 0.5", "v 2.0 1.0 0.5"))
+    model = mesh_cache.load_model(obj_filename, cache_dir=cache_dir)
+    assert build.call_count == 1
+    assert model.get_vertex_at(2) == (2.0, 1.0, -0.5)
+
+    mesh_cache.load_model(obj_filename, cache_dir=cache_dir, rebuild=True)
+    assert build.call_count == 2
+
+
+def test_invalidate(obj_filename):
+    assert not mesh_cache.invalidate(obj_filename)
+    mesh_cache.load_model(obj_filename)
+    assert mesh_cache.invalidate(obj_filename)
+    assert not mesh_cache.get_cache_path(obj_filename).exists()
+
+
+def test_build_replaces_existing_entry(obj_filename):
+    cache_path = mesh_cache.build(obj_filename)
+    obj_filename.write_text(TRIANGLE_OBJ.replace("v 1.0 1.0 0.5", "v 2.0 1.0 0.5"))
+    assert mesh_cache.build(obj_filename) == cache_path
+    model = mesh_cache.load_model(obj_filename)
+    assert model.get_vertex_at(2) == (2.0, 1.0, -0.5)
+    # temporary directories are removed
+    assert [p.name for p in cache_path.parent.iterdir()] == [cache_path.name]
+
+
+def test_build_keeps_entry_written_concurrently(obj_filename, tmp_path, mocker):
+    cache_path = mesh_cache.build(obj_filename)
+    other_entry = shutil.copytree(cache_path, tmp_path / "other")
+    replace = os.replace
+
+    def replace_concurrently(src, dst):
+        if dst == cache_path and not cache_path.exists():
+            # another process writes its entry right before this one
+            shutil.copytree(other_entry, cache_path)
+        replace(src, dst)
+
+    mocker.patch.object(mesh_cache.os, "replace", side_effect=replace_concurrently)
+    assert mesh_cache.build(obj_filename) == cache_path
+    mocker.stopall()
+
+    expected = Model()
+    expected.load_from_obj(obj_filename)
+    assert_models_equal(mesh_cache.load_model(obj_filename), expected)
+    assert [p.name for p in cache_path.parent.iterdir()] == [cache_path.name]
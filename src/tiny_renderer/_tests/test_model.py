@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from math_utils import Vec2, Vec3
+from tiny_renderer.model import Model
+
+SQUARE_OBJ = """\
+# a unit square made of two triangles
+v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 1.0 1.0 0.5
+v 0.0 1.0 0.5
+vt 0.0 0.0 0.0
+vt 1.0 0.0 0.0
+vt 1.0 1.0 0.0
+vt 0.0 1.0 0.0
+vn 0.0 0.0 2.0
+vn 0.0 3.0 4.0
+f 1/1/1 2/2/1 3/3/2
+f 1/1/1 3/3/2 4/4/2
+"""
+
+
+@pytest.fixture
+def model(tmp_path):
+    filename = tmp_path / "square.obj"
+    filename.write_text(SQUARE_OBJ)
+    result = Model()
+    result.load_from_obj(filename)
+    return result
+
+
+def test_model_arrays(model):
+    assert model.num_verts() == 4
+    assert model.num_faces() == 2
+    assert model.vertices.dtype == np.float32
+    np.testing.assert_array_equal(model.vertices[2], [1.0, 1.0, -0.5])
+    assert model.faces.dtype == np.int32
+    np.testing.assert_array_equal(model.faces, [[0, 1, 2], [0, 2, 3]])
+    assert model.uvs.shape == (4, 2)
+    np.testing.assert_array_equal(model.texture_coordinates_indexes, [[0, 1, 2], [0, 2, 3]])
+    np.testing.assert_allclose(model.normals, [[0.0, 0.0, 1.0], [0.0, 0.6, 0.8]], rtol=1e-6)
+    np.testing.assert_array_equal(model.normal_indexes, [[0, 0, 1], [0, 1, 1]])
+
+
+def test_model_arrays_are_read_only_views(model):
+    vertices = model.vertices
+    assert np.shares_memory(vertices, model.vertices)
+    with pytest.raises(ValueError):
+        vertices[0, 0] = 1.0
+
+
+def test_model_getters(model):
+    assert model.get_face_at(1) == (0, 2, 3)
+    assert model.get_vertex_at(3) == (0.0, 1.0, -0.5)
+    assert model.get_texture_coordinate_index_at(1) == (0, 2, 3)
+    assert model.get_uv_at(1) == Vec2(1.0, 0.0)
+    assert model.get_uvs_from_face(1) == [Vec2(0.0, 0.0), Vec2(1.0, 1.0), Vec2(0.0, 1.0)]
+
+    normals = model.get_normals_from_face(0)
+    assert all(isinstance(n, Vec3) for n in normals)
+    assert normals[0] == Vec3(0.0, 0.0, 1.0)
+
+
+def test_faces_without_uvs_and_normals(tmp_path):
+    filename = tmp_path / "square.obj"
+    filename.write_text(SQUARE_OBJ.replace("f 1/1/1 2/2/1 3/3/2", "f 1 2 3"))
+    model = Model()
+    model.load_from_obj(filename)
+
+    np.testing.assert_array_equal(model.untextured_faces, [True, False])
+    assert model.get_uvs_from_face(0) is None
+    # the face gets its own flat normal
+    np.testing.assert_array_equal(model.normal_indexes, [[2, 2, 2], [0, 1, 1]])
+    normal = model.normals[2]
+    edges = model.vertices[[1, 2]] - model.vertices[0]
+    np.testing.assert_allclose(edges @ normal, [0.0, 0.0], atol=1e-6)
+    assert np.linalg.norm(normal) == pytest.approx(1.0)
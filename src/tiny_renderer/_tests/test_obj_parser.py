@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from tiny_renderer.obj_parser import parse_obj
+
+VERTICES = """\
+v 0.0 0.0 0.0
+v 1.0 0.0 0.0 1.0
+v 1.0 1.0 0.0
+v 0.0 1.0 0.0
+vt 0.0 0.0
+vt 1.0 0.0 0.0
+vt 1.0 1.0
+vt 0.0 1.0
+vn 0.0 0.0 2.0
+"""
+
+
+def write_obj(tmp_path, faces):
+    filename = tmp_path / "model.obj"
+    filename.write_text(VERTICES + faces)
+    return filename
+
+
+@pytest.mark.parametrize(
+    "faces, expected_uvs, expected_normals",
+    [
+        ("f 1 2 3\n", [-1, -1, -1], [-1, -1, -1]),
+        ("f 1/1 2/2 3/3\n", [0, 1, 2], [-1, -1, -1]),
+        ("f 1//1 2//1 3//1\n", [-1, -1, -1], [0, 0, 0]),
+        ("f 1/1/1 2/2/1 3/3/1\n", [0, 1, 2], [0, 0, 0]),
+        ("f -4/-4/-1 -3/-3/-1 -2/-2/-1\n", [0, 1, 2], [0, 0, 0]),
+    ],
+)
+def test_parse_face_formats(tmp_path, faces, expected_uvs, expected_normals):
+    arrays = parse_obj(write_obj(tmp_path, faces))
+    np.testing.assert_array_equal(arrays.faces, [[0, 1, 2]])
+    np.testing.assert_array_equal(arrays.texture_coordinates_indexes, [expected_uvs])
+    np.testing.assert_array_equal(arrays.normal_indexes, [expected_normals])
+
+
+def test_parse_mixed_face_formats(tmp_path):
+    # the totals of values and slashes match the format of the first face, which is not shared
+    faces = "f 1/1 2/1 3/1\nf 4/4/1 3/3/1 2/2/1\nf 1 2 3\n"
+    arrays = parse_obj(write_obj(tmp_path, faces))
+    np.testing.assert_array_equal(arrays.faces, [[0, 1, 2], [3, 2, 1], [0, 1, 2]])
+    np.testing.assert_array_equal(
+        arrays.texture_coordinates_indexes, [[0, 0, 0], [3, 2, 1], [-1, -1, -1]]
+    )
+    np.testing.assert_array_equal(arrays.normal_indexes, [[-1, -1, -1], [0, 0, 0], [-1, -1, -1]])
+
+
+def test_parse_vertices(tmp_path):
+    arrays = parse_obj(write_obj(tmp_path, "f 1 2 3\n"))
+    np.testing.assert_array_equal(arrays.vertices[1], [1.0, 0.0, 0.0])
+    np.testing.assert_array_equal(arrays.uvs, [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    np.testing.assert_array_equal(arrays.normals, [[0.0, 0.0, 1.0]])
+
+
+def test_parse_polygons_are_triangulated(tmp_path):
+    arrays = parse_obj(write_obj(tmp_path, "f 1/1 2/2 3/3 4/4\nf 3 2 1\n"))
+    np.testing.assert_array_equal(arrays.faces, [[0, 1, 2], [0, 2, 3], [2, 1, 0]])
+    np.testing.assert_array_equal(arrays.texture_coordinates_indexes[:2], [[0, 1, 2], [0, 2, 3]])
+
+
+def test_parse_negative_indexes_are_relative_to_the_face(tmp_path):
+    faces = "f -1 -2 -3\nv 5.0 5.0 5.0\nf -1 -2 -3\n"
+    arrays = parse_obj(write_obj(tmp_path, faces))
+    np.testing.assert_array_equal(arrays.faces, [[3, 2, 1], [4, 3, 2]])
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_parse_in_chunks(tmp_path, chunk_size):
+    lines = []
+    for i in range(50):
+        lines.append(f"v {i} {i + 0.5} {-i}")
+        lines.append(f"vt {i / 50} 0.5")
+        if i >= 3:
+            lines.append(f"f {i - 2}/{i - 2} -2/-2 -1/-1 {i - 3}/{i - 3}")
+    filename = tmp_path / "model.obj"
+    filename.write_text("\n".join(lines))
+
+    expected = parse_obj(filename, chunk_size=1 << 20)
+    assert expected.faces.shape == (94, 3)
+    np.testing.assert_array_equal(expected.faces[-2:], [[46, 48, 49], [46, 49, 45]])
+
+    arrays = parse_obj(filename, chunk_size=chunk_size)
+    for array, expected_array in zip(arrays, expected):
+        np.testing.assert_array_equal(array, expected_array)
+
+
+def test_parse_malformed_face(tmp_path):
+    with pytest.raises(ValueError, match="at least 3 vertices"):
+        parse_obj(write_obj(tmp_path, "f 1 2\n"))
@@ -0,0 +1,124 @@
+import json
+from math import pi
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tiny_renderer import render
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    model_filename = tmp_path / "sphere.obj"
+    texture_filename = tmp_path / "texture.png"
+    write_sphere_obj(model_filename, 200)
+    write_texture(texture_filename, 64)
+    return model_filename, texture_filename
+
+
+@pytest.fixture
+def renderer(model_files):
+    result = TinyRenderer(bind_texture=False, backend="numpy")
+    result.setup_model(*model_files)
+    result.set_resolution(48, 32)
+    return result
+
+
+def test_orbit_lights():
+    frames = render.orbit_lights(4)
+    assert len(frames) == 4
+    np.testing.assert_allclose(frames[0].light, (0, 0, -1))
+    np.testing.assert_allclose(frames[1].light, (1, 0, 0), atol=1e-12)
+    assert all(frame.camera == render.DEFAULT_CAMERA for frame in frames)
+
+
+def test_turntable():
+    frames = render.turntable(4)
+    assert [frame.rotation for frame in frames] == pytest.approx([0, pi / 2, pi, 3 * pi / 2])
+    assert all(frame.light is None for frame in frames)
+
+
+def test_load_frames(tmp_path):
+    filename = tmp_path / "frames.json"
+    filename.write_text(
+        json.dumps([{"light": [1, 0, 0]}, {"camera": [5, 5, -10]}, {"rotation": 0.5}])
+    )
+    assert render.load_frames(filename) == [
+        render.Frame(render.DEFAULT_CAMERA, (1, 0, 0)),
+        render.Frame((5, 5, -10), None),
+        render.Frame(render.DEFAULT_CAMERA, None, 0.5),
+    ]
+
+
+def test_render_turntable(renderer):
+    frames = render.turntable(3)
+    modes = (RenderingMode.Texturized, LightingMode.Smooth)
+    images = list(render.render_frames(renderer, frames, *modes))
+    assert not np.array_equal(images[0], images[1])
+    # the model matrix of each frame replaces the previous one
+    image = render.render_frame(renderer, frames[0], *modes)
+    np.testing.assert_array_equal(image, images[0])
+
+
+def test_render_frames_in_parallel(renderer):
+    frames = render.orbit_lights(3)
+    modes = (RenderingMode.LightOnly, LightingMode.Smooth)
+    expected = list(render.render_frames(renderer, frames, *modes))
+    assert expected[0].shape == (32, 48, 3)
+    assert not np.array_equal(expected[0], expected[1])
+
+    images = list(render.render_frames(renderer, frames, *modes, processes=2))
+    for image, expected_image in zip(images, expected):
+        np.testing.assert_array_equal(image, expected_image)
+
+
+def test_main(model_files, tmp_path, capsys):
+    output = tmp_path / "frames"
+    raw_video = tmp_path / "video.rgb"
+    render.main(
+        [
+            *map(str, model_files),
+            "--resolution",
+            "40",
+            "--depth-format",
+            "UInt16",
+            "--light-orbit",
+            "2",
+            "--output",
+            str(output),
+            "--raw-video",
+            str(raw_video),
+        ]
+    )
+    pngs = sorted(output.glob("*.png"))
+    assert [png.name for png in pngs] == ["frame_0000.png", "frame_0001.png"]
+    video = np.frombuffer(raw_video.read_bytes(), np.uint8).reshape(2, 40, 40, 3)
+    for png, frame in zip(pngs, video):
+        np.testing.assert_array_equal(np.asarray(Image.open(png)), frame)
+    assert "2 frames of 40x40" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        render.main([*map(str, model_files)])
+
+
+def test_main_turntable(model_files, tmp_path):
+    output = tmp_path / "frames"
+    render.main(
+        [
+            *map(str, model_files),
+            "--resolution",
+            "32",
+            "--turntable",
+            "3",
+            "--perspective",
+            "3",
+            "--output",
+            str(output),
+        ]
+    )
+    images = [np.asarray(Image.open(png)) for png in sorted(output.glob("*.png"))]
+    assert len(images) == 3
+    assert not np.array_equal(images[0], images[1])
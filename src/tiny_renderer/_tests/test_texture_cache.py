@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tiny_renderer import texture_cache
+from tiny_renderer.texture_cache import TextureCache
+
+
+@pytest.fixture
+def pixels():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (6, 4, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def texture_filename(tmp_path, pixels):
+    filename = tmp_path / "texture.png"
+    Image.fromarray(pixels).save(filename)
+    return filename
+
+
+def test_read_texture(texture_filename, pixels):
+    texture = texture_cache.read_texture(texture_filename)
+    np.testing.assert_array_equal(texture, np.flipud(pixels))
+    assert texture.flags.c_contiguous
+    assert not texture.flags.writeable
+
+
+def test_load_uses_cache(texture_filename, mocker):
+    cache = TextureCache()
+    texture = cache.load(texture_filename)
+    decode = mocker.spy(texture_cache, "_decode")
+    assert cache.load(texture_filename) is texture
+    assert decode.call_count == 0
+    assert cache.size_bytes == texture.nbytes
+
+    # a modified file is decoded again, replacing the old entry
+    stat = texture_filename.stat()
+    os.utime(texture_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.load(texture_filename) is not texture
+    assert decode.call_count == 1
+    assert len(cache) == 1
+
+
+def test_byte_budget_evicts_least_recently_used(tmp_path, pixels, mocker):
+    filenames = []
+    for i in range(3):
+        filenames.append(tmp_path / f"texture_{i}.png")
+        Image.fromarray(pixels).save(filenames[-1])
+    cache = TextureCache(max_bytes=2 * pixels.nbytes)
+    cache.load(filenames[0])
+    cache.load(filenames[1])
+    cache.load(filenames[0])
+    cache.load(filenames[2])
+    assert len(cache) == 2
+    assert cache.size_bytes == 2 * pixels.nbytes
+
+    decode = mocker.spy(texture_cache, "_decode")
+    cache.load(filenames[0])
+    assert decode.call_count == 0
+    cache.load(filenames[1])
+    assert decode.call_count == 1
+
+    cache.max_bytes = pixels.nbytes - 1
+    cache.clear()
+    cache.load(filenames[0])
+    assert len(cache) == 0
+
+
+def test_raw_texture_is_memory_mapped(texture_filename, tmp_path, pixels):
+    raw_filename = texture_cache.save_raw_texture(texture_filename, tmp_path / "texture.npy")
+    cache = TextureCache(max_bytes=0)
+    texture = cache.load(raw_filename)
+    assert isinstance(texture, np.memmap)
+    assert not texture.flags.writeable
+    np.testing.assert_array_equal(texture, np.flipud(pixels))
+    assert cache.load(raw_filename) is texture
+    assert cache.size_bytes == 0
+
+    with pytest.raises(ValueError, match="suffix"):
+        texture_cache.save_raw_texture(texture_filename, tmp_path / "texture.raw")
+    np.save(tmp_path / "gray.npy", np.zeros((4, 4), np.uint8))
+    with pytest.raises(ValueError, match="must be a"):
+        cache.load(tmp_path / "gray.npy")
+
+
+def test_load_mip_chain(texture_filename, mocker):
+    cache = TextureCache()
+    build = mocker.spy(texture_cache, "build_mip_chain")
+    levels = cache.load_mip_chain(texture_filename)
+    assert levels[0] is cache.load(texture_filename)
+    assert [level.shape[:2] for level in levels] == [(6, 4), (3, 2), (2, 1), (1, 1)]
+    assert not any(level.flags.writeable for level in levels)
+    assert cache.size_bytes == sum(level.nbytes for level in levels)
+
+    assert cache.load_mip_chain(texture_filename) is levels
+    assert build.call_count == 1
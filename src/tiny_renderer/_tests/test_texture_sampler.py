@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from tiny_renderer.texture_sampler import (
+    TextureFilter, TextureSampler, TextureWrap, build_mip_chain)
+
+
+@pytest.fixture
+def checkerboard():
+    image = np.zeros((4, 4, 3), np.uint8)
+    image[::2, ::2] = 200
+    image[1::2, 1::2] = 200
+    return image
+
+
+def test_build_mip_chain(checkerboard):
+    levels = build_mip_chain(checkerboard)
+    assert [level.shape for level in levels] == [(4, 4, 3), (2, 2, 3), (1, 1, 3)]
+    assert all(level.dtype == np.uint8 for level in levels)
+    np.testing.assert_array_equal(levels[1], 100)
+    np.testing.assert_array_equal(levels[2], 100)
+
+
+def test_build_mip_chain_odd_sizes():
+    image = np.arange(5 * 3 * 3, dtype=np.uint8).reshape(5, 3, 3)
+    levels = build_mip_chain(image)
+    assert [level.shape[:2] for level in levels] == [(5, 3), (3, 2), (2, 1), (1, 1)]
+
+
+def test_nearest_clamps_to_border(checkerboard):
+    sampler = TextureSampler(checkerboard)
+    u = np.array([1.0, -0.5, 0.0])
+    v = np.array([1.0, 0.0, 2.0])
+    np.testing.assert_array_equal(sampler.sample(u, v), checkerboard[[3, 0, 3], [3, 0, 0]])
+    np.testing.assert_array_equal(sampler.sample_texel(1.0, 1.0), checkerboard[3, 3])
+
+
+def test_nearest_repeat(checkerboard):
+    sampler = TextureSampler(checkerboard, wrap=TextureWrap.Repeat)
+    u = np.array([1.0, -0.25])
+    v = np.array([0.0, 0.0])
+    np.testing.assert_array_equal(sampler.sample(u, v), checkerboard[[0, 0], [0, 3]])
+    np.testing.assert_array_equal(sampler.sample_texel(-0.25, 0.0), checkerboard[0, 3])
+
+
+def test_bilinear_interpolates_neighbor_texels(checkerboard):
+    sampler = TextureSampler(checkerboard, texture_filter=TextureFilter.Bilinear)
+    u = np.array([0.0, 0.125, 0.125])
+    v = np.array([0.0, 0.0, 0.125])
+    np.testing.assert_allclose(sampler.sample(u, v, np.zeros(3)), [[200] * 3, [100] * 3, [100] * 3])
+
+
+def test_bilinear_reads_nearest_level(checkerboard):
+    sampler = TextureSampler(checkerboard, texture_filter=TextureFilter.Bilinear)
+    u = v = np.zeros(2)
+    np.testing.assert_allclose(sampler.sample(u, v, np.array([0.4, 0.6])), [[200] * 3, [100] * 3])
+
+
+def test_trilinear_blends_levels(checkerboard):
+    sampler = TextureSampler(checkerboard, texture_filter=TextureFilter.Trilinear)
+    u = v = np.zeros(3)
+    result = sampler.sample(u, v, np.array([0.0, 0.25, 5.0]))
+    np.testing.assert_allclose(result, [[200] * 3, [175] * 3, [100] * 3])
+
+
+def test_level_of_detail(checkerboard):
+    sampler = TextureSampler(checkerboard)
+    # the whole 4x4 texture on 16, 4 and 1 pixels, then in 64 pixels and on a degenerated triangle
+    lod = sampler.level_of_detail(np.ones(5), np.array([16, 4, 1, 64, 0]))
+    np.testing.assert_allclose(lod, [0, 1, 2, 0, 2])
+    assert sampler.level_of_detail(0.0, 0.0) == 0
@@ -1,12 +1,21 @@
+import re
+
+import numpy as np
 import pytest
 from PIL import Image
 
-from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+from math_utils import Vec3
+from tiny_renderer import jit_kernels, rasterizer, texture_cache, tiles, transform
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.framebuffer import DepthMetric
+from tiny_renderer.texture_sampler import TextureFilter, TextureWrap
+from tiny_renderer.tiny_renderer import (
+    BACKENDS, Colors, LightingMode, RasterizationStrategy, RenderingMode, TinyRenderer)
 
 
-@pytest.fixture
-def renderer(datadir):
-    result = TinyRenderer(bind_texture=False)
+@pytest.fixture(params=BACKENDS)
+def renderer(datadir, request):
+    result = TinyRenderer(bind_texture=False, backend=request.param)
     result.setup_model(
         datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
     )
@@ -22,3 +31,554 @@ def test_tiny_renderer_images(datadir, image_regression, renderer, render_mode,
 
     Image.fromarray(renderer.get_image()).save(image_filename)
     image_regression.check(image_filename.read_bytes(), basename=image_basename)
+
+
+@pytest.mark.parametrize("render_mode", [x for x in RenderingMode])
+@pytest.mark.parametrize("light_mode", [x for x in LightingMode])
+def test_screen_z_images(datadir, image_regression, renderer, render_mode, light_mode):
+    """
+    Storing screen space z instead of distances only changes a few pixels where faces intersect,
+    the images are the same within the tolerance of the regression images.
+    """
+    renderer.set_depth_metric(DepthMetric.ScreenZ)
+    renderer.render(render_mode, light_mode)
+    image_basename = f"{render_mode.name}_{light_mode.name}"
+    image_filename = datadir / f"{image_basename}_screen_z.png"
+
+    Image.fromarray(renderer.get_image()).save(image_filename)
+    image_regression.check(image_filename.read_bytes(), basename=image_basename)
+
+
+@pytest.mark.parametrize(
+    "render_mode", [RenderingMode.RandomColors, RenderingMode.Texturized, RenderingMode.LightOnly]
+)
+@pytest.mark.parametrize("light_mode", [x for x in LightingMode])
+@pytest.mark.parametrize("depth_metric", [x for x in DepthMetric])
+def test_numpy_backend_is_pixel_identical(datadir, render_mode, light_mode, depth_metric):
+    images = []
+    for backend in BACKENDS:
+        renderer = TinyRenderer(bind_texture=False, backend=backend, depth_metric=depth_metric)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(render_mode, light_mode)
+        images.append(renderer.get_image())
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        TinyRenderer(bind_texture=False, backend="fortran")
+
+
+def test_numpy_backend_batch_size_does_not_change_image(datadir, monkeypatch):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+    expected = renderer.get_image()
+
+    monkeypatch.setattr(rasterizer, "FRAGMENTS_PER_BATCH", 64)
+    renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+    np.testing.assert_array_equal(renderer.get_image(), expected)
+
+
+def test_render_with_workers(datadir):
+    images = []
+    for workers in (1, 3):
+        renderer = TinyRenderer(bind_texture=False, backend="numpy", workers=workers, tile_size=96)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(RenderingMode.RandomColors, LightingMode.Flat)
+        images.append(renderer.get_image().copy())
+        renderer.close()
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_workers_pool_is_kept_between_frames(datadir, mocker):
+    pool_class = mocker.patch.object(tiles, "ProcessPoolExecutor", wraps=tiles.ProcessPoolExecutor)
+    renderers = [
+        TinyRenderer(bind_texture=False, backend="numpy", workers=workers) for workers in (1, 2)
+    ]
+    for renderer in renderers:
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+
+    # every frame sends its own setup to the workers
+    for render_mode in (RenderingMode.Texturized, RenderingMode.RandomColors):
+        images = []
+        for renderer in renderers:
+            renderer.render(render_mode, LightingMode.Smooth)
+            images.append(renderer.get_image().copy())
+        np.testing.assert_array_equal(images[0], images[1])
+    assert pool_class.call_count == 1
+
+    renderers[1].close()
+    renderers[1].render(RenderingMode.LightOnly, LightingMode.Flat)
+    assert pool_class.call_count == 2
+    renderers[1].close()
+
+
+def test_texture_is_sent_to_workers_once(datadir, mocker):
+    shared_memory = mocker.patch.object(tiles, "SharedMemory", wraps=tiles.SharedMemory)
+    renderer = TinyRenderer(bind_texture=False, backend="numpy", workers=2)
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    # the texture has a shared memory block of its own, the setup of each frame doesn't include it
+    texture_size = sum((level.nbytes + 7) // 8 * 8 for level in renderer.texture_sampler.levels)
+    for position in ((1, 1, 3), (0.5, 0.5, 3)):
+        renderer.set_camera_position(*position)
+        renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+    image = renderer.get_image().copy()
+    renderer.close()
+    sizes = [call.kwargs.get("size") for call in shared_memory.call_args_list]
+    assert sizes.count(texture_size) == 1
+
+    expected = TinyRenderer(bind_texture=False, backend="numpy")
+    expected.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    expected.set_camera_position(0.5, 0.5, 3)
+    expected.render(RenderingMode.Texturized, LightingMode.Smooth)
+    np.testing.assert_array_equal(image, expected.get_image())
+
+
+def test_random_colors_are_repeatable(datadir):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy", random_seed=42)
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat)
+    image = renderer.get_image()
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat)
+    np.testing.assert_array_equal(renderer.get_image(), image)
+
+
+def test_workers_require_numpy_backend():
+    with pytest.raises(ValueError, match="requires the 'numpy' backend"):
+        TinyRenderer(bind_texture=False, backend="python", workers=2)
+
+
+def test_frame_stats(datadir):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    renderer.render(RenderingMode.Texturized, LightingMode.Flat)
+    assert renderer.last_frame_stats is None
+
+    renderer.render(RenderingMode.Texturized, LightingMode.Flat, stats=True)
+    stats = renderer.last_frame_stats
+    assert list(stats.stage_times) == ["clear", "transform", "setup", "rasterize", "shade"]
+    assert stats.triangles_submitted == 2492
+    assert stats.triangles_degenerated == 27
+    assert stats.pixels_tested == 466118
+    assert stats.pixels_covered >= np.count_nonzero(renderer.get_image().any(axis=2))
+    assert stats.pixels_covered <= stats.pixels_passed <= stats.pixels_tested
+    assert stats.overdraw > 1.0
+    assert "Overdraw" in str(stats)
+
+
+def test_cull_back_faces(datadir):
+    images = []
+    stats = []
+    for backend in BACKENDS:
+        renderer = TinyRenderer(bind_texture=False, backend=backend, cull_back_faces=True)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(RenderingMode.RandomColors, LightingMode.Flat, stats=True)
+        images.append(renderer.get_image())
+        stats.append(renderer.last_frame_stats)
+
+    np.testing.assert_array_equal(images[0], images[1])
+    for backend_stats in stats:
+        assert backend_stats.triangles_culled == 674
+        assert backend_stats.triangles_degenerated == 0
+    assert stats[0].pixels_tested == stats[1].pixels_tested
+
+    renderer.cull_back_faces = False
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat, stats=True)
+    assert renderer.last_frame_stats.triangles_culled == 0
+    assert renderer.last_frame_stats.pixels_tested > stats[1].pixels_tested
+
+
+@pytest.mark.parametrize("backend, workers", [("python", 1), ("numpy", 1), ("numpy", 2)])
+def test_cache_setup(datadir, backend, workers):
+    """
+    Frames which only change the shading reuse the setup (and the visibility, when rasterized
+    by the batched rasterizer) of the previous one, producing the same images.
+    """
+    renderer = TinyRenderer(bind_texture=False, backend=backend, workers=workers, cache_setup=True)
+    reference = TinyRenderer(bind_texture=False, backend=backend)
+    for r in (renderer, reference):
+        r.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        r.set_resolution(200, 200)
+    reuses_visibility = backend == "numpy"
+
+    def check(render_mode, light_mode, *, reused):
+        renderer.render(render_mode, light_mode, stats=True)
+        reference.render(render_mode, light_mode)
+        np.testing.assert_array_equal(renderer.get_image(), reference.get_image())
+        stats = renderer.last_frame_stats
+        assert stats.visibility_reused == (reused and reuses_visibility)
+        if stats.visibility_reused:
+            assert set(stats.stage_times) == {"clear", "transform", "setup", "shade"}
+            assert stats.pixels_tested == 0
+
+    check(RenderingMode.Texturized, LightingMode.Smooth, reused=False)
+    check(RenderingMode.RandomColors, LightingMode.Flat, reused=True)
+    check(RenderingMode.LightOnly, LightingMode.Smooth, reused=True)
+
+    renderer.set_light_direction(1, 0, -1)
+    reference.set_light_direction(1, 0, -1)
+    check(RenderingMode.LightOnly, LightingMode.Smooth, reused=True)
+
+    # changing what the visibility depends on rasterizes again
+    for change in [
+        lambda r: r.set_camera_position(0, 0, -10),
+        lambda r: r.set_depth_metric(DepthMetric.ScreenZ),
+        lambda r: setattr(r, "cull_back_faces", True),
+        lambda r: r.set_scale(0.4, 0.4, 0.4),
+        lambda r: r.set_model_matrix(transform.rotation(0.5)),
+    ]:
+        change(renderer)
+        change(reference)
+        check(RenderingMode.Texturized, LightingMode.Flat, reused=False)
+        check(RenderingMode.RandomColors, LightingMode.Smooth, reused=True)
+
+    # wireframes don't resolve the visibility of faces
+    check(RenderingMode.Wireframe, LightingMode.Flat, reused=False)
+    check(RenderingMode.LightOnly, LightingMode.Flat, reused=False)
+
+    # progressive frames are rasterized by the batched rasterizer whatever the backend
+    for render_mode, reused in [
+        (RenderingMode.Texturized, reuses_visibility),
+        (RenderingMode.RandomColors, True),
+    ]:
+        passes = []
+        renderer.render_progressive(
+            render_mode, LightingMode.Smooth, lambda step, image: passes.append(image), stats=True
+        )
+        reference.render(render_mode, LightingMode.Smooth)
+        np.testing.assert_array_equal(passes[-1], reference.get_image())
+        assert renderer.last_frame_stats.visibility_reused == reused
+    renderer.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_offscreen_faces_are_skipped(datadir, backend):
+    renderer = TinyRenderer(bind_texture=False, backend=backend)
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    # most of the model lies outside of the viewport
+    renderer.set_scale(1.5, 1.5, 0.45)
+    renderer.render(RenderingMode.LightOnly, LightingMode.Flat, stats=True)
+    stats = renderer.last_frame_stats
+    assert 0 < stats.triangles_culled < stats.triangles_submitted
+    assert stats.pixels_covered > 0
+
+
+@pytest.mark.parametrize(
+    "render_mode, light_mode",
+    [
+        (RenderingMode.Texturized, LightingMode.Smooth),
+        (RenderingMode.RandomColors, LightingMode.Flat),
+    ],
+)
+def test_edge_function_rasterization(datadir, render_mode, light_mode):
+    images = []
+    stats = []
+    for strategy in RasterizationStrategy:
+        renderer = TinyRenderer(bind_texture=False, rasterization=strategy)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(render_mode, light_mode, stats=True)
+        images.append(renderer.get_image())
+        stats.append(renderer.last_frame_stats)
+
+    np.testing.assert_array_equal(images[0], images[1])
+    assert stats[0].pixels_tested == stats[1].pixels_tested
+    assert stats[0].pixels_passed == stats[1].pixels_passed
+
+
+def test_edge_function_rasterization_requires_python_backend():
+    with pytest.raises(ValueError, match="only supports bounding box"):
+        TinyRenderer(
+            bind_texture=False, backend="numpy", rasterization=RasterizationStrategy.EdgeFunction
+        )
+
+
+def test_unique_edges():
+    faces = np.array([[0, 1, 2], [2, 1, 3], [3, 4, 2]])
+    edges = rasterizer.unique_edges(faces)
+    np.testing.assert_array_equal(edges, [[0, 1], [1, 2], [2, 0], [1, 3], [3, 2], [3, 4], [4, 2]])
+
+
+@pytest.mark.parametrize("depth_metric", [x for x in DepthMetric])
+def test_draw_lines_matches_draw_line(depth_metric):
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 64, (300, 2))
+    ends = rng.integers(0, 64, (300, 2))
+    ends[0] = starts[0]
+
+    renderer = TinyRenderer(bind_texture=False, depth_metric=depth_metric)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        renderer.draw_line(Vec3(*start), Vec3(*end), Colors.Red, Colors.Blue)
+    expected = np.flipud(renderer.get_image())[:64, :64]
+
+    image = np.zeros((64, 64, 3), np.uint8)
+    z_buffer = np.full((64, 64), np.inf)
+    camera = np.array([0.0, 0.0, -1.0])
+    depth_encoding = rasterizer.FLOAT64_DEPTH._replace(screen_z=depth_metric == DepthMetric.ScreenZ)
+    rasterizer.draw_lines(
+        starts, ends, camera, z_buffer, image, Colors.Red, Colors.Blue, depth_encoding
+    )
+    np.testing.assert_array_equal(image, expected)
+
+
+@pytest.mark.parametrize(
+    "depth_metric, expected", [(DepthMetric.Distance, 204), (DepthMetric.ScreenZ, 255)]
+)
+def test_set_depth_metric(tmp_path, depth_metric, expected):
+    write_sphere_obj(tmp_path / "sphere.obj", 100)
+    write_texture(tmp_path / "texture.png", 4)
+    renderer = TinyRenderer(bind_texture=False)
+    renderer.setup_model(tmp_path / "sphere.obj", tmp_path / "texture.png")
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+
+    # the same triangle twice, in the corner left empty by the model: once the depth is rounded
+    # both are at the same distance and the last one is drawn, only the screen z tells them apart
+    renderer.set_depth_metric(depth_metric)
+    vertices = [(0, 0), (20, 0), (0, 20)]
+    light_direction = Vec3(0.0, 0.0, 1.0)
+    for z, normal in ((0.2, Vec3(0.0, 0.0, 1.0)), (0.4, Vec3(0.6, 0.0, 0.8))):
+        renderer.draw_triangle(
+            [Vec3(x, y, z) for x, y in vertices], None, [normal] * 3, light_direction
+        )
+    np.testing.assert_array_equal(np.flipud(renderer.get_image())[5, 5], [expected] * 3)
+
+
+@pytest.mark.skipif(not jit_kernels.AVAILABLE, reason="Numba isn't installed")
+@pytest.mark.parametrize(
+    "render_mode, light_mode",
+    [
+        (RenderingMode.Texturized, LightingMode.Smooth),
+        (RenderingMode.RandomColors, LightingMode.Flat),
+    ],
+)
+@pytest.mark.parametrize("depth_metric", [x for x in DepthMetric])
+def test_jit_kernels_match_python(datadir, render_mode, light_mode, depth_metric):
+    images = []
+    for jit in (True, False):
+        renderer = TinyRenderer(bind_texture=False, jit=jit, depth_metric=depth_metric)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(render_mode, light_mode)
+        images.append(renderer.get_image())
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+@pytest.mark.skipif(not jit_kernels.AVAILABLE, reason="Numba isn't installed")
+@pytest.mark.parametrize("depth_metric", [x for x in DepthMetric])
+def test_jit_draw_line_matches_python(depth_metric):
+    rng = np.random.default_rng(1)
+    lines = rng.integers(0, 64, (300, 4)).tolist()
+    images = []
+    for jit in (True, False):
+        renderer = TinyRenderer(bind_texture=False, jit=jit, depth_metric=depth_metric)
+        for x0, y0, x1, y1 in lines:
+            renderer.draw_line(Vec3(x0, y0, 3.0), Vec3(x1, y1, 0.5), Colors.Red, Colors.Blue)
+        images.append(renderer.get_image())
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_jit_requires_numba(monkeypatch):
+    monkeypatch.setattr(jit_kernels, "AVAILABLE", False)
+    with pytest.raises(ValueError, match="require Numba"):
+        TinyRenderer(bind_texture=False, jit=True)
+
+
+def test_texture_filters(datadir):
+    images = []
+    for backend in BACKENDS:
+        renderer = TinyRenderer(bind_texture=False, backend=backend)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        # a small model reads smaller mip levels
+        renderer.set_scale(0.3, 0.3, 0.3)
+        renderer.render(RenderingMode.Texturized, LightingMode.Flat)
+        nearest = renderer.get_image().copy()
+        renderer.set_texture_sampling(TextureFilter.Trilinear, TextureWrap.Clamp)
+        renderer.render(RenderingMode.Texturized, LightingMode.Flat)
+        images.append(renderer.get_image())
+        assert not np.array_equal(images[-1], nearest)
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_setup_model_with_raw_texture(datadir, tmp_path):
+    images = []
+    for texture_filename in (
+        datadir / "african_head_diffuse.jpg",
+        texture_cache.save_raw_texture(
+            datadir / "african_head_diffuse.jpg", tmp_path / "african_head_diffuse.npy"
+        ),
+    ):
+        renderer = TinyRenderer(bind_texture=False, backend="numpy")
+        renderer.setup_model(datadir / "african_head.obj", texture_filename)
+        renderer.render(RenderingMode.Texturized, LightingMode.Smooth)
+        images.append(renderer.get_image())
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_setup_model_builds_mip_chain_once(datadir, tmp_path, mocker):
+    texture_filename = tmp_path / "texture.jpg"
+    texture_filename.write_bytes((datadir / "african_head_diffuse.jpg").read_bytes())
+    build = mocker.spy(texture_cache, "build_mip_chain")
+    for texture_filter in TextureFilter:
+        renderer = TinyRenderer(bind_texture=False, texture_filter=texture_filter)
+        renderer.setup_model(datadir / "african_head.obj", texture_filename)
+    assert build.call_count == 1
+
+
+@pytest.mark.parametrize("light_mode", [x for x in LightingMode])
+def test_faces_without_uvs_and_normals(tmp_path, light_mode):
+    """
+    Faces written as "f v" are drawn flat and untextured (white) by every backend.
+    """
+    model_filename = tmp_path / "sphere.obj"
+    write_sphere_obj(model_filename, 500)
+    write_texture(tmp_path / "texture.png", 16)
+    # keep only the vertex index of each face vertex
+    model_filename.write_text(re.sub(r"/\d+/\d+", "", model_filename.read_text()))
+
+    images = []
+    for options in [
+        dict(backend="python", jit=False),
+        dict(backend="python"),
+        dict(backend="python", rasterization=RasterizationStrategy.EdgeFunction),
+        dict(backend="numpy"),
+        dict(backend="numpy", workers=2),
+    ]:
+        for render_mode in (RenderingMode.Texturized, RenderingMode.LightOnly):
+            renderer = TinyRenderer(bind_texture=False, **options)
+            renderer.setup_model(model_filename, tmp_path / "texture.png")
+            renderer.set_resolution(64, 64)
+            renderer.render(render_mode, light_mode)
+            images.append(renderer.get_image().copy())
+            renderer.close()
+
+    assert images[0].any()
+    for image in images[1:]:
+        np.testing.assert_array_equal(image, images[0])
+
+
+def test_set_light_direction(datadir):
+    images = []
+    for backend in BACKENDS:
+        renderer = TinyRenderer(bind_texture=False, backend=backend)
+        renderer.setup_model(
+            datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+        )
+        renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+        default = renderer.get_image().copy()
+        renderer.set_light_direction(0, 0, -2)
+        renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+        np.testing.assert_array_equal(renderer.get_image(), default)
+
+        renderer.set_light_direction(1, 1, -1)
+        renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+        images.append(renderer.get_image())
+        assert not np.array_equal(images[-1], default)
+
+    np.testing.assert_array_equal(images[0], images[1])
+
+
+def test_set_resolution(datadir):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    renderer.set_resolution(200, 100)
+    renderer.render(RenderingMode.RandomColors, LightingMode.Flat)
+    assert renderer.get_image().shape == (100, 200, 3)
+
+
+def test_refinement_grids():
+    passes = rasterizer.refinement_grids((4, 2, 1))
+    assert passes[0] == [rasterizer.PixelGrid(4, 0, 0)]
+    assert passes[1] == [(4, 2, 0), (4, 0, 2), (4, 2, 2)]
+    assert len(passes[2]) == 3
+
+    # every pixel is rendered by exactly one pass
+    count = np.zeros((10, 13), int)
+    for grids in passes:
+        for grid in grids:
+            count[rasterizer.grid_slices((0, 0, 12, 9), grid)] += 1
+    np.testing.assert_array_equal(count, 1)
+
+    for steps in [(4, 2), (4, 3, 1), (2, 4, 1), ()]:
+        with pytest.raises(ValueError, match="Refinement steps"):
+            rasterizer.refinement_grids(steps)
+
+
+@pytest.mark.parametrize("backend, workers", [("python", 1), ("numpy", 1), ("numpy", 2)])
+def test_render_progressive(datadir, backend, workers):
+    renderer = TinyRenderer(bind_texture=False, backend=backend, workers=workers)
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    renderer.render(RenderingMode.RandomColors, LightingMode.Smooth, stats=True)
+    expected = renderer.get_image().copy()
+    expected_stats = renderer.last_frame_stats
+
+    passes = []
+    renderer.render_progressive(
+        RenderingMode.RandomColors,
+        LightingMode.Smooth,
+        lambda step, image: passes.append((step, image)),
+        stats=True,
+    )
+    renderer.close()
+    assert [step for step, _ in passes] == [8, 4, 2, 1]
+    np.testing.assert_array_equal(passes[-1][1], expected)
+    np.testing.assert_array_equal(renderer.get_image(), expected)
+    stats = renderer.last_frame_stats
+    assert stats.pixels_tested == expected_stats.pixels_tested
+    assert stats.pixels_covered == expected_stats.pixels_covered
+
+    # pixels of each pass are final, each one fills its block in the preview
+    bottom_up = np.flipud(expected)
+    for step, image in passes[:-1]:
+        blocks = np.repeat(np.repeat(bottom_up[::step, ::step], step, axis=0), step, axis=1)
+        np.testing.assert_array_equal(np.flipud(image), blocks[:800, :800])
+
+
+def test_render_progressive_wireframe(datadir):
+    renderer = TinyRenderer(bind_texture=False)
+    renderer.setup_model(
+        datadir / "african_head.obj", datadir / "african_head_diffuse.jpg",
+    )
+    passes = []
+    renderer.render_progressive(
+        RenderingMode.Wireframe, LightingMode.Flat, lambda *args: passes.append(args)
+    )
+    assert len(passes) == 1
+    assert passes[0][0] == 1
+    np.testing.assert_array_equal(passes[0][1], renderer.get_image())
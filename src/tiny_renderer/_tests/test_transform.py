@@ -0,0 +1,138 @@
+from math import pi
+
+import numpy as np
+import pytest
+
+from tiny_renderer import transform
+from tiny_renderer._benchmarks.synthetic_mesh import write_sphere_obj, write_texture
+from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+
+
+@pytest.fixture(scope="module")
+def model_files(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("model")
+    model_filename = tmp_path / "sphere.obj"
+    texture_filename = tmp_path / "texture.png"
+    write_sphere_obj(model_filename, 2000)
+    write_texture(texture_filename, 64)
+    return model_filename, texture_filename
+
+
+def test_matrices():
+    np.testing.assert_array_equal(transform.look_at((0, 0, -1)), np.eye(4))
+    np.testing.assert_allclose(transform.rotation(pi / 2) @ [1, 0, 0, 1], [0, 0, -1, 1], atol=1e-15)
+    np.testing.assert_array_equal(
+        transform.translation(1, 2, 3) @ transform.scaling(2, 2, 2) @ [1, 1, 1, 1], [3, 4, 5, 1]
+    )
+
+    # the camera at (3, 0, 0) looks at the origin along +z of camera space
+    view = transform.look_at((3, 0, 0))
+    np.testing.assert_allclose(view @ [3, 0, 0, 1], [0, 0, -3, 1], atol=1e-15)
+    np.testing.assert_allclose(view[:3, :3] @ view[:3, :3].T, np.eye(3), atol=1e-15)
+
+    projected = np.array([[1, 1, 0, 1], [1, 1, 4, 1]]) @ transform.perspective(4).T
+    np.testing.assert_allclose(projected[:, :3] / projected[:, 3:], [[1, 1, 0], [0.5, 0.5, 2]])
+
+
+def test_transform_apply():
+    rng = np.random.default_rng(0)
+    vertices = rng.uniform(-1, 1, (100, 3)).astype(np.float32)
+    t = transform.Transform()
+    t.set_viewport(360, 270, 360)
+    # identity matrices scale exactly like `(v + 1) * viewport_size`
+    expected = (vertices.astype(np.float64) + 1.0) * [360, 270, 360]
+    np.testing.assert_array_equal(t.apply(vertices), expected)
+
+    t.model = transform.rotation(0.3)
+    t.projection = transform.perspective(3)
+    model_view_projection = t.projection @ t.view @ t.model
+    clip = np.c_[vertices, np.ones(len(vertices))] @ model_view_projection.T
+    out = np.empty((100, 3))
+    assert t.apply(vertices, out=out) is out
+    np.testing.assert_allclose(out, (clip[:, :3] / clip[:, 3:] + 1.0) * [360, 270, 360])
+
+    normals = rng.normal(size=(10, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    np.testing.assert_allclose(t.apply_to_normals(normals), normals @ t.model[:3, :3].T)
+    t.model = np.eye(4)
+    assert t.apply_to_normals(normals) is normals
+
+
+def test_transform_version():
+    t = transform.Transform()
+    matrix = t.model_view_projection
+    assert t.model_view_projection is matrix
+    version = t.version
+
+    # setting the same values doesn't change anything
+    t.model = np.eye(4)
+    t.set_viewport(1, 1, 1)
+    assert t.version == version
+    assert t.model_view_projection is matrix
+
+    t.view = transform.look_at((1, 0, -1))
+    assert t.version == version + 1
+    assert t.model_view_projection is not matrix
+    t.set_viewport(2, 1, 1)
+    assert t.version == version + 2
+
+    with pytest.raises(ValueError, match="4,4"):
+        t.projection = np.eye(3)
+    with pytest.raises(ValueError, match="read-only"):
+        t.model[0, 0] = 2.0
+
+
+def test_transformed_vertices_are_cached(model_files):
+    renderer = TinyRenderer(bind_texture=False, backend="numpy", cache_setup=True)
+    renderer.setup_model(*model_files)
+    renderer.set_resolution(64, 64)
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+    vertices = renderer._transform_vertices()
+    renderer.render(RenderingMode.Texturized, LightingMode.Flat)
+    assert renderer._transform_vertices() is vertices
+
+    renderer.set_scale(0.3, 0.3, 0.3)
+    scaled = renderer._transform_vertices()
+    assert scaled is not vertices
+    assert scaled.max() < 0.6 * 64 + 1
+    renderer.set_model_matrix(transform.rotation(1.0))
+    assert renderer._transform_vertices() is not scaled
+
+
+@pytest.mark.parametrize("render_mode", [RenderingMode.Texturized, RenderingMode.Wireframe])
+@pytest.mark.parametrize("light_mode", [x for x in LightingMode])
+def test_render_transformed(model_files, render_mode, light_mode):
+    """
+    Every backend applies the matrices and produces the same image.
+    """
+    images = []
+    for options in [dict(backend="python", jit=False), dict(backend="python"), dict()]:
+        renderer = TinyRenderer(bind_texture=False, **{"backend": "numpy", **options})
+        renderer.setup_model(*model_files)
+        renderer.set_resolution(64, 64)
+        renderer.set_model_matrix(transform.rotation(0.7, (1, 1, 0)))
+        renderer.set_view_matrix(transform.look_at((0.5, 0.2, -3)))
+        renderer.set_projection_matrix(transform.perspective(3))
+        renderer.render(render_mode, light_mode)
+        images.append(renderer.get_image().copy())
+
+    for image in images[1:]:
+        np.testing.assert_array_equal(image, images[0])
+
+
+def test_rotated_normals(model_files):
+    """
+    Normals turn with the model: a smooth lit sphere looks the same after turning it.
+    """
+    renderer = TinyRenderer(bind_texture=False, backend="numpy")
+    renderer.setup_model(*model_files)
+    renderer.set_resolution(64, 64)
+    renderer.set_light_direction(1, 0, -1)
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+    expected = renderer.get_image().astype(np.int64)
+
+    renderer.set_model_matrix(transform.rotation(pi / 2))
+    renderer.render(RenderingMode.LightOnly, LightingMode.Smooth)
+    image = renderer.get_image().astype(np.int64)
+    # only the tessellation turns, with still normals the light would turn too (mean ~60)
+    assert np.abs(image - expected).mean() < 5.0
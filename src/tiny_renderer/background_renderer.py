@@ -0,0 +1,205 @@
+"""
+Rendering of `TinyRenderer` frames on a worker thread, so a UI never waits for a frame.
+
+Requests are rendered one at a time; a new request supersedes the one being rendered (which is
+cancelled through the progress callback of `TinyRenderer.render`) and any request still waiting.
+Finished frames are published as copies of the image, so the UI can display the last finished
+frame while the next one is rendered. Progressive requests also publish the preview of each pass
+as soon as it's ready. Nothing here touches OpenGL: uploading the images (see
+`tiny_renderer.bitmap.Bitmap`) is left to the thread owning the GL context.
+
+Usage:
+    background = BackgroundRenderer(TinyRenderer(bind_texture=False))
+    background.submit(RenderingMode.Texturized, LightingMode.Smooth)
+    # every UI frame:
+    result = background.take_result()
+    if result is not None:
+        bitmap.bind_texture(pixels=result.image)
+"""
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Optional
+
+import numpy as np
+
+from tiny_renderer.tiny_renderer import LightingMode, RenderCancelled, RenderingMode, TinyRenderer
+
+# `image` is a copy of `TinyRenderer.get_image`, `stats` its `FrameStats` and `elapsed` the wall
+# time spent rendering it in seconds. Previews of progressive requests have a `step` above 1 (see
+# `TinyRenderer.render_progressive`) and no `stats`.
+RenderResult = namedtuple("RenderResult", "request_id image stats elapsed step")
+
+_Request = namedtuple("_Request", "request_id render_mode light_mode configure progressive")
+
+
+class BackgroundRenderer:
+    """
+    Renders frames of a `TinyRenderer` on a worker thread, see the module documentation. The
+    renderer must only be used through `submit` while the `BackgroundRenderer` is alive.
+    """
+
+    def __init__(self, renderer: TinyRenderer):
+        self._renderer = renderer
+        self._condition = threading.Condition()
+        self._last_request_id = 0
+        self._pending: Optional[_Request] = None
+        self._rendering: Optional[_Request] = None
+        self._progress = 0.0
+        self._result: Optional[RenderResult] = None
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="BackgroundRenderer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        render_mode: RenderingMode,
+        light_mode: LightingMode,
+        configure: Optional[Callable[[TinyRenderer], None]] = None,
+        *,
+        progressive: bool = False,
+    ) -> int:
+        """
+        Requests a frame, superseding any previous request, returns the id of the request.
+
+        :param configure:
+            Called with the renderer on the worker thread before rendering, to change settings
+            (resolution, strategies, ...) without racing with the frame being rendered.
+        :param progressive:
+            If `True` the frame is rendered with `TinyRenderer.render_progressive`, publishing
+            a result for each pass.
+        """
+        with self._condition:
+            self._last_request_id += 1
+            self._pending = _Request(
+                self._last_request_id, render_mode, light_mode, configure, progressive
+            )
+            self._condition.notify_all()
+            return self._last_request_id
+
+    def cancel(self):
+        """
+        Cancels the request being rendered and the one waiting, if any.
+        """
+        with self._condition:
+            self._last_request_id += 1
+            self._pending = None
+            self._condition.notify_all()
+
+    @property
+    def busy(self) -> bool:
+        with self._condition:
+            return self._pending is not None or self._rendering is not None
+
+    @property
+    def progress(self) -> Optional[float]:
+        """
+        Fraction of the frame being rendered done so far, `None` if idle.
+        """
+        with self._condition:
+            if self._rendering is None:
+                return None if self._pending is None else 0.0
+            return self._progress
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """
+        The exception raised by the last request, `None` if it was rendered (or cancelled).
+        """
+        with self._condition:
+            return self._error
+
+    def take_result(self) -> Optional[RenderResult]:
+        """
+        Returns the last finished frame (or preview) if it wasn't returned yet, otherwise `None`.
+        """
+        with self._condition:
+            result, self._result = self._result, None
+            return result
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every request is finished or cancelled, returns `False` on timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and self._rendering is None, timeout
+            )
+
+    def close(self):
+        """
+        Cancels any request and stops the worker thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._last_request_id += 1
+            self._pending = None
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._pending is not None)
+                if self._closed:
+                    return
+                request, self._pending = self._pending, None
+                self._rendering = request
+                self._progress = 0.0
+
+            result = error = None
+            try:
+                result = self._render(request)
+            except RenderCancelled:
+                pass
+            except Exception as e:
+                error = e
+            with self._condition:
+                if result is not None:
+                    self._result = result
+                if result is not None or error is not None:
+                    self._error = error
+                self._rendering = None
+                self._condition.notify_all()
+
+    def _render(self, request: _Request) -> RenderResult:
+        def report_progress(fraction):
+            with self._condition:
+                if request.request_id != self._last_request_id:
+                    raise RenderCancelled()
+                self._progress = fraction
+
+        def publish_preview(step, image):
+            if step > 1:
+                result = RenderResult(
+                    request.request_id, image, None, time.perf_counter() - start, step
+                )
+                with self._condition:
+                    if request.request_id != self._last_request_id:
+                        raise RenderCancelled()
+                    self._result = result
+
+        report_progress(0.0)
+        start = time.perf_counter()
+        if request.configure is not None:
+            request.configure(self._renderer)
+        if request.progressive:
+            self._renderer.render_progressive(
+                request.render_mode,
+                request.light_mode,
+                publish_preview,
+                stats=True,
+                progress=report_progress,
+            )
+        else:
+            self._renderer.render(
+                request.render_mode, request.light_mode, stats=True, progress=report_progress
+            )
+        return RenderResult(
+            request.request_id,
+            np.ascontiguousarray(self._renderer.get_image()),
+            self._renderer.last_frame_stats,
+            time.perf_counter() - start,
+            1,
+        )
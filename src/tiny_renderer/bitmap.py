@@ -1,132 +1,165 @@
+import ctypes
+from collections import namedtuple
+
 import numpy as np
 from OpenGL.GL import *
 
+# OpenGL formats of images with 1, 2, 3 and 4 channels
+_PixelFormat = namedtuple("_PixelFormat", "internal_format format swizzle_mask")
+_PIXEL_FORMATS = {
+    1: _PixelFormat(GL_R8, GL_RED, [GL_RED, GL_RED, GL_RED, GL_ONE]),
+    2: _PixelFormat(GL_RG8, GL_RG, [GL_RED, GL_GREEN, GL_ZERO, GL_ONE]),
+    3: _PixelFormat(GL_RGB8, GL_RGB, [GL_RED, GL_GREEN, GL_BLUE, GL_ONE]),
+    4: _PixelFormat(GL_RGBA8, GL_RGBA, [GL_RED, GL_GREEN, GL_BLUE, GL_ALPHA]),
+}
+
 
 class Bitmap:
     """
     A bitmap that Imgui understands.
+
+    The storage of the texture is allocated once for each size and format (immutable storage
+    when `glTexStorage2D` is available), uploads only replace its pixels with `glTexSubImage2D`.
+    Images stored bottom-up, like `np.flipud` views of `TinyRenderer`'s frame buffers, are
+    uploaded the way they're stored, without a copy, and flipped when displayed through the
+    texture coordinates returned by `get_uvs`.
+
     Usage:
         image = Bitmap(pixels)
+        image.bind_texture()
         # inside the rendering loop:
         imgui.begin("Image")
-        imgui.image(image.get_texture_id(), image.get_width(), image.get_height())
+        uv0, uv1 = image.get_uvs()
+        imgui.image(image.get_texture_id(), image.get_width(), image.get_height(), uv0, uv1)
         imgui.end()
     """
 
-    def __init__(self, pixels: np.array):
+    def __init__(self, pixels: np.array, *, use_pbo=False):
+        """
+        :param use_pbo:
+            If `True`, pixels are uploaded through two pixel buffer objects used alternately, so
+            the driver transfers one frame to the texture while the next one is being copied.
+        """
         self._texture_id = glGenTextures(1)
         self._width = -1
         self._height = -1
         self._pixels = pixels
+        # (height, width, channels) of the allocated storage
+        self._storage_shape = None
+        self._flipped = False
+        self._use_pbo = use_pbo
+        self._pbos = None
+        self._next_pbo = 0
 
     def bind_texture(self, *, pixels: np.array = None):
         if pixels is None:
             pixels = self._pixels
+        if pixels.ndim == 2:
+            pixels = pixels[..., np.newaxis]
+        if pixels.ndim != 3:
+            raise RuntimeError("Wrong number of dimensions. Should be either 2 or 3")
+        if pixels.shape[2] not in _PIXEL_FORMATS:
+            raise RuntimeError("Wrong number of channels. Should be either 1, 2, 3, or 4")
+
+        self._flipped = pixels.strides[0] < 0
+        if self._flipped:
+            pixels = np.flipud(pixels)
+        # only copies images which aren't already contiguous bytes
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+        pixel_format = _PIXEL_FORMATS[pixels.shape[2]]
+        if pixels.shape != self._storage_shape:
+            self._allocate_storage(pixels.shape, pixel_format)
 
         glBindTexture(GL_TEXTURE_2D, self._texture_id)
         backup = glGetIntegerv(GL_UNPACK_ALIGNMENT)
         glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-
-        swizzleMask_R = [GL_RED, GL_RED, GL_RED, GL_ONE]
-        swizzleMask_RG = [GL_RED, GL_GREEN, GL_ZERO, GL_ONE]
-        swizzleMask_RGB = [GL_RED, GL_GREEN, GL_BLUE, GL_ONE]
-        swizzleMask_RGBA = [GL_RED, GL_GREEN, GL_BLUE, GL_ALPHA]
-
-        self._width = pixels.shape[1]
-        self._height = pixels.shape[0]
-
-        if pixels.ndim == 2:
-            glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzleMask_R)
-            glTexImage2D(
+        if self._use_pbo:
+            self._upload_through_pbo(pixels, pixel_format)
+        else:
+            glTexSubImage2D(
                 GL_TEXTURE_2D,
                 0,
-                GL_R8,
+                0,
+                0,
                 self._width,
                 self._height,
-                0,
-                GL_RED,
+                pixel_format.format,
                 GL_UNSIGNED_BYTE,
                 pixels,
             )
+        glPixelStorei(GL_UNPACK_ALIGNMENT, backup)
+        glBindTexture(GL_TEXTURE_2D, 0)
 
-        elif pixels.ndim == 3:
-            self._width = pixels.shape[1]
-            self._height = pixels.shape[0]
-
-            if pixels.shape[2] == 1:
-                glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzleMask_R)
-                glTexImage2D(
-                    GL_TEXTURE_2D,
-                    0,
-                    GL_R8,
-                    self._width,
-                    self._height,
-                    0,
-                    GL_RGB,
-                    GL_UNSIGNED_BYTE,
-                    pixels,
-                )
-
-            elif pixels.shape[2] == 2:
-                glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzleMask_RG)
-                glTexImage2D(
-                    GL_TEXTURE_2D,
-                    0,
-                    GL_RG8,
-                    self._width,
-                    self._height,
-                    0,
-                    GL_RG,
-                    GL_UNSIGNED_BYTE,
-                    pixels,
-                )
-
-            elif pixels.shape[2] == 3:
-                glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzleMask_RGB)
-                glTexImage2D(
-                    GL_TEXTURE_2D,
-                    0,
-                    GL_RGB8,
-                    self._width,
-                    self._height,
-                    0,
-                    GL_RGB,
-                    GL_UNSIGNED_BYTE,
-                    pixels,
-                )
-
-            elif pixels.shape[2] == 4:
-                glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzleMask_RGBA)
-                glTexImage2D(
-                    GL_TEXTURE_2D,
-                    0,
-                    GL_RGBA8,
-                    self._width,
-                    self._height,
-                    0,
-                    GL_RGBA,
-                    GL_UNSIGNED_BYTE,
-                    pixels,
-                )
-
-            else:
-                glBindTexture(GL_TEXTURE_2D, 0)
-                glPixelStorei(GL_UNPACK_ALIGNMENT, backup)
-                raise RuntimeError("Wrong number of channels. Should be either 1, 2, 3, or 4")
+    def _allocate_storage(self, shape, pixel_format: _PixelFormat):
+        """
+        (Re)allocates the texture for images of `shape`, setting its parameters.
+        """
+        height, width, _ = shape
+        immutable = bool(glTexStorage2D)
+        if immutable and self._storage_shape is not None:
+            # immutable storage can't be resized, a new texture is needed
+            glDeleteTextures(1, [self._texture_id])
+            self._texture_id = glGenTextures(1)
+
+        glBindTexture(GL_TEXTURE_2D, self._texture_id)
+        if immutable:
+            glTexStorage2D(GL_TEXTURE_2D, 1, pixel_format.internal_format, width, height)
         else:
-            glBindTexture(GL_TEXTURE_2D, 0)
-            glPixelStorei(GL_UNPACK_ALIGNMENT, backup)
-            raise RuntimeError("Wrong number of dimensions. Should be either 2 or 3")
+            glTexImage2D(
+                GL_TEXTURE_2D,
+                0,
+                pixel_format.internal_format,
+                width,
+                height,
+                0,
+                pixel_format.format,
+                GL_UNSIGNED_BYTE,
+                None,
+            )
+        glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, pixel_format.swizzle_mask)
 
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
 
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-
-        glPixelStorei(GL_UNPACK_ALIGNMENT, backup)
         glBindTexture(GL_TEXTURE_2D, 0)
 
+        self._storage_shape = shape
+        self._width = width
+        self._height = height
+
+    def _upload_through_pbo(self, pixels: np.ndarray, pixel_format: _PixelFormat):
+        if self._pbos is None:
+            self._pbos = glGenBuffers(2)
+        pbo = self._pbos[self._next_pbo]
+        self._next_pbo = 1 - self._next_pbo
+
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+        # orphaning the previous contents avoids waiting for a transfer still reading them
+        glBufferData(GL_PIXEL_UNPACK_BUFFER, pixels.nbytes, None, GL_STREAM_DRAW)
+        address = glMapBufferRange(
+            GL_PIXEL_UNPACK_BUFFER,
+            0,
+            pixels.nbytes,
+            GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT,
+        )
+        ctypes.memmove(address, pixels.ctypes.data, pixels.nbytes)
+        glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+        # with a pixel buffer bound the data argument is an offset into it
+        glTexSubImage2D(
+            GL_TEXTURE_2D,
+            0,
+            0,
+            0,
+            self._width,
+            self._height,
+            pixel_format.format,
+            GL_UNSIGNED_BYTE,
+            ctypes.c_void_p(0),
+        )
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
     def get_texture_id(self):
         return self._texture_id
 
@@ -136,5 +169,17 @@ class Bitmap:
     def get_height(self):
         return self._height
 
+    def get_uvs(self):
+        """
+        Returns the texture coordinates (uv0, uv1) of the top left and bottom right corners of
+        the image, for `imgui.image`.
+        """
+        if self._flipped:
+            return (0, 1), (1, 0)
+        return (0, 0), (1, 1)
+
     def dispose(self):
-        glDeleteTextures(1, self._texture_id)
+        glDeleteTextures(1, [self._texture_id])
+        if self._pbos is not None:
+            glDeleteBuffers(2, self._pbos)
+            self._pbos = None
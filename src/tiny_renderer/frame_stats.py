@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class FrameStats:
+    """
+    Statistics of a frame rendered by `TinyRenderer.render(..., stats=True)`: wall time of each
+    stage of the pipeline and counters of the work done.
+    """
+
+    def __init__(self):
+        # seconds spent in each stage, in the order the stages were executed
+        self.stage_times: Dict[str, float] = {}
+        self.triangles_submitted = 0
+        # triangles facing away from the camera (if culling back faces) or outside the viewport
+        self.triangles_culled = 0
+        # triangles with repeated vertices or zero area, which don't cover any pixel
+        self.triangles_degenerated = 0
+        # triangles skipped because they were behind the pixels already drawn, see
+        # `TinyRenderer.hierarchical_z`
+        self.triangles_occluded = 0
+        # pixels inside triangles whose depth was compared against the z-buffer
+        self.pixels_tested = 0
+        self.pixels_passed = 0
+        # pixels covered by at least one triangle in the final image
+        self.pixels_covered = 0
+        # whether the visibility resolved by the previous frame was shaded again instead of
+        # rasterizing the triangles, see `TinyRenderer.cache_setup`
+        self.visibility_reused = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Adds the time spent inside the `with` block to the stage `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.stage_times.values())
+
+    @property
+    def overdraw(self) -> float:
+        """
+        How many times, on average, each covered pixel was written.
+        """
+        if self.pixels_covered == 0:
+            return 0.0
+        return self.pixels_passed / self.pixels_covered
+
+    def as_dict(self) -> dict:
+        return {
+            "stage_times": dict(self.stage_times),
+            "triangles_submitted": self.triangles_submitted,
+            "triangles_culled": self.triangles_culled,
+            "triangles_degenerated": self.triangles_degenerated,
+            "triangles_occluded": self.triangles_occluded,
+            "pixels_tested": self.pixels_tested,
+            "pixels_passed": self.pixels_passed,
+            "pixels_covered": self.pixels_covered,
+            "overdraw": self.overdraw,
+            "visibility_reused": self.visibility_reused,
+        }
+
+    def __str__(self):
+        lines = [f"{name}: {seconds * 1000:.1f}ms" for name, seconds in self.stage_times.items()]
+        lines += [
+            f"Triangles submitted: {self.triangles_submitted}",
+            f"Triangles culled: {self.triangles_culled}",
+            f"Triangles degenerated: {self.triangles_degenerated}",
+            f"Triangles occluded: {self.triangles_occluded}",
+            f"Pixels tested: {self.pixels_tested}",
+            f"Pixels passed depth test: {self.pixels_passed}",
+            f"Overdraw: {self.overdraw:.2f}",
+            f"Visibility reused: {self.visibility_reused}",
+        ]
+        return "\n".join(lines)
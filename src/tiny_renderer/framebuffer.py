@@ -0,0 +1,193 @@
+"""
+Frame buffers of `TinyRenderer`, allocated once and cleared in place for every frame.
+
+Rendering thousands of frames (see `tiny_renderer.render`) would otherwise allocate and release
+an image, a z buffer and the deferred shading buffers for each of them. The z buffer can store
+distances with less precision than the default double precision: single precision or integer
+levels of 16 or 24 bits, see `DepthFormat`. Which distance is stored is chosen by `DepthMetric`.
+"""
+from enum import IntEnum
+from typing import Optional
+
+import numpy as np
+
+from tiny_renderer.rasterizer import DepthEncoding, FrameBuffers
+
+
+class DepthFormat(IntEnum):
+    """
+    How `FrameBuffer` stores distances to the camera. Integer formats split the range of
+    distances (see `FrameBuffer.set_depth_range`) into levels, pixels closer than one level apart
+    may be drawn in the wrong order.
+    """
+
+    Float64 = 0
+    Float32 = 1
+    UInt16 = 2
+    UInt24 = 3
+
+    @classmethod
+    def get_caption(cls, index):
+        captions = {
+            cls.Float64: "64-bit float",
+            cls.Float32: "32-bit float",
+            cls.UInt16: "16-bit integer",
+            cls.UInt24: "24-bit integer",
+        }
+        return captions[index]
+
+    @classmethod
+    def get_captions(cls):
+        return [DepthFormat.get_caption(i) for i in DepthFormat]
+
+
+class DepthMetric(IntEnum):
+    """
+    Which distance to the camera `FrameBuffer` stores for each pixel. `Distance` is the euclidean
+    distance from the camera to the pixel, with its depth rounded. `ScreenZ` is the distance along
+    the z axis (the direction of the orthographic projection) of the interpolated depth: cheaper,
+    without any square root, and exact for the order of the pixels of a screen space column.
+    """
+
+    Distance = 0
+    ScreenZ = 1
+
+    @classmethod
+    def get_caption(cls, index):
+        captions = {
+            cls.Distance: "Distance to camera",
+            cls.ScreenZ: "Screen space z",
+        }
+        return captions[index]
+
+    @classmethod
+    def get_captions(cls):
+        return [DepthMetric.get_caption(i) for i in DepthMetric]
+
+
+# dtype of the z buffer and value of empty pixels for each format, 24 bit levels are stored in
+# 32 bit integers
+_DEPTH_STORAGE = {
+    DepthFormat.Float64: (np.float64, np.inf),
+    DepthFormat.Float32: (np.float32, np.inf),
+    DepthFormat.UInt16: (np.uint16, (1 << 16) - 1),
+    DepthFormat.UInt24: (np.uint32, (1 << 24) - 1),
+}
+
+
+class FrameBuffer:
+    """
+    The image, z buffer and (optionally) the face and weights buffers used by deferred shading
+    (see `tiny_renderer.rasterizer`) of a `width` x `height` frame.
+
+    Rows are stored bottom-up, like screen space coordinates, `get_image` returns a top-down view
+    without copying the image.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        depth_format: DepthFormat = DepthFormat.Float64,
+        *,
+        buffers: Optional[FrameBuffers] = None,
+    ):
+        """
+        :param buffers:
+            Existing buffers to use instead of allocating them, like the buffers in shared memory
+            of `tiny_renderer.tiles.SharedFrameBuffers`. The z buffer must have the dtype of
+            `depth_format` (see `get_depth_dtype`).
+        """
+        self.width = width
+        self.height = height
+        self.depth_format = DepthFormat(depth_format)
+        dtype, self._empty_depth = _DEPTH_STORAGE[self.depth_format]
+        if buffers is None:
+            buffers = FrameBuffers(
+                np.zeros((height, width, 3), np.uint8),
+                np.full((height, width), self._empty_depth, dtype),
+                None,
+                None,
+            )
+        elif buffers.z_buffer.dtype != dtype:
+            raise ValueError(f"The z buffer of {self.depth_format.name} depth must be {dtype}")
+        self.buffers = buffers
+        self.depth_metric = DepthMetric.Distance
+        self.depth_encoding = DepthEncoding(
+            0.0, 0.0, self.depth_format == DepthFormat.Float32, False
+        )
+        self.set_depth_range(1.0)
+
+    @classmethod
+    def get_depth_dtype(cls, depth_format: DepthFormat):
+        return _DEPTH_STORAGE[DepthFormat(depth_format)][0]
+
+    @property
+    def image(self) -> np.ndarray:
+        return self.buffers.image
+
+    @property
+    def z_buffer(self) -> np.ndarray:
+        return self.buffers.z_buffer
+
+    def set_depth_range(self, far: float):
+        """
+        Sets the largest distance stored by integer formats, farther pixels are stored at the
+        last level. Doesn't change anything for floating point formats.
+        """
+        if self.depth_format in (DepthFormat.UInt16, DepthFormat.UInt24):
+            max_level = float(self._empty_depth - 1)
+            self.depth_encoding = self.depth_encoding._replace(
+                scale=max_level / far, max_level=max_level
+            )
+
+    def set_depth_metric(self, depth_metric: DepthMetric):
+        """
+        Sets which distance to the camera is stored, see `DepthMetric`. Clear the buffers before
+        drawing with a different metric.
+        """
+        self.depth_metric = DepthMetric(depth_metric)
+        self.depth_encoding = self.depth_encoding._replace(
+            screen_z=self.depth_metric == DepthMetric.ScreenZ
+        )
+
+    def clear(self, *, deferred=False):
+        """
+        Clears the image and the z buffer in place.
+
+        :param deferred:
+            If `True` the face and weights buffers used by deferred shading are allocated, if
+            needed, and the face buffer is cleared.
+        """
+        image, z_buffer, face_buffer, weights_buffer = self.buffers
+        image.fill(0)
+        z_buffer.fill(self._empty_depth)
+        if deferred:
+            if face_buffer is None:
+                face_buffer = np.empty((self.height, self.width), np.int64)
+                weights_buffer = np.zeros((self.height, self.width, 3))
+                self.buffers = FrameBuffers(image, z_buffer, face_buffer, weights_buffer)
+            face_buffer.fill(-1)
+
+    def count_covered_pixels(self) -> int:
+        """
+        Returns the number of pixels drawn since the buffers were cleared.
+        """
+        return int(np.count_nonzero(self.buffers.z_buffer != self._empty_depth))
+
+    def get_image(self) -> np.ndarray:
+        """
+        Returns a (H,W,3) view of the image with the first row at the top. It's overwritten by
+        the next frame, copy it to keep it.
+        """
+        return np.flipud(self.buffers.image)
+
+    def copy(self) -> "FrameBuffer":
+        """
+        Returns a `FrameBuffer` with copies of the image and z buffer.
+        """
+        buffers = FrameBuffers(self.buffers.image.copy(), self.buffers.z_buffer.copy(), None, None)
+        result = FrameBuffer(self.width, self.height, self.depth_format, buffers=buffers)
+        result.depth_metric = self.depth_metric
+        result.depth_encoding = self.depth_encoding
+        return result
@@ -0,0 +1,182 @@
+"""
+Hierarchical z buffer used by `TinyRenderer` to skip occluded triangles before rasterizing them.
+
+The z buffer is split into `TILE_SIZE` x `TILE_SIZE` tiles and the largest distance stored in each
+of them is kept up to date as triangles are drawn. A triangle whose nearest possible distance is
+farther than the largest distance of every tile its bounding box overlaps can't pass the depth
+test of any of its pixels, so it's skipped without computing any barycentric weight or distance.
+The test is conservative: skipped triangles wouldn't have changed any pixel, the image is the same
+as without it.
+"""
+from math import ceil, floor, sqrt
+from typing import Optional, Tuple
+
+import numpy as np
+
+TILE_SIZE = 8
+
+# lower bounds of distances are reduced by this relative margin, so the different ways backends
+# compute (and round) distances can't make a bound larger than the distance of a pixel
+_MARGIN = 1e-9
+
+
+class HierarchicalZ:
+    """
+    Largest distance of each tile of a region of a z buffer, plus a pyramid of coarser levels
+    (each texel is the largest of 2 x 2 texels of the previous level) used to test many faces at
+    once, see `max_depths`.
+    """
+
+    def __init__(
+        self,
+        z_buffer: np.ndarray,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        *,
+        tile_size: int = TILE_SIZE,
+    ):
+        """
+        :param z_buffer:
+            (H,W) z buffer, it's read by `update`.
+        :param region:
+            (min_x, min_y, max_x, max_y) region of the z buffer covered by the tiles, the whole
+            buffer by default. Tiles are aligned to the buffer, not to the region.
+        """
+        height, width = z_buffer.shape
+        if region is None:
+            region = (0, 0, width - 1, height - 1)
+        self._z_buffer = z_buffer
+        self.tile_size = tile_size
+        min_x, min_y, max_x, max_y = (int(x) for x in region)
+        self._first_column, self._first_row = min_x // tile_size, min_y // tile_size
+        columns = max_x // tile_size - self._first_column + 1
+        rows = max_y // tile_size - self._first_row + 1
+        self.tiles = np.empty((rows, columns), z_buffer.dtype)
+        self._pyramid = None
+        self.update(region)
+
+    def _tile_range(self, box):
+        """
+        Returns the (first_column, first_row, last_column, last_row) tiles of a box, clipped to the
+        tiles of this `HierarchicalZ`. It's called for every triangle drawn by the "python"
+        backend, so it avoids numpy functions, much slower with numbers.
+        """
+        rows, columns = self.tiles.shape
+        tile_size = self.tile_size
+        min_x, min_y, max_x, max_y = box
+        return (
+            min(max(int(min_x) // tile_size - self._first_column, 0), columns - 1),
+            min(max(int(min_y) // tile_size - self._first_row, 0), rows - 1),
+            min(max(int(max_x) // tile_size - self._first_column, 0), columns - 1),
+            min(max(int(max_y) // tile_size - self._first_row, 0), rows - 1),
+        )
+
+    def _tile_ranges(self, boxes: np.ndarray):
+        """
+        `_tile_range` of (F,4) `boxes`.
+        """
+        rows, columns = self.tiles.shape
+        tile_size = self.tile_size
+        return (
+            np.clip(boxes[:, 0] // tile_size - self._first_column, 0, columns - 1),
+            np.clip(boxes[:, 1] // tile_size - self._first_row, 0, rows - 1),
+            np.clip(boxes[:, 2] // tile_size - self._first_column, 0, columns - 1),
+            np.clip(boxes[:, 3] // tile_size - self._first_row, 0, rows - 1),
+        )
+
+    def update(self, box: Tuple[int, int, int, int]):
+        """
+        Reads the z buffer again for the tiles overlapping the (min_x, min_y, max_x, max_y) `box`.
+        """
+        first_column, first_row, last_column, last_row = self._tile_range(box)
+        tile_size = self.tile_size
+        height, width = self._z_buffer.shape
+        x0 = (first_column + self._first_column) * tile_size
+        y0 = (first_row + self._first_row) * tile_size
+        x1 = min((last_column + self._first_column + 1) * tile_size, width)
+        y1 = min((last_row + self._first_row + 1) * tile_size, height)
+        block = self._z_buffer[y0:y1, x0:x1]
+        block = np.maximum.reduceat(block, np.arange(0, y1 - y0, tile_size), axis=0)
+        block = np.maximum.reduceat(block, np.arange(0, x1 - x0, tile_size), axis=1)
+        self.tiles[first_row : last_row + 1, first_column : last_column + 1] = block
+        self._pyramid = None
+
+    def max_depth(self, box: Tuple[int, int, int, int]):
+        """
+        Returns the largest distance stored in the tiles overlapping the (min_x, min_y, max_x,
+        max_y) `box`.
+        """
+        first_column, first_row, last_column, last_row = self._tile_range(box)
+        return self.tiles[first_row : last_row + 1, first_column : last_column + 1].max()
+
+    def max_depths(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Returns upper bounds of `max_depth` for each of the (F,4) `boxes`: the largest distance of
+        the (at most 2 x 2) texels of the first level of the pyramid whose texels are as large as
+        a box.
+        """
+        first_column, first_row, last_column, last_row = self._tile_ranges(boxes)
+        extent = np.maximum(last_column - first_column, last_row - first_row) + 1
+        level = np.ceil(np.log2(extent)).astype(np.int64)
+
+        pyramid = self._get_pyramid()
+        result = np.empty(len(boxes), self.tiles.dtype)
+        for i in np.unique(level):
+            faces = np.flatnonzero(level == i)
+            texels = pyramid[i]
+            x0, x1 = first_column[faces] >> i, last_column[faces] >> i
+            y0, y1 = first_row[faces] >> i, last_row[faces] >> i
+            result[faces] = np.maximum(
+                np.maximum(texels[y0, x0], texels[y0, x1]),
+                np.maximum(texels[y1, x0], texels[y1, x1]),
+            )
+        return result
+
+    def _get_pyramid(self):
+        if self._pyramid is None:
+            self._pyramid = [self.tiles]
+            while self._pyramid[-1].shape != (1, 1):
+                texels = self._pyramid[-1]
+                texels = np.maximum.reduceat(texels, np.arange(0, texels.shape[0], 2), axis=0)
+                texels = np.maximum.reduceat(texels, np.arange(0, texels.shape[1], 2), axis=1)
+                self._pyramid.append(texels)
+        return self._pyramid
+
+
+def nearest_distance(
+    box: Tuple[int, int, int, int], min_z: float, max_z: float, camera, *, screen_z=False
+) -> float:
+    """
+    Returns a lower bound of the distance to `camera` ((3,) sequence) of the pixels of a triangle
+    inside the (min_x, min_y, max_x, max_y) `box`, with depths between `min_z` and `max_z`.
+
+    :param screen_z:
+        If `True` the bound of the distance along the z axis, see
+        `tiny_renderer.framebuffer.DepthMetric`.
+    """
+    min_x, min_y, max_x, max_y = box
+    # depths are rounded to the nearest integer, unless measured along the z axis, then they
+    # may be off by rounding errors of the interpolation
+    slack = 1.0 if screen_z else 0.0
+    dz = max(floor(min_z) - slack - camera[2], camera[2] - ceil(max_z) - slack, 0.0)
+    if screen_z:
+        return dz * (1 - _MARGIN)
+    dx = max(min_x - camera[0], camera[0] - max_x, 0.0)
+    dy = max(min_y - camera[1], camera[1] - max_y, 0.0)
+    return sqrt(dx * dx + dy * dy + dz * dz) * (1 - _MARGIN)
+
+
+def nearest_distances(
+    triangles: np.ndarray, boxes: np.ndarray, camera: np.ndarray, *, screen_z=False
+) -> np.ndarray:
+    """
+    `nearest_distance` of (F,3,3) screen space `triangles` inside their (F,4) `boxes`.
+    """
+    z = triangles[:, :, 2]
+    slack = 1.0 if screen_z else 0.0
+    low = np.stack([boxes[:, 0], boxes[:, 1], np.floor(z.min(axis=1)) - slack], axis=1)
+    high = np.stack([boxes[:, 2], boxes[:, 3], np.ceil(z.max(axis=1)) + slack], axis=1)
+    delta = np.maximum(np.maximum(low - camera, camera - high), 0.0)
+    dx, dy, dz = delta[:, 0], delta[:, 1], delta[:, 2]
+    if screen_z:
+        return dz * (1 - _MARGIN)
+    return np.sqrt(dx * dx + dy * dy + dz * dz) * (1 - _MARGIN)
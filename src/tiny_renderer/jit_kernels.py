@@ -0,0 +1,228 @@
+"""
+Optional Numba compiled versions of the per pixel loops of the "python" backend of
+`TinyRenderer` (`draw_triangle` and `draw_line`).
+
+The kernels operate directly on the image, z-buffer and texture arrays and do their floating
+point operations in the same order as the Python code, so they produce the same pixels. Numba
+isn't a requirement: when it can't be imported `AVAILABLE` is `False` and the kernels are plain
+(slow) Python functions, `TinyRenderer` then uses its own Python loops instead. Compiled kernels
+are cached on disk (`cache=True`), so only the first run pays for the compilation.
+"""
+from math import floor, sqrt
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+AVAILABLE = numba is not None
+
+
+def _jit(function):
+    if numba is None:  # pragma: no cover
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def encode_depth(distance, depth_scale, depth_max_level, depth_float32):
+    """
+    `rasterizer.encode_depth` with the fields of a `rasterizer.DepthEncoding` as arguments.
+    """
+    if depth_scale != 0.0:
+        return min(float(floor(distance * depth_scale)), depth_max_level)
+    if depth_float32:
+        return float(np.float32(distance))
+    return distance
+
+
+@_jit
+def draw_triangle(
+    image,
+    z_buffer,
+    vertices,
+    uvs,
+    normals,
+    light_direction,
+    camera,
+    color,
+    flat_normal,
+    texture,
+    texturized,
+    repeat_texture,
+    smooth,
+    box,
+    depth_scale,
+    depth_max_level,
+    depth_float32,
+    depth_screen_z,
+):
+    """
+    The pixel loop of `TinyRenderer.draw_triangle` for `RasterizationStrategy.BoundingBox`.
+
+    :param image:
+        (H,W,3) uint8 image, updated in place.
+    :param z_buffer:
+        (H,W) distances to the camera, updated in place.
+    :param vertices:
+        (3,3) screen space vertices, x and y are integers.
+    :param uvs:
+        (3,2) texture coordinates of the vertices, used if `texturized`.
+    :param normals:
+        (3,3) normals of the vertices, used if `smooth`.
+    :param color:
+        (3,) color of the triangle, used if not `texturized`.
+    :param flat_normal:
+        (3,) normal of the triangle, used if not `smooth`.
+    :param texture:
+        (TH,TW,3) RGB texture, sampled at the nearest texel.
+    :param repeat_texture:
+        If texture coordinates outside of [0, 1] repeat the texture, otherwise they're clamped to
+        its border, see `TextureWrap`.
+    :param box:
+        (min_x, min_y, max_x, max_y) bounding box of the triangle, clipped to the image.
+    :param depth_scale:
+        With `depth_max_level`, `depth_float32` and `depth_screen_z`, how distances are stored in
+        `z_buffer`, see `encode_depth` and `rasterizer.camera_depth`.
+    :return:
+        The number of pixels depth tested and passed.
+    """
+    x0, y0, z0 = vertices[0, 0], vertices[0, 1], vertices[0, 2]
+    x1, y1, z1 = vertices[1, 0], vertices[1, 1], vertices[1, 2]
+    x2, y2, z2 = vertices[2, 0], vertices[2, 1], vertices[2, 2]
+    denominator = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+    if denominator == 0:
+        return 0, 0
+
+    texture_height, texture_width = texture.shape[0], texture.shape[1]
+    r, g, b = color[0], color[1], color[2]
+    nx, ny, nz = flat_normal[0], flat_normal[1], flat_normal[2]
+    tested = passed = 0
+    for y in range(box[1], box[3] + 1):
+        for x in range(box[0], box[2] + 1):
+            w1 = ((y1 - y2) * (x - x2) + (x2 - x1) * (y - y2)) / denominator
+            w2 = ((y2 - y0) * (x - x2) + (x0 - x2) * (y - y2)) / denominator
+            w3 = 1 - w1 - w2
+            if w1 < 0 or w2 < 0 or w3 < 0:
+                continue
+
+            z = z0 * w1 + z1 * w2 + z2 * w3
+            tested += 1
+            if depth_screen_z:
+                distance_to_camera = abs(z - camera[2])
+            else:
+                dx, dy, dz = x - camera[0], y - camera[1], round(z) - camera[2]
+                distance_to_camera = sqrt(dx * dx + dy * dy + dz * dz)
+            distance_to_camera = encode_depth(
+                distance_to_camera, depth_scale, depth_max_level, depth_float32
+            )
+            if distance_to_camera > z_buffer[y, x]:
+                continue
+            passed += 1
+            z_buffer[y, x] = distance_to_camera
+
+            if texturized:
+                u = uvs[0, 0] * w1 + uvs[1, 0] * w2 + uvs[2, 0] * w3
+                v = uvs[0, 1] * w1 + uvs[1, 1] * w2 + uvs[2, 1] * w3
+                u_index, v_index = round(u * texture_width), round(v * texture_height)
+                if repeat_texture:
+                    u_index, v_index = u_index % texture_width, v_index % texture_height
+                else:
+                    u_index = min(max(u_index, 0), texture_width - 1)
+                    v_index = min(max(v_index, 0), texture_height - 1)
+                r = texture[v_index, u_index, 0]
+                g = texture[v_index, u_index, 1]
+                b = texture[v_index, u_index, 2]
+            if smooth:
+                nx = normals[0, 0] * w1 + normals[1, 0] * w2 + normals[2, 0] * w3
+                ny = normals[0, 1] * w1 + normals[1, 1] * w2 + normals[2, 1] * w3
+                nz = normals[0, 2] * w1 + normals[1, 2] * w2 + normals[2, 2] * w3
+
+            light_intensity = abs(
+                light_direction[0] * nx + light_direction[1] * ny + light_direction[2] * nz
+            )
+            image[y, x, 0] = r * light_intensity
+            image[y, x, 1] = g * light_intensity
+            image[y, x, 2] = b * light_intensity
+    return tested, passed
+
+
+@_jit
+def draw_line(
+    image,
+    z_buffer,
+    x0,
+    y0,
+    z0,
+    x1,
+    y1,
+    z1,
+    c0,
+    c1,
+    camera,
+    depth_scale,
+    depth_max_level,
+    depth_float32,
+    depth_screen_z,
+):
+    """
+    `TinyRenderer.draw_line` from (x0, y0, z0) to (x1, y1, z1), x and y are integers. Colors
+    `c0` and `c1` are (3,) arrays, pixels outside of the image are ignored. Distances are stored
+    in `z_buffer` as described by the `depth_*` arguments, see `encode_depth` and
+    `rasterizer.camera_depth`.
+    """
+    if x0 == x1 and y0 == y1 and z0 == z1:
+        # This is a point, not a line.
+        return
+
+    steep = False
+    if abs(x0 - x1) < abs(y0 - y1):
+        x0, y0 = y0, x0
+        x1, y1 = y1, x1
+        steep = True
+
+    dx, dy = abs(x0 - x1), abs(y0 - y1)
+    if x0 > x1:
+        x0, y0, z0, x1, y1, z1 = x1, y1, z1, x0, y0, z0
+        c0, c1 = c1, c0
+    distance_v0_v1 = sqrt(dx * dx + dy * dy)
+    if dx == 0:
+        dx = 0.000001  # just to prevent zero division error
+    d_error = abs(dy / dx)
+
+    height, width = z_buffer.shape[0], z_buffer.shape[1]
+    dz = abs(z0 - z1)
+    error = 0.0
+    y = y0
+    for x in range(x0, x1 + 1):
+        ex, ey = abs(x - x0), abs(y - y0)
+        percentage = sqrt(ex * ex + ey * ey) / distance_v0_v1
+        z = z0 + (dz * percentage)
+        cx, cy, cz = abs(x - camera[0]), abs(y - camera[1]), abs(z - camera[2])
+        if depth_screen_z:
+            distance_to_camera = cz
+        else:
+            distance_to_camera = sqrt(cx * cx + cy * cy + cz * cz)
+        distance_to_camera = encode_depth(
+            distance_to_camera, depth_scale, depth_max_level, depth_float32
+        )
+
+        # if transposed, de−transpose
+        pixel_x, pixel_y = (y, x) if steep else (x, y)
+        if steep:
+            c0, c1 = c1, c0
+
+        inside = 0 <= pixel_x < width and 0 <= pixel_y < height
+        if inside and distance_to_camera < z_buffer[pixel_y, pixel_x]:
+            z_buffer[pixel_y, pixel_x] = distance_to_camera
+            for channel in range(3):
+                image[pixel_y, pixel_x, channel] = c0[channel] * percentage + c1[channel] * (
+                    1 - percentage
+                )
+
+        error += d_error
+        if error > 0.5:
+            y += 1 if y1 > y0 else -1
+            error -= 1
@@ -0,0 +1,179 @@
+"""
+On-disk cache of parsed `Model` arrays.
+
+Parsing an .obj file is slow, so the arrays of a parsed `Model` are stored as raw `.npy` files
+which are loaded with `np.load(mmap_mode="r")`: loading a cached model is almost instant and
+processes loading the same model share the same memory pages.
+
+Each source file gets its own directory inside the cache directory (by default `.mesh_cache`
+next to the source file) keyed by the source path, containing one `.npy` file per array and a
+`meta.json` with the size, modification time and content hash of the source. A cache entry is
+used only if the source size and modification time didn't change; if only the modification time
+changed (the file was touched or copied) the content hash decides.
+
+Usage:
+    model = mesh_cache.load_model("african_head.obj")
+    # after the cached arrays were, for some reason, changed or corrupted:
+    mesh_cache.invalidate("african_head.obj")
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from tiny_renderer.model import Model
+
+# 2: faces without normals get the normal of the face, see `Model.load_from_obj`
+CACHE_VERSION = 2
+CACHE_DIR_NAME = ".mesh_cache"
+
+_ARRAYS = (
+    "vertices",
+    "faces",
+    "uvs",
+    "texture_coordinates_indexes",
+    "normals",
+    "normal_indexes",
+)
+
+
+def get_cache_path(filename: Union[str, Path], cache_dir: Union[str, Path] = None) -> Path:
+    """
+    Returns the directory where the arrays of the model `filename` are cached.
+    """
+    filename = Path(filename).resolve()
+    if cache_dir is None:
+        cache_dir = filename.parent / CACHE_DIR_NAME
+    key = hashlib.sha1(str(filename).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"{filename.stem}-{key}"
+
+
+def _content_hash(filename: Path) -> str:
+    sha = hashlib.sha256()
+    with open(filename, mode="rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _read_meta(cache_path: Path):
+    try:
+        return json.loads((cache_path / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_path: Path, meta: dict):
+    (cache_path / "meta.json").write_text(json.dumps(meta, indent=2))
+
+
+def _is_valid(filename: Path, cache_path: Path) -> bool:
+    meta = _read_meta(cache_path)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    if not all((cache_path / f"{name}.npy").is_file() for name in _ARRAYS):
+        return False
+
+    stat = filename.stat()
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] != stat.st_mtime_ns:
+        if meta["sha256"] != _content_hash(filename):
+            return False
+        meta["mtime_ns"] = stat.st_mtime_ns
+        _write_meta(cache_path, meta)
+    return True
+
+
+def build(filename: Union[str, Path], cache_dir: Union[str, Path] = None) -> Path:
+    """
+    Parses `filename` and (re)writes its cache entry, returns the cache directory of the entry.
+    """
+    filename = Path(filename).resolve()
+    cache_path = get_cache_path(filename, cache_dir)
+    stat = filename.stat()
+    model = Model()
+    model.load_from_obj(filename)
+
+    # write to a temporary directory first, so other processes never see a partial entry
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(dir=cache_path.parent, prefix=f".{cache_path.name}-"))
+    try:
+        for name in _ARRAYS:
+            np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(getattr(model, name)))
+        meta = {
+            "version": CACHE_VERSION,
+            "source": str(filename),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": _content_hash(filename),
+        }
+        _write_meta(tmp_path, meta)
+        _replace_entry(tmp_path, cache_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return cache_path
+
+
+def _replace_entry(tmp_path: Path, cache_path: Path):
+    """
+    Moves the entry written to `tmp_path` to `cache_path`. `os.replace` can't replace a non-empty
+    directory, so an existing entry is renamed aside first (readers keep seeing it until then)
+    and removed afterwards. If another process writes its entry in between, that one is kept:
+    both were built from the same source.
+    """
+    try:
+        os.replace(tmp_path, cache_path)
+        return
+    except OSError:
+        if not cache_path.exists():
+            raise
+
+    old_path = Path(tempfile.mkdtemp(dir=cache_path.parent, prefix=f".{cache_path.name}-old-"))
+    try:
+        try:
+            os.replace(cache_path, old_path / cache_path.name)
+        except FileNotFoundError:
+            # already moved aside by another process
+            pass
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if not cache_path.exists():
+                raise
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    finally:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def invalidate(filename: Union[str, Path], cache_dir: Union[str, Path] = None) -> bool:
+    """
+    Removes the cache entry of `filename`, returns `True` if there was one.
+    """
+    cache_path = get_cache_path(filename, cache_dir)
+    if not cache_path.exists():
+        return False
+    shutil.rmtree(cache_path)
+    return True
+
+
+def load_model(
+    filename: Union[str, Path], *, cache_dir: Union[str, Path] = None, rebuild: bool = False
+) -> Model:
+    """
+    Returns the `Model` of `filename` with memory-mapped (read-only) arrays, parsing the file and
+    creating its cache entry only if there's no valid one (or if `rebuild` is `True`).
+    """
+    filename = Path(filename).resolve()
+    cache_path = get_cache_path(filename, cache_dir)
+    if rebuild or not _is_valid(filename, cache_path):
+        build(filename, cache_dir)
+
+    arrays = {name: np.load(cache_path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+    return Model.from_arrays(**arrays)
@@ -1,12 +1,30 @@
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import numpy as np
+
+import batch_math
 from math_utils import Vec2, Vec3
+from tiny_renderer.obj_parser import parse_obj
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """
+    Returns a read-only view (no copy) of `array`.
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
 
 
 class Model:
     """
-    Represents a 3D model
+    Represents a 3D model.
+
+    Data is stored as contiguous arrays (structure of arrays): float32 (V,3) positions, (T,2) uvs,
+    (N,3) normals and int32 (F,3) indexes of the vertices, uvs and normals of each face. The
+    arrays are available (without copies) through `vertices`, `uvs`, `normals`, `faces`,
+    `texture_coordinates_indexes` and `normal_indexes`.
     """
 
     VERTEX = "v"
@@ -16,45 +34,121 @@ class Model:
     FACE = "f"
 
     def __init__(self):
-        self._verts = []
-        self._faces = []
+        self._verts = np.zeros((0, 3), np.float32)
+        self._faces = np.zeros((0, 3), np.int32)
         # texture coordinates for each vertex of a face (triangle), each index here,  refers to a
         # (u,v) coordinate in `self._uvs`
-        self._texture_coordinates_indexes = []
-        self._uvs = []
-        self._normals = []
-        # list of tuples where each tuple contains 3 indexes representing positions at `self._normals`
-        # where the actual normals of a given vertex (from a given face) is stored
-        self._normal_indexes = []
+        self._texture_coordinates_indexes = np.zeros((0, 3), np.int32)
+        self._uvs = np.zeros((0, 2), np.float32)
+        self._normals = np.zeros((0, 3), np.float32)
+        # each row contains 3 indexes representing positions at `self._normals` where the actual
+        # normals of a given vertex (from a given face) is stored
+        self._normal_indexes = np.zeros((0, 3), np.int32)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        vertices: np.ndarray,
+        faces: np.ndarray,
+        uvs: np.ndarray,
+        texture_coordinates_indexes: np.ndarray,
+        normals: np.ndarray,
+        normal_indexes: np.ndarray,
+    ) -> "Model":
+        """
+        Creates a model using the given arrays as storage (they're not copied, so they may be
+        memory-mapped), see the class docstring for the expected shapes and types.
+        """
+        model = cls()
+        model._verts = vertices
+        model._faces = faces
+        model._uvs = uvs
+        model._texture_coordinates_indexes = texture_coordinates_indexes
+        model._normals = normals
+        model._normal_indexes = normal_indexes
+        return model
+
+    @property
+    def vertices(self) -> np.ndarray:
+        """
+        (V,3) float32 positions
+        """
+        return _read_only(self._verts)
+
+    @property
+    def faces(self) -> np.ndarray:
+        """
+        (F,3) int32 indexes into `vertices`
+        """
+        return _read_only(self._faces)
+
+    @property
+    def uvs(self) -> np.ndarray:
+        """
+        (T,2) float32 texture coordinates
+        """
+        return _read_only(self._uvs)
+
+    @property
+    def texture_coordinates_indexes(self) -> np.ndarray:
+        """
+        (F,3) int32 indexes into `uvs`, -1 for faces without texture coordinates
+        """
+        return _read_only(self._texture_coordinates_indexes)
+
+    @property
+    def untextured_faces(self) -> np.ndarray:
+        """
+        (F,) `True` for the faces without texture coordinates (like "f 1 2 3" or "f 1//1 2//2 3//3"
+        in .obj files), they're drawn white in `RenderingMode.Texturized`.
+        """
+        return (self._texture_coordinates_indexes < 0).any(axis=1)
+
+    @property
+    def normals(self) -> np.ndarray:
+        """
+        (N,3) float32 unitary normals
+        """
+        return _read_only(self._normals)
+
+    @property
+    def normal_indexes(self) -> np.ndarray:
+        """
+        (F,3) int32 indexes into `normals`
+        """
+        return _read_only(self._normal_indexes)
 
     def get_vertex_at(self, index):
-        return self._verts[index]
+        return tuple(self._verts[index].tolist())
 
     def get_face_at(self, index):
-        return self._faces[index]
+        return tuple(self._faces[index].tolist())
 
     def get_normal_as_vec3(self, index):
-        return self._normals[index]
+        return Vec3(*self._normals[index].tolist())
 
     def get_normals_from_face(self, face_index) -> List[Vec3]:
         """
         Returns a list of normals (they're already unitary vectors)
         """
         indexes = self._normal_indexes[face_index]
-        return [self._normals[i] for i in indexes]
+        return [Vec3(*n) for n in self._normals[indexes].tolist()]
 
     def get_uv_at(self, index):
-        return self._uvs[index]
+        return Vec2(*self._uvs[index].tolist())
 
     def get_texture_coordinate_index_at(self, index):
-        return self._texture_coordinates_indexes[index]
+        return tuple(self._texture_coordinates_indexes[index].tolist())
 
-    def get_uvs_from_face(self, index) -> List[tuple]:
+    def get_uvs_from_face(self, index) -> Optional[List[Vec2]]:
         """
-        Returns a list of (u,v) tuples for each vertex of face indexed by `index`
+        Returns a list of (u,v) `Vec2` for each vertex of face indexed by `index`, `None` if the
+        face doesn't have texture coordinates
         """
-        indexes = self.get_texture_coordinate_index_at(index)
-        return [self._uvs[i] for i in indexes]
+        indexes = self._texture_coordinates_indexes[index]
+        if (indexes < 0).any():
+            return None
+        return [Vec2(*uv) for uv in self._uvs[indexes].tolist()]
 
     def num_faces(self):
         return len(self._faces)
@@ -95,40 +189,33 @@ class Model:
 
         Line element:
         l 5 8 1 2 4 9
+
+        The file is parsed in chunks by `tiny_renderer.obj_parser.parse_obj`, polygons with more
+        than 3 vertices are split into triangles. Faces without normals get the normal of the
+        face for all their vertices (see `_add_face_normals`), so they're always drawn flat.
+        """
+        arrays = parse_obj(Path(filename))
+
+        vertices = arrays.vertices
+        vertices[:, 2] *= -1
+        self._verts = vertices.astype(np.float32)
+        self._faces = arrays.faces
+        self._texture_coordinates_indexes = arrays.texture_coordinates_indexes
+        self._uvs = arrays.uvs.astype(np.float32)
+        self._normals = arrays.normals.astype(np.float32)
+        self._normal_indexes = arrays.normal_indexes
+        self._add_face_normals()
+
+    def _add_face_normals(self):
+        """
+        Appends the normals of the faces without normals to `normals` and points the
+        `normal_indexes` of their 3 vertices to them.
         """
-        filename = Path(filename)
-        with open(filename, mode="r") as f:
-            lines = f.readlines()
-
-        for line in lines:
-            line_split = line.split()
-            if not line_split:
-                continue
-            line_type = line_split[0]
-
-            if line_type == Model.VERTEX:
-                self._verts.append(
-                    (float(line_split[1]), float(line_split[2]), float(line_split[3]) * -1)
-                )
-            elif line_type == Model.FACE:
-                vert_tex_norm = line_split[1:]  # vertex/texture/normal
-                assert len(vert_tex_norm) == 3
-
-                # Using -1 because they're 1-based:
-                vertex_indexes = tuple([int(v.split("/")[0]) - 1 for v in vert_tex_norm])
-                self._faces.append(vertex_indexes)
-
-                texture_coordinates = tuple([int(tex.split("/")[1]) - 1 for tex in vert_tex_norm])
-                self._texture_coordinates_indexes.append(texture_coordinates)
-
-                normal_indexes = tuple([int(n.split("/")[2]) - 1 for n in vert_tex_norm])
-                self._normal_indexes.append(normal_indexes)
-            elif line_type == Model.UV:
-                u, v, _ = line_split[1:]
-                self._uvs.append(Vec2(float(u), float(v)))
-            elif line_type == Model.NORMAL:
-                self._normals.append(
-                    Vec3(
-                        float(line_split[1]), float(line_split[2]), float(line_split[3])
-                    ).normalized()
-                )
+        missing = np.flatnonzero((self._normal_indexes < 0).any(axis=1))
+        if len(missing) == 0:
+            return
+        p0, p1, p2 = np.moveaxis(self._verts[self._faces[missing]].astype(np.float64), 1, 0)
+        # same orientation as the flat normals of `TinyRenderer`, null for degenerated faces
+        normals = np.nan_to_num(batch_math.normalize(np.cross(p2 - p0, p1 - p0)))
+        self._normal_indexes[missing] = (len(self._normals) + np.arange(len(missing)))[:, None]
+        self._normals = np.concatenate([self._normals, normals.astype(np.float32)])
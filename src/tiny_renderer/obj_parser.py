@@ -0,0 +1,223 @@
+"""
+Streaming parser for wavefront .obj files.
+
+The file is read in chunks of `CHUNK_SIZE` characters, so memory usage doesn't depend on the file
+size. Each chunk is split by record type with regular expressions and every record type is then
+converted in bulk with NumPy into growable typed arrays, instead of splitting one line at a time.
+"""
+import re
+import warnings
+from collections import namedtuple
+from itertools import repeat
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+import batch_math
+
+CHUNK_SIZE = 1 << 24
+
+ObjArrays = namedtuple(
+    "ObjArrays", "vertices uvs normals faces texture_coordinates_indexes normal_indexes"
+)
+
+# patterns start with a literal newline (the parsed text is prefixed with one) which is a lot
+# faster to search for than `^` in multiline mode
+_RECORDS = {
+    "v": re.compile(r"\nv[ \t]+([^\n]*)"),
+    "vt": re.compile(r"\nvt[ \t]+([^\n]*)"),
+    "vn": re.compile(r"\nvn[ \t]+([^\n]*)"),
+    "f": re.compile(r"\nf[ \t]+([^\n]*)"),
+}
+
+
+class _GrowableArray:
+    """
+    A 2D array which grows by doubling its capacity, so appending rows is amortized O(1).
+    """
+
+    def __init__(self, dtype, columns):
+        self._data = np.empty((1024, columns), dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, rows: np.ndarray):
+        required = self._size + len(rows)
+        if required > len(self._data):
+            capacity = max(required, 2 * len(self._data))
+            data = np.empty((capacity, self._data.shape[1]), self._data.dtype)
+            data[: self._size] = self._data[: self._size]
+            self._data = data
+        self._data[self._size : required] = rows
+        self._size = required
+
+    def to_array(self) -> np.ndarray:
+        return self._data[: self._size].copy()
+
+
+def _parse_numbers(text: str, dtype) -> np.ndarray:
+    with warnings.catch_warnings():
+        # malformed data is reported by `np.fromstring` as a deprecation warning, the caller
+        # detects it by checking the amount of values parsed
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return np.fromstring(text, dtype=dtype, sep=" ")
+
+
+def _parse_floats(rows, columns, required, optional_columns=0):
+    """
+    Parses rows of floats with `columns` values each, of which only the first `required` are
+    mandatory (the others default to 0), followed by up to `optional_columns` values that are
+    ignored (like the `w` of "v x y z [w]").
+    """
+    values = _parse_numbers(" ".join(rows), np.float64)
+    for num_columns in range(columns, columns + optional_columns + 1):
+        if values.size == num_columns * len(rows):
+            return values.reshape(-1, num_columns)[:, :columns]
+
+    # rows have different number of values, parse them one by one
+    result = np.zeros((len(rows), columns))
+    for i, row in enumerate(rows):
+        values = [float(x) for x in row.split()[:columns]]
+        if len(values) < required:
+            raise ValueError(f"Malformed .obj record: {row!r}")
+        result[i, : len(values)] = values
+    return result
+
+
+def _parse_face_indexes(rows):
+    """
+    Parses "f" records, returns a (N,3) array with the (vertex, texture, normal) indexes (as written
+    in the file, 0 meaning missing) of each face vertex and an array with the number of vertices
+    of each face.
+    """
+    # a missing texture index ("v//n") is replaced by 0, which is never a valid .obj index
+    text = " ".join(rows).replace("//", "/0/")
+    tokens = text.split()
+    components = tokens[0].count("/") + 1
+    # the bulk parse is only valid if every face vertex has the same number of components, the
+    # totals (of values or slashes) alone can match by chance when formats are mixed
+    same_format = set(map(str.count, tokens, repeat("/"))) == {components - 1}
+    values = _parse_numbers(text.replace("/", " "), np.int64) if same_format else None
+    if same_format and components <= 3 and values.size == components * len(tokens):
+        indexes = np.zeros((len(tokens), 3), np.int64)
+        indexes[:, :components] = values.reshape(-1, components)
+    else:
+        # faces don't share the same format, parse them one by one
+        indexes = np.zeros((len(tokens), 3), np.int64)
+        for i, token in enumerate(tokens):
+            values = [int(x) for x in token.split("/")]
+            if len(values) > 3:
+                raise ValueError(f"Malformed .obj face vertex: {token!r}")
+            indexes[i, : len(values)] = values
+
+    if len(tokens) == 3 * len(rows):
+        counts = np.full(len(rows), 3)
+    else:
+        counts = np.array([len(row.split()) for row in rows])
+    if (counts < 3).any():
+        raise ValueError("Malformed .obj face record, a face needs at least 3 vertices")
+    return indexes, counts
+
+
+def _fan_triangulation(counts: np.ndarray) -> np.ndarray:
+    """
+    Returns (T,3) indexes of face vertices splitting polygons with `counts` vertices into
+    triangles (0, i, i + 1).
+    """
+    starts = np.cumsum(counts) - counts
+    triangles_per_face = counts - 2
+    face = np.repeat(np.arange(len(counts)), triangles_per_face)
+    first_triangle = np.cumsum(triangles_per_face) - triangles_per_face
+    i = np.arange(len(face)) - first_triangle[face] + 1
+    start = starts[face]
+    return np.stack([start, start + i, start + i + 1], axis=1)
+
+
+def _resolve_indexes(indexes, counts_before):
+    """
+    Converts 1-based (or negative, relative to the end) .obj indexes to 0-based indexes, missing
+    indexes become -1.
+    """
+    return np.where(indexes > 0, indexes - 1, np.where(indexes < 0, counts_before + indexes, -1))
+
+
+class _ChunkParser:
+    def __init__(self):
+        self.vertices = _GrowableArray(np.float64, 3)
+        self.uvs = _GrowableArray(np.float64, 2)
+        self.normals = _GrowableArray(np.float64, 3)
+        self.faces = _GrowableArray(np.int32, 3)
+        self.texture_coordinates_indexes = _GrowableArray(np.int32, 3)
+        self.normal_indexes = _GrowableArray(np.int32, 3)
+
+    def parse(self, text: str):
+        text = "\n" + text
+        num_before = (len(self.vertices), len(self.uvs), len(self.normals))
+        rows = {key: regex.findall(text) for key, regex in _RECORDS.items()}
+
+        if rows["v"]:
+            self.vertices.extend(_parse_floats(rows["v"], 3, required=3, optional_columns=1))
+        if rows["vt"]:
+            self.uvs.extend(_parse_floats(rows["vt"], 2, required=1, optional_columns=1))
+        if rows["vn"]:
+            normals = _parse_floats(rows["vn"], 3, required=3)
+            self.normals.extend(batch_math.normalize(normals))
+        if rows["f"]:
+            self._parse_faces(text, rows["f"], num_before)
+
+    def _parse_faces(self, text, rows, num_before):
+        indexes, counts = _parse_face_indexes(rows)
+        if (indexes < 0).any():
+            # negative indexes refer to the elements defined *before* the face, count them
+            face_starts = [m.start() for m in _RECORDS["f"].finditer(text)]
+            counts_before = []
+            for key, num in zip(("v", "vt", "vn"), num_before):
+                starts = [m.start() for m in _RECORDS[key].finditer(text)]
+                counts_before.append(num + np.searchsorted(starts, face_starts))
+            counts_before = np.repeat(np.stack(counts_before, axis=1), counts, axis=0)
+        else:
+            counts_before = 0
+        indexes = _resolve_indexes(indexes, counts_before)
+
+        triangles = _fan_triangulation(counts)
+        self.faces.extend(indexes[triangles, 0])
+        self.texture_coordinates_indexes.extend(indexes[triangles, 1])
+        self.normal_indexes.extend(indexes[triangles, 2])
+
+    def to_arrays(self) -> ObjArrays:
+        return ObjArrays(
+            self.vertices.to_array(),
+            self.uvs.to_array(),
+            self.normals.to_array(),
+            self.faces.to_array(),
+            self.texture_coordinates_indexes.to_array(),
+            self.normal_indexes.to_array(),
+        )
+
+
+def parse_obj(filename: Union[str, Path], chunk_size: int = None) -> ObjArrays:
+    """
+    Parses `v`, `vt`, `vn` and `f` records of a wavefront .obj file.
+
+    Faces may use the `v`, `v/t`, `v//n` and `v/t/n` forms and negative (relative) indexes,
+    polygons with more than 3 vertices are split into triangles. Returned indexes are 0-based,
+    missing texture or normal indexes are -1. Records must start at the beginning of a line.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    parser = _ChunkParser()
+    remainder = ""
+    with open(filename, mode="r") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = remainder + chunk
+            end = text.rfind("\n") + 1
+            remainder = text[end:]
+            parser.parse(text[:end])
+    if remainder:
+        parser.parse(remainder)
+    return parser.to_arrays()
@@ -0,0 +1,530 @@
+"""
+Batched rasterization kernels used by the "numpy" backend of `TinyRenderer`.
+
+Instead of drawing one triangle at a time, every face of a model is processed as arrays:
+faces are grouped by the size of their (screen space) bounding boxes, so triangles of similar
+size share a single vectorized kernel.
+
+Rasterization is deferred: the kernels only resolve visibility, storing for each pixel the
+distance to the camera, the index of the visible face and its barycentric weights. Shading
+happens once per pixel afterwards. Since for a given pixel the sequential renderer keeps the
+*last* face with the smallest distance, ties are broken by the face index, which makes the
+result independent from the order in which batches are processed.
+"""
+from collections import namedtuple
+from typing import List, Sequence
+
+import numpy as np
+
+import batch_math
+from tiny_renderer.hierarchical_z import HierarchicalZ, nearest_distances
+
+# Buffers written by the kernels, `image` is filled when shading.
+FrameBuffers = namedtuple("FrameBuffers", "image z_buffer face_buffer weights_buffer")
+
+# How distances are stored in a z buffer (see `encode_depth`): quantized to integer levels,
+# `floor(distance * scale)` up to `max_level`, if `scale` isn't 0, otherwise rounded to single
+# precision if `float32`, otherwise as they are. Distances are measured along the z axis if
+# `screen_z`, see `camera_depth` and `tiny_renderer.framebuffer.DepthMetric`.
+DepthEncoding = namedtuple("DepthEncoding", "scale max_level float32 screen_z")
+FLOAT64_DEPTH = DepthEncoding(0.0, 0.0, False, False)
+
+# Pixels of lines in the (transposed) coordinates they are walked, see `line_pixels`.
+LinePixels = namedtuple("LinePixels", "x y steep percentage colors_swapped line step")
+
+# Pixels (x, y) with x % step == x0 and y % step == y0, see `rasterize_faces`.
+PixelGrid = namedtuple("PixelGrid", "step x0 y0")
+FULL_GRID = PixelGrid(1, 0, 0)
+
+# Maximum number of candidate pixels evaluated by a single kernel invocation, bounds the
+# memory used by the temporary arrays.
+FRAGMENTS_PER_BATCH = 1 << 20
+
+# Faces rasterized with a hierarchical z buffer are split into this many groups, faces of a group
+# are tested against the z buffer left by the previous groups, see `rasterize_faces`.
+OCCLUSION_GROUPS = 8
+
+
+def encode_depth(distance, encoding: DepthEncoding):
+    """
+    Returns `distance` (a number or an array) the way it's stored in a z buffer with `encoding`.
+    Depth tests compare encoded distances, so their result doesn't depend on the order in which
+    pixels are drawn. Quantized distances are returned as floating point integers.
+    """
+    if encoding.scale:
+        return np.minimum(np.floor(distance * encoding.scale), encoding.max_level)
+    if encoding.float32:
+        return np.float32(distance)
+    return distance
+
+
+def camera_depth(x, y, z, camera: np.ndarray, encoding: DepthEncoding):
+    """
+    Returns the encoded distances to `camera` of pixels (x, y) with interpolated depths `z`
+    (arrays): the euclidean distance with `z` rounded, or the distance along the z axis with `z`
+    as it is if `encoding.screen_z`.
+    """
+    if encoding.screen_z:
+        return encode_depth(np.abs(z - camera[2]), encoding)
+    dx, dy, dz = x - camera[0], y - camera[1], np.round(z) - camera[2]
+    return encode_depth(np.sqrt(dx * dx + dy * dy + dz * dz), encoding)
+
+
+def gather_faces(screen_verts: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """
+    Returns a (F,3,3) array with the screen space vertices of every face.
+    """
+    return screen_verts[faces]
+
+
+def degenerated_faces(triangles: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean (F,) array which is `True` for faces with repeated vertices.
+    """
+    p0, p1, p2 = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    return (p0 == p1).all(axis=1) | (p0 == p2).all(axis=1) | (p1 == p2).all(axis=1)
+
+
+def back_faces(triangles: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean (F,) array which is `True` for faces that aren't counterclockwise in screen
+    space (see `math_utils.Vec3.is_counterclockwise`), meaning they face away from the camera.
+    """
+    return ~batch_math.is_counterclockwise(triangles[:, 0], triangles[:, 1], triangles[:, 2])
+
+
+def offscreen_faces(triangles: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Returns a boolean (F,) array which is `True` for faces entirely outside of the `width` x
+    `height` viewport.
+    """
+    x, y = triangles[..., 0], triangles[..., 1]
+    return (
+        (x.max(axis=1) < 0)
+        | (x.min(axis=1) >= width)
+        | (y.max(axis=1) < 0)
+        | (y.min(axis=1) >= height)
+    )
+
+
+def barycentric_denominators(triangles: np.ndarray) -> np.ndarray:
+    """
+    Returns the denominator used by `math_utils.Vec2.obtain_barycentric_weights` for every face.
+    """
+    return batch_math.barycentric_denominators(triangles[:, 0], triangles[:, 1], triangles[:, 2])
+
+
+def flat_normals(triangles: np.ndarray) -> np.ndarray:
+    """
+    Returns the (F,3) unitary normals of every face, computed as `(p2 - p0) x (p1 - p0)`.
+    """
+    edge = triangles[:, 2] - triangles[:, 0]
+    other_edge = triangles[:, 1] - triangles[:, 0]
+    return batch_math.normalize(batch_math.cross(edge, other_edge))
+
+
+def clip_boxes(boxes: np.ndarray, region) -> np.ndarray:
+    """
+    Returns a copy of `boxes` clipped to `region` (min_x, min_y, max_x, max_y).
+    """
+    clipped = np.empty_like(boxes)
+    clipped[:, :2] = np.maximum(boxes[:, :2], region[:2])
+    clipped[:, 2:] = np.minimum(boxes[:, 2:], region[2:])
+    return clipped
+
+
+def bounding_boxes(triangles: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Returns the (F,4) integer bounding boxes (min_x, min_y, max_x, max_y) of every face clipped
+    to the `width` x `height` viewport. Empty boxes have min > max.
+    """
+    xy = triangles[..., :2]
+    boxes = np.concatenate([xy.min(axis=1), xy.max(axis=1)], axis=1).astype(np.int64)
+    np.clip(boxes[:, 0], 0, None, out=boxes[:, 0])
+    np.clip(boxes[:, 1], 0, None, out=boxes[:, 1])
+    np.clip(boxes[:, 2], None, width - 1, out=boxes[:, 2])
+    np.clip(boxes[:, 3], None, height - 1, out=boxes[:, 3])
+    return boxes
+
+
+def grid_slices(region, grid: PixelGrid = FULL_GRID):
+    """
+    Returns the (rows, columns) slices selecting the pixels of `grid` inside `region`
+    (min_x, min_y, max_x, max_y).
+    """
+    min_x, min_y, max_x, max_y = region
+    step = grid.step
+    rows = slice(min_y + (grid.y0 - min_y) % step, max_y + 1, step)
+    cols = slice(min_x + (grid.x0 - min_x) % step, max_x + 1, step)
+    return rows, cols
+
+
+def refinement_grids(steps: Sequence[int]) -> List[List[PixelGrid]]:
+    """
+    Returns, for each step of `steps`, the grids of pixels rendered by a pass with that step
+    which weren't rendered by the previous passes. After the pass of step `s` every pixel whose
+    coordinates are multiples of `s` has been rendered, so steps must be decreasing, divide the
+    previous step and end with 1 (every pixel).
+    """
+    if not steps or steps[-1] != 1:
+        raise ValueError(f"Refinement steps must end with 1, got {steps}")
+    passes = [[PixelGrid(steps[0], 0, 0)]]
+    for previous, step in zip(steps, steps[1:]):
+        if step >= previous or previous % step:
+            raise ValueError(f"Refinement steps must divide the previous ones, got {steps}")
+        passes.append(
+            [
+                PixelGrid(previous, x0, y0)
+                for y0 in range(0, previous, step)
+                for x0 in range(0, previous, step)
+                if (x0, y0) != (0, 0)
+            ]
+        )
+    return passes
+
+
+def size_bins(boxes: np.ndarray):
+    """
+    Groups faces by the size of their bounding boxes, yields (size, face indexes) where `size` is
+    a power of two large enough to contain the bounding boxes of all faces in the group.
+    """
+    extent = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) + 1
+    valid = (boxes[:, 2] >= boxes[:, 0]) & (boxes[:, 3] >= boxes[:, 1])
+    exponent = np.ceil(np.log2(np.maximum(extent, 1))).astype(np.int64)
+    for e in np.unique(exponent[valid]):
+        yield 1 << int(e), np.flatnonzero(valid & (exponent == e))
+
+
+def rasterize_faces(
+    triangles: np.ndarray,
+    face_indexes: np.ndarray,
+    boxes: np.ndarray,
+    camera: np.ndarray,
+    z_buffer: np.ndarray,
+    face_buffer: np.ndarray,
+    weights_buffer: np.ndarray,
+    grid: PixelGrid = FULL_GRID,
+    depth_encoding: DepthEncoding = FLOAT64_DEPTH,
+    *,
+    hierarchical_z=False,
+    sort_front_to_back=False,
+):
+    """
+    Resolves the visibility of the faces `face_indexes` (indexes into `triangles`).
+
+    :param triangles:
+        (F,3,3) screen space vertices, x and y must be already rounded.
+    :param boxes:
+        (len(face_indexes),4) bounding boxes of the faces, pixels outside of them are ignored, so
+        they can be used to restrict rasterization to a region of the buffers.
+    :param camera:
+        (3,) camera position, depth is the distance from a pixel to it.
+    :param z_buffer:
+        (H,W) distances of the visible faces, updated in place.
+    :param face_buffer:
+        (H,W) index of the visible face for each pixel (-1 means empty), updated in place.
+    :param weights_buffer:
+        (H,W,3) barycentric weights of each visible pixel, updated in place.
+    :param grid:
+        Only the pixels of this `PixelGrid` are rasterized, coarser grids render previews of the
+        image with a fraction of the work (see `TinyRenderer.render_progressive`).
+    :param depth_encoding:
+        How distances are stored in `z_buffer`, see `encode_depth`.
+    :param hierarchical_z:
+        If `True` faces are rasterized in `OCCLUSION_GROUPS` groups, faces of a group behind the
+        pixels drawn by the previous groups (see `tiny_renderer.hierarchical_z`) are skipped
+        without testing any pixel. The result is the same.
+    :param sort_front_to_back:
+        If `True` faces are rasterized from the nearest to the farthest one, so more of them are
+        skipped by `hierarchical_z`. The result is the same.
+    :return:
+        The number of pixels inside the faces that were depth tested, how many of them passed
+        the test (it's not known which one of several faces covering a pixel is the nearest one
+        before they're tested together, so each of them counts as passing) and the number of
+        faces skipped by `hierarchical_z`.
+    """
+    if not (hierarchical_z or sort_front_to_back):
+        tested, passed = _rasterize_group(
+            triangles,
+            face_indexes,
+            boxes,
+            camera,
+            z_buffer,
+            face_buffer,
+            weights_buffer,
+            grid,
+            depth_encoding,
+        )
+        return tested, passed, 0
+
+    valid = np.flatnonzero((boxes[:, 2] >= boxes[:, 0]) & (boxes[:, 3] >= boxes[:, 1]))
+    if len(valid) == 0:
+        return 0, 0, 0
+    nearest = nearest_distances(
+        triangles[face_indexes[valid]], boxes[valid], camera, screen_z=depth_encoding.screen_z
+    )
+    nearest = encode_depth(nearest, depth_encoding)
+    if sort_front_to_back:
+        order = np.argsort(nearest, kind="stable")
+        valid, nearest = valid[order], nearest[order]
+
+    occlusion = None
+    groups = [np.arange(len(valid))]
+    if hierarchical_z:
+        region = (*boxes[valid, :2].min(axis=0), *boxes[valid, 2:].max(axis=0))
+        occlusion = HierarchicalZ(z_buffer, region)
+        groups = np.array_split(groups[0], min(OCCLUSION_GROUPS, len(valid)))
+
+    tested = passed = occluded = 0
+    for group in groups:
+        group_boxes = boxes[valid[group]]
+        if occlusion is not None:
+            visible = nearest[group] <= occlusion.max_depths(group_boxes)
+            occluded += len(group) - int(np.count_nonzero(visible))
+            group, group_boxes = group[visible], group_boxes[visible]
+            if len(group) == 0:
+                continue
+        group_tested, group_passed = _rasterize_group(
+            triangles,
+            face_indexes[valid[group]],
+            group_boxes,
+            camera,
+            z_buffer,
+            face_buffer,
+            weights_buffer,
+            grid,
+            depth_encoding,
+        )
+        tested += group_tested
+        passed += group_passed
+        if occlusion is not None and group_passed:
+            occlusion.update((*group_boxes[:, :2].min(axis=0), *group_boxes[:, 2:].max(axis=0)))
+    return tested, passed, occluded
+
+
+def _rasterize_group(
+    triangles,
+    face_indexes,
+    boxes,
+    camera,
+    z_buffer,
+    face_buffer,
+    weights_buffer,
+    grid,
+    depth_encoding,
+):
+    """
+    Rasterizes the faces `face_indexes` in batches of similar size, returns the number of pixels
+    tested and passed, see `rasterize_faces`.
+    """
+    tested = passed = 0
+    for size, bin_faces in size_bins(boxes):
+        samples = (size - 1) // grid.step + 1
+        batch_size = max(1, FRAGMENTS_PER_BATCH // (samples * samples))
+        for start in range(0, len(bin_faces), batch_size):
+            batch = bin_faces[start : start + batch_size]
+            batch_tested, batch_passed = _rasterize_batch(
+                triangles,
+                face_indexes[batch],
+                boxes[batch],
+                size,
+                camera,
+                z_buffer,
+                face_buffer,
+                weights_buffer,
+                grid,
+                depth_encoding,
+            )
+            tested += batch_tested
+            passed += batch_passed
+    return tested, passed
+
+
+def _rasterize_batch(
+    triangles, faces, box, size, camera, z_buffer, face_buffer, weights_buffer, grid, depth_encoding
+):
+    """
+    Rasterizes a batch of faces whose bounding boxes fit into a `size` x `size` square, returns the
+    number of pixels tested and passed, see `rasterize_faces`.
+    """
+    # first pixel of the grid inside each box
+    first_x = box[:, 0] + (grid.x0 - box[:, 0]) % grid.step
+    first_y = box[:, 1] + (grid.y0 - box[:, 1]) % grid.step
+    offsets = np.arange(0, size, grid.step)
+    x = first_x[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :]
+    y = first_y[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis]
+    in_box = (x <= box[:, 2, np.newaxis, np.newaxis]) & (y <= box[:, 3, np.newaxis, np.newaxis])
+
+    tri = triangles[faces]
+    v0, v1, v2 = (tri[:, np.newaxis, np.newaxis, i] for i in range(3))
+    w1, w2, w3 = batch_math.barycentric_weights((x, y), v0, v1, v2)
+    face, row, col = np.nonzero(in_box & (w1 >= 0) & (w2 >= 0) & (w3 >= 0))
+    if len(face) == 0:
+        return 0, 0
+
+    x = first_x[face] + col * grid.step
+    y = first_y[face] + row * grid.step
+    w1, w2, w3 = w1[face, row, col], w2[face, row, col], w3[face, row, col]
+    z = tri[face, 0, 2] * w1 + tri[face, 1, 2] * w2 + tri[face, 2, 2] * w3
+    face = faces[face]
+    distance = camera_depth(x, y, z, camera, depth_encoding)
+
+    current_z = z_buffer[y, x]
+    visible = (distance < current_z) | ((distance == current_z) & (face > face_buffer[y, x]))
+    tested, passed = len(visible), int(np.count_nonzero(visible))
+    if passed == 0:
+        return tested, passed
+    x, y, distance, face = x[visible], y[visible], distance[visible], face[visible]
+    weights = np.stack([w1[visible], w2[visible], w3[visible]], axis=1)
+
+    # several faces of the batch may cover the same pixel, keep the nearest one (the last face
+    # in case of ties, just like drawing them one after the other would)
+    pixel = y * z_buffer.shape[1] + x
+    order = np.lexsort((-face, distance, pixel))
+    pixel = pixel[order]
+    first = np.ones(len(pixel), dtype=bool)
+    first[1:] = pixel[1:] != pixel[:-1]
+    order = order[first]
+
+    x, y = x[order], y[order]
+    z_buffer[y, x] = distance[order]
+    face_buffer[y, x] = face[order]
+    weights_buffer[y, x] = weights[order]
+    return tested, passed
+
+
+def unique_edges(faces: np.ndarray) -> np.ndarray:
+    """
+    Returns the (E,2) vertex indexes of the edges (0, 1), (1, 2) and (2, 0) of every face, edges
+    shared by several faces only once, in the order in which they first appear.
+    """
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    _, first = np.unique(np.sort(edges, axis=1), axis=0, return_index=True)
+    return edges[np.sort(first)]
+
+
+def line_pixels(starts: np.ndarray, ends: np.ndarray):
+    """
+    Walks all lines from `starts` (E,2) to `ends` (E,2) at once, with the same Bresenham variant
+    (including the floating point error accumulation) as `TinyRenderer.draw_line`.
+
+    Lines are transposed so they're walked along their longest axis, from left to right. The
+    walk advances every line one pixel at a time, lines are sorted by length so the ones still
+    being walked are always a prefix of the arrays.
+
+    :return:
+        A `LinePixels` with one entry for each pixel, lines whose ends are the same point have no
+        pixels.
+    """
+    starts, ends = starts.astype(np.int64), ends.astype(np.int64)
+    lines = np.flatnonzero((starts != ends).any(axis=1))
+    x0, y0 = starts[lines, 0], starts[lines, 1]
+    x1, y1 = ends[lines, 0], ends[lines, 1]
+
+    steep = np.abs(x1 - x0) < np.abs(y1 - y0)
+    x0, y0 = np.where(steep, y0, x0), np.where(steep, x0, y0)
+    x1, y1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+    swapped = x0 > x1
+    x0, x1 = np.where(swapped, x1, x0), np.where(swapped, x0, x1)
+    y0, y1 = np.where(swapped, y1, y0), np.where(swapped, y0, y1)
+    dx, dy = x1 - x0, np.abs(y1 - y0)
+
+    length = dx + 1
+    by_length = np.argsort(-length, kind="stable")
+    lines = lines[by_length]
+    x0, y0, y1 = x0[by_length], y0[by_length], y1[by_length]
+    dx, dy, length = dx[by_length], dy[by_length], length[by_length]
+    steep, swapped = steep[by_length], swapped[by_length]
+    d_error = dy / dx
+    y_step = np.where(y1 > y0, 1, -1)
+    # number of lines with more than k pixels, for each step k
+    num_walking = np.searchsorted(-length, -np.arange(length.max(initial=0)), side="left")
+
+    y, error = y0.copy(), np.zeros(len(lines))
+    walked_lines = [np.empty(0, np.int64)]
+    walked_y = [np.empty(0, np.int64)]
+    for n in num_walking:
+        walked_lines.append(np.arange(n))
+        walked_y.append(y[:n].copy())
+        error[:n] += d_error[:n]
+        step = error[:n] > 0.5
+        y[:n] += np.where(step, y_step[:n], 0)
+        error[:n] -= step
+
+    line = np.concatenate(walked_lines)
+    step = np.repeat(np.arange(len(num_walking)), num_walking)
+    y = np.concatenate(walked_y)
+    x = x0[line] + step
+
+    ex, ey = x - x0[line], y - y0[line]
+    percentage = np.sqrt(ex * ex + ey * ey) / np.sqrt(dx[line] * dx[line] + dy[line] * dy[line])
+    # `draw_line` swaps its colors once for each pixel of steep lines
+    colors_swapped = swapped[line] ^ (steep[line] & (step % 2 == 0))
+    return LinePixels(x, y, steep[line], percentage, colors_swapped, lines[line], step)
+
+
+def draw_lines(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    camera: np.ndarray,
+    z_buffer: np.ndarray,
+    image: np.ndarray,
+    start_color,
+    end_color,
+    depth_encoding: DepthEncoding = FLOAT64_DEPTH,
+):
+    """
+    Draws lines (with z = 0) into `image`, producing the same pixels as calling
+    `TinyRenderer.draw_line` for every line, in order: for each pixel the first of the nearest
+    lines is kept.
+
+    :param starts:
+        (E,2) integer screen space start points.
+    :param ends:
+        (E,2) integer screen space end points.
+    :param camera:
+        (3,) camera position, depth is the distance from a pixel to it.
+    :param z_buffer:
+        (H,W) distances of the visible pixels, updated in place.
+    :param image:
+        (H,W,3) image, updated in place.
+    :param start_color:
+        Color at the start of each line, interpolated linearly to `end_color`.
+    :param depth_encoding:
+        How distances are stored in `z_buffer`, see `encode_depth`.
+    :return:
+        The number of pixels depth tested and passed, see `rasterize_faces`.
+    """
+    pixels = line_pixels(starts, ends)
+    # `draw_line` computes the distance to the camera before transposing back
+    distance = camera_depth(pixels.x, pixels.y, np.zeros(len(pixels.x)), camera, depth_encoding)
+
+    x = np.where(pixels.steep, pixels.y, pixels.x)
+    y = np.where(pixels.steep, pixels.x, pixels.y)
+    height, width = z_buffer.shape
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    visible = np.flatnonzero(inside)
+    visible = visible[distance[visible] < z_buffer[y[visible], x[visible]]]
+    tested, passed = int(np.count_nonzero(inside)), len(visible)
+    if passed == 0:
+        return tested, passed
+
+    # keep the nearest pixel, the one drawn first in case of ties
+    pixel = y[visible] * width + x[visible]
+    order = np.lexsort((pixels.step[visible], pixels.line[visible], distance[visible], pixel))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pixel[order[1:]] != pixel[order[:-1]]
+    visible = visible[order[first]]
+
+    x, y = x[visible], y[visible]
+    percentage = pixels.percentage[visible, np.newaxis]
+    colors_swapped = pixels.colors_swapped[visible, np.newaxis]
+    c0, c1 = np.array(start_color[:3]), np.array(end_color[:3])
+    color = np.where(
+        colors_swapped,
+        c1 * percentage + c0 * (1 - percentage),
+        c0 * percentage + c1 * (1 - percentage),
+    )
+    z_buffer[y, x] = distance[visible]
+    image[y, x] = color
+    return tested, passed
@@ -0,0 +1,248 @@
+"""
+Headless batch rendering of sequences of frames with `TinyRenderer`.
+
+The model and texture are loaded once, then every frame (a camera position and light direction,
+see `Frame`) is rendered without any window or OpenGL context. Frames are rendered in parallel by
+a pool of processes, each of them with its own copy of the renderer (forked, so the model and
+texture aren't loaded or pickled again), and written in order as PNG files or as a raw RGB video
+stream which can be piped to a video encoder.
+
+Usage:
+    python -m tiny_renderer.render african_head.obj african_head_diffuse.jpg --output frames
+    python -m tiny_renderer.render african_head.obj african_head_diffuse.jpg \
+        --mode Texturized --light-mode Smooth --resolution 1024 --light-orbit 120 --processes 4 \
+        --raw-video - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1024x1024 -i - turntable.mp4
+    python -m tiny_renderer.render african_head.obj african_head_diffuse.jpg --turntable 90 \
+        --perspective 3 --output turntable
+    # frames.json: [{"camera": [0, 0, -1], "light": [0.5, 0, -1], "rotation": 0.5}, ...]
+    python -m tiny_renderer.render african_head.obj african_head_diffuse.jpg --frames frames.json
+"""
+import argparse
+import json
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from math import cos, pi, sin
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from tiny_renderer import tiles, transform
+from tiny_renderer.framebuffer import DepthFormat, DepthMetric
+from tiny_renderer.tiny_renderer import BACKENDS, LightingMode, RenderingMode, TinyRenderer
+
+DEFAULT_CAMERA = (0.0, 0.0, -1.0)
+
+# `camera` is a screen space position (see `TinyRenderer.set_camera_position`), `light` a
+# direction (see `TinyRenderer.set_light_direction`) or `None` to light from the camera, and
+# `rotation` the angle (in radians) the model is turned around its vertical axis
+Frame = namedtuple("Frame", "camera light rotation", defaults=(0.0,))
+
+
+def orbit_lights(count: int, elevation: float = 0.0) -> List[Frame]:
+    """
+    Returns `count` frames with the light turning once around the vertical axis of the model,
+    starting in front of it, `elevation` is the height of the light (in radians).
+    """
+    frames = []
+    for i in range(count):
+        angle = 2 * pi * i / count
+        light = (
+            sin(angle) * cos(elevation),
+            sin(elevation),
+            -cos(angle) * cos(elevation),
+        )
+        frames.append(Frame(DEFAULT_CAMERA, light))
+    return frames
+
+
+def turntable(count: int, light: Optional[Sequence[float]] = None) -> List[Frame]:
+    """
+    Returns `count` frames with the model turning once around its vertical axis, lit by a still
+    `light` (from the camera by default).
+    """
+    return [Frame(DEFAULT_CAMERA, light, 2 * pi * i / count) for i in range(count)]
+
+
+def load_frames(filename: Union[str, Path]) -> List[Frame]:
+    """
+    Reads frames from a JSON list of objects with optional "camera", "light" and "rotation"
+    entries.
+    """
+    frames = []
+    for entry in json.loads(Path(filename).read_text()):
+        camera = tuple(entry.get("camera", DEFAULT_CAMERA))
+        light = entry.get("light")
+        rotation = float(entry.get("rotation", 0.0))
+        frames.append(Frame(camera, None if light is None else tuple(light), rotation))
+    return frames
+
+
+def render_frame(
+    renderer: TinyRenderer, frame: Frame, render_mode: RenderingMode, light_mode: LightingMode
+) -> np.ndarray:
+    """
+    Renders `frame`, returns the (H,W,3) image with the first row at the top.
+    """
+    renderer.set_camera_position(*frame.camera)
+    renderer.set_model_matrix(transform.rotation(frame.rotation))
+    renderer.set_light_direction(*(frame.camera if frame.light is None else frame.light))
+    renderer.render(render_mode, light_mode)
+    return np.ascontiguousarray(renderer.get_image())
+
+
+def render_frames(
+    renderer: TinyRenderer,
+    frames: Sequence[Frame],
+    render_mode: RenderingMode,
+    light_mode: LightingMode,
+    *,
+    processes: int = 1,
+) -> Iterator[np.ndarray]:
+    """
+    Renders `frames` with `processes` processes, yields the images in the order of `frames`.
+    """
+    if processes <= 1 or len(frames) <= 1:
+        for frame in frames:
+            yield render_frame(renderer, frame, render_mode, light_mode)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(frames)),
+        mp_context=tiles._get_pool_context(),
+        initializer=_init_worker,
+        initargs=(renderer, render_mode, light_mode),
+    ) as pool:
+        yield from pool.map(_render_worker_frame, frames)
+
+
+def write_frames(
+    images: Iterator[np.ndarray],
+    *,
+    output_dir: Optional[Path] = None,
+    raw_video: Optional[BinaryIO] = None,
+    prefix: str = "frame",
+) -> int:
+    """
+    Writes `images` as `output_dir/{prefix}_0000.png`, ... and/or as raw RGB frames to the
+    binary stream `raw_video`, returns the number of frames written.
+    """
+    count = 0
+    for count, image in enumerate(images, start=1):
+        if output_dir is not None:
+            Image.fromarray(image).save(output_dir / f"{prefix}_{count - 1:04d}.png")
+        if raw_video is not None:
+            raw_video.write(image.tobytes())
+    return count
+
+
+_worker_renderer = None
+_worker_modes = None
+
+
+def _init_worker(renderer, render_mode, light_mode):
+    global _worker_renderer, _worker_modes
+    _worker_renderer = renderer
+    _worker_modes = (render_mode, light_mode)
+
+
+def _render_worker_frame(frame):
+    return render_frame(_worker_renderer, frame, *_worker_modes)
+
+
+def _parse_vector(text: str) -> tuple:
+    values = tuple(float(x) for x in text.split(","))
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError(f"expected x,y,z, got {text!r}")
+    return values
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("model", type=Path, help="Wavefront .obj model")
+    parser.add_argument("texture", type=Path, help="Texture image or raw .npy texture")
+    parser.add_argument("--mode", default="Texturized", choices=[x.name for x in RenderingMode])
+    parser.add_argument("--light-mode", default="Smooth", choices=[x.name for x in LightingMode])
+    parser.add_argument("--resolution", type=int, nargs="+", default=[800], help="size or W H")
+    parser.add_argument("--backend", default="numpy", choices=BACKENDS)
+    parser.add_argument("--processes", type=int, default=1, help="frames rendered in parallel")
+    parser.add_argument("--use-mesh-cache", action="store_true")
+    parser.add_argument("--depth-format", default="Float64", choices=[x.name for x in DepthFormat])
+    parser.add_argument("--depth-metric", default="Distance", choices=[x.name for x in DepthMetric])
+    parser.add_argument(
+        "--hierarchical-z", action="store_true", help="skip triangles hidden by the ones drawn"
+    )
+
+    frames_group = parser.add_mutually_exclusive_group()
+    frames_group.add_argument("--frames", type=Path, help="JSON list of frames")
+    frames_group.add_argument(
+        "--light-orbit", type=int, metavar="N", help="N frames of a light turning around"
+    )
+    frames_group.add_argument(
+        "--turntable", type=int, metavar="N", help="N frames of the model turning around"
+    )
+    frames_group.add_argument(
+        "--light", type=_parse_vector, nargs="+", metavar="X,Y,Z", help="one frame per light"
+    )
+    parser.add_argument("--camera", type=_parse_vector, default=DEFAULT_CAMERA, metavar="X,Y,Z")
+    parser.add_argument(
+        "--perspective", type=float, metavar="DISTANCE", help="perspective camera distance"
+    )
+
+    parser.add_argument("--output", type=Path, help="directory of the PNG files")
+    parser.add_argument("--raw-video", help="file of the raw RGB video stream, - for stdout")
+    args = parser.parse_args(args)
+    if len(args.resolution) > 2:
+        parser.error("--resolution expects a size or a width and a height")
+    if args.output is None and args.raw_video is None:
+        parser.error("at least one of --output and --raw-video is required")
+
+    if args.frames is not None:
+        frames = load_frames(args.frames)
+    elif args.light_orbit is not None:
+        frames = [frame._replace(camera=args.camera) for frame in orbit_lights(args.light_orbit)]
+    elif args.turntable is not None:
+        frames = [frame._replace(camera=args.camera) for frame in turntable(args.turntable)]
+    elif args.light is not None:
+        frames = [Frame(args.camera, light) for light in args.light]
+    else:
+        frames = [Frame(args.camera, None)]
+
+    renderer = TinyRenderer(
+        bind_texture=False,
+        backend=args.backend,
+        depth_format=DepthFormat[args.depth_format],
+        depth_metric=DepthMetric[args.depth_metric],
+        hierarchical_z=args.hierarchical_z,
+        # the order of the faces doesn't change the image of the "numpy" backend
+        sort_front_to_back=args.hierarchical_z and args.backend == "numpy",
+    )
+    renderer.setup_model(args.model, args.texture, use_mesh_cache=args.use_mesh_cache)
+    if args.perspective is not None:
+        renderer.set_projection_matrix(transform.perspective(args.perspective))
+    width, height = args.resolution * 2 if len(args.resolution) == 1 else args.resolution
+    renderer.set_resolution(width, height)
+    images = render_frames(
+        renderer,
+        frames,
+        RenderingMode[args.mode],
+        LightingMode[args.light_mode],
+        processes=args.processes,
+    )
+
+    if args.output is not None:
+        args.output.mkdir(parents=True, exist_ok=True)
+    if args.raw_video == "-":
+        count = write_frames(images, output_dir=args.output, raw_video=sys.stdout.buffer)
+    elif args.raw_video is not None:
+        with open(args.raw_video, "wb") as raw_video:
+            count = write_frames(images, output_dir=args.output, raw_video=raw_video)
+    else:
+        count = write_frames(images, output_dir=args.output)
+    print(f"{count} frames of {width}x{height} rendered", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+In-memory cache of decoded textures.
+
+Decoding a JPEG is slow, so decoded textures are kept in a least recently used cache keyed by
+the source path and modification time, holding at most `TextureCache.max_bytes` of pixels. Every
+texture is stored the way `TextureSampler` reads it: a read-only, C-contiguous (H,W,3) uint8 RGB
+array whose first row is at v = 0 (the bottom of the image file). The mip chain of a texture (see
+`tiny_renderer.texture_sampler.build_mip_chain`) is built the first time it's requested and cached
+with it.
+
+Textures can also be stored as raw `.npy` files (see `save_raw_texture`), which are loaded with
+`np.load(mmap_mode="r")`: loading them is almost instant and all the processes (and renderers)
+using the same texture share the same memory pages. Memory-mapped textures don't count towards
+the byte budget, their pages belong to the OS page cache.
+
+Usage:
+    texture = texture_cache.load_texture("african_head_diffuse.jpg")
+    # decode once, then share a memory-mapped copy:
+    texture_cache.save_raw_texture("african_head_diffuse.jpg", "african_head_diffuse.npy")
+    texture = texture_cache.load_texture("african_head_diffuse.npy")
+    sampler = TextureSampler.from_levels(texture_cache.load_mip_chain("african_head_diffuse.jpg"))
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+from PIL import Image
+
+from tiny_renderer.texture_sampler import build_mip_chain
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+RAW_TEXTURE_SUFFIX = ".npy"
+
+
+def _decode(filename: Path) -> np.ndarray:
+    with Image.open(filename) as image:
+        pixels = np.asarray(image.convert("RGB"))
+    return np.ascontiguousarray(np.flipud(pixels))
+
+
+def _load_raw(filename: Path) -> np.ndarray:
+    texture = np.load(filename, mmap_mode="r")
+    if texture.ndim != 3 or texture.shape[2] != 3 or texture.dtype != np.uint8:
+        raise ValueError(
+            f"Raw texture {filename} must be a (H,W,3) uint8 array, got {texture.shape} "
+            f"{texture.dtype}"
+        )
+    return texture
+
+
+def read_texture(filename: Union[str, Path]) -> np.ndarray:
+    """
+    Reads `filename` without caching: raw `.npy` textures are memory-mapped, anything else is
+    decoded with PIL.
+    """
+    filename = Path(filename)
+    if filename.suffix == RAW_TEXTURE_SUFFIX:
+        return _load_raw(filename)
+    texture = _decode(filename)
+    texture.setflags(write=False)
+    return texture
+
+
+def save_raw_texture(filename: Union[str, Path], raw_filename: Union[str, Path]) -> Path:
+    """
+    Decodes `filename` and stores it as the raw texture `raw_filename`, returns `raw_filename`.
+    """
+    raw_filename = Path(raw_filename)
+    if raw_filename.suffix != RAW_TEXTURE_SUFFIX:
+        raise ValueError(f"Raw textures must have the {RAW_TEXTURE_SUFFIX} suffix: {raw_filename}")
+    np.save(raw_filename, _decode(Path(filename)))
+    return raw_filename
+
+
+class TextureCache:
+    """
+    Least recently used cache of decoded textures, see the module documentation.
+
+    :ivar max_bytes:
+        Maximum size of the cached (not memory-mapped) textures, the least recently used ones are
+        dropped when it's exceeded. Textures bigger than it are never cached.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Size of the cached textures (and mip chains) that count towards `max_bytes`.
+        """
+        return sum(self._entry_size(levels) for levels in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, filename: Union[str, Path]) -> np.ndarray:
+        """
+        Returns the texture `filename`, reading it only if it isn't cached or if it changed since
+        it was cached.
+        """
+        return self._load(filename, mip_chain=False)[0]
+
+    def load_mip_chain(self, filename: Union[str, Path]) -> List[np.ndarray]:
+        """
+        Returns the read-only mip chain of the texture `filename` (the first level is the texture
+        returned by `load`), building it only if it isn't cached.
+        """
+        return self._load(filename, mip_chain=True)
+
+    def _load(self, filename: Union[str, Path], mip_chain: bool) -> List[np.ndarray]:
+        filename = Path(filename).resolve()
+        key = (filename, filename.stat().st_mtime_ns)
+        with self._lock:
+            levels = self._entries.get(key)
+            if levels is not None:
+                self._entries.move_to_end(key)
+                if not mip_chain or len(levels) > 1 or max(levels[0].shape[:2]) == 1:
+                    return levels
+
+        if levels is None:
+            levels = [read_texture(filename)]
+        if mip_chain:
+            levels = build_mip_chain(levels[0])
+            for level in levels:
+                level.setflags(write=False)
+        with self._lock:
+            for stale_key in [k for k in self._entries if k[0] == filename]:
+                del self._entries[stale_key]
+            if self._entry_size(levels) <= self.max_bytes:
+                self._entries[key] = levels
+                self._evict()
+        return levels
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        size = self.size_bytes
+        while size > self.max_bytes:
+            _, levels = self._entries.popitem(last=False)
+            size -= self._entry_size(levels)
+
+    @staticmethod
+    def _entry_size(levels: List[np.ndarray]) -> int:
+        return sum(level.nbytes for level in levels if not isinstance(level, np.memmap))
+
+
+_default_cache = TextureCache()
+
+
+def get_default_cache() -> TextureCache:
+    """
+    The cache used by `load_texture` and `load_mip_chain` (and so by `TinyRenderer.setup_model`),
+    change its `max_bytes` to configure the byte budget.
+    """
+    return _default_cache
+
+
+def load_texture(filename: Union[str, Path]) -> np.ndarray:
+    """
+    Returns the texture `filename` through the default cache, see `TextureCache.load`.
+    """
+    return _default_cache.load(filename)
+
+
+def load_mip_chain(filename: Union[str, Path]) -> List[np.ndarray]:
+    """
+    Returns the mip chain of the texture `filename` through the default cache, see
+    `TextureCache.load_mip_chain`.
+    """
+    return _default_cache.load_mip_chain(filename)
@@ -0,0 +1,236 @@
+"""
+Texture sampling for `TinyRenderer`.
+
+A `TextureSampler` owns a texture and its mip chain (each level half the size of the previous
+one, down to 1x1), built once or shared with other samplers (see `TextureSampler.from_levels`).
+Sampling is vectorized: whole batches of (u, v) coordinates are looked up at once, each of them
+possibly at a different level of detail.
+
+Texel `i` of a level `size` texels wide is centered at `u = i / size`, which is what the original
+nearest lookup (`round(u * size)`) implies.
+"""
+from enum import IntEnum
+from typing import List, Optional
+
+import numpy as np
+
+
+class TextureFilter(IntEnum):
+    """
+    How `TextureSampler` computes the color of a texture coordinate
+    """
+
+    # the nearest texel of the full resolution texture
+    Nearest = 0
+    # interpolation of the 4 nearest texels of the level of detail nearest to the one requested
+    Bilinear = 1
+    # interpolation of bilinear samples from the two levels of detail around the one requested
+    Trilinear = 2
+
+    @classmethod
+    def get_caption(cls, index):
+        captions = {
+            cls.Nearest: "Nearest",
+            cls.Bilinear: "Bilinear",
+            cls.Trilinear: "Trilinear",
+        }
+        return captions[index]
+
+    @classmethod
+    def get_captions(cls):
+        return [TextureFilter.get_caption(i) for i in TextureFilter]
+
+
+class TextureWrap(IntEnum):
+    """
+    What `TextureSampler` does with texture coordinates outside of [0, 1]
+    """
+
+    Clamp = 0
+    Repeat = 1
+
+    @classmethod
+    def get_caption(cls, index):
+        captions = {
+            cls.Clamp: "Clamp",
+            cls.Repeat: "Repeat",
+        }
+        return captions[index]
+
+    @classmethod
+    def get_captions(cls):
+        return [TextureWrap.get_caption(i) for i in TextureWrap]
+
+
+def build_mip_chain(image: np.ndarray) -> List[np.ndarray]:
+    """
+    Returns `image` followed by versions of it with half the size (rounded down, repeating the
+    last row or column of odd sizes) until 1x1, each texel the average of 2x2 texels of the
+    previous level.
+    """
+    levels = [image]
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        previous = levels[-1].astype(np.float32)
+        height, width = previous.shape[:2]
+        if height > 1 and height % 2:
+            previous = np.concatenate([previous, previous[-1:]], axis=0)
+        if width > 1 and width % 2:
+            previous = np.concatenate([previous, previous[:, -1:]], axis=1)
+        rows = 2 if height > 1 else 1
+        columns = 2 if width > 1 else 1
+        blocks = previous.reshape(
+            previous.shape[0] // rows, rows, previous.shape[1] // columns, columns, -1
+        )
+        level = blocks.mean(axis=(1, 3))
+        levels.append(np.rint(level).astype(image.dtype))
+    return levels
+
+
+class TextureSampler:
+    """
+    Samples an RGB texture, see `TextureFilter` and `TextureWrap`.
+
+    :ivar texture_filter:
+        `TextureFilter` used by `sample`.
+    :ivar wrap:
+        `TextureWrap` used by `sample`.
+    """
+
+    def __init__(
+        self,
+        image: np.ndarray,
+        *,
+        texture_filter: TextureFilter = TextureFilter.Nearest,
+        wrap: TextureWrap = TextureWrap.Clamp,
+    ):
+        """
+        :param image:
+            (H,W,3) RGB texture, the first row is at v = 0.
+        """
+        self.texture_filter = TextureFilter(texture_filter)
+        self.wrap = TextureWrap(wrap)
+        self._levels = build_mip_chain(np.ascontiguousarray(image))
+
+    @classmethod
+    def from_levels(
+        cls,
+        levels: List[np.ndarray],
+        *,
+        texture_filter: TextureFilter = TextureFilter.Nearest,
+        wrap: TextureWrap = TextureWrap.Clamp,
+    ) -> "TextureSampler":
+        """
+        Creates a sampler reading an already built mip chain (see `build_mip_chain`), which isn't
+        copied, so samplers of the same texture can share it (see
+        `tiny_renderer.texture_cache.load_mip_chain`).
+        """
+        sampler = cls.__new__(cls)
+        sampler.texture_filter = TextureFilter(texture_filter)
+        sampler.wrap = TextureWrap(wrap)
+        sampler._levels = levels
+        return sampler
+
+    @property
+    def levels(self) -> List[np.ndarray]:
+        """
+        The mip chain, the first level is the texture itself.
+        """
+        return self._levels
+
+    @property
+    def image(self) -> np.ndarray:
+        return self._levels[0]
+
+    @property
+    def width(self) -> int:
+        return self._levels[0].shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._levels[0].shape[0]
+
+    def level_of_detail(self, uv_areas: np.ndarray, screen_areas: np.ndarray) -> np.ndarray:
+        """
+        Returns the level of detail used to sample triangles covering `uv_areas` of the texture
+        (in [0, 1] texture coordinates) and `screen_areas` pixels: the level whose texels have
+        roughly the size of a pixel. Triangles smaller on screen than in the texture read smaller
+        levels.
+        """
+        uv_areas, screen_areas = np.asarray(uv_areas), np.asarray(screen_areas, np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            texels_per_pixel = uv_areas * (self.width * self.height) / screen_areas
+            lod = 0.5 * np.log2(np.abs(texels_per_pixel))
+        return np.clip(np.nan_to_num(lod, nan=0.0, neginf=0.0), 0, len(self._levels) - 1)
+
+    def sample_texel(self, u: float, v: float) -> np.ndarray:
+        """
+        Returns the RGB texel nearest to (u, v) in the full resolution texture, a fast path for
+        sampling a single coordinate with `TextureFilter.Nearest`.
+        """
+        image = self._levels[0]
+        height, width = image.shape[0], image.shape[1]
+        u_index, v_index = round(u * width), round(v * height)
+        if self.wrap == TextureWrap.Repeat:
+            u_index, v_index = u_index % width, v_index % height
+        else:
+            u_index = min(max(u_index, 0), width - 1)
+            v_index = min(max(v_index, 0), height - 1)
+        return image[v_index, u_index]
+
+    def sample(self, u: np.ndarray, v: np.ndarray, lod: Optional[np.ndarray] = None):
+        """
+        Samples the texture at the (N,) texture coordinates `u`, `v`.
+
+        :param lod:
+            (N,) level of detail of each coordinate (see `level_of_detail`), 0 is the full
+            resolution texture. Ignored by `TextureFilter.Nearest`, `None` means 0.
+        :return:
+            (N,3) colors, texels of the texture itself for `TextureFilter.Nearest`, float
+            otherwise.
+        """
+        if self.texture_filter == TextureFilter.Nearest or lod is None:
+            if self.texture_filter == TextureFilter.Nearest:
+                return self._sample_nearest(self._levels[0], u, v)
+            return self._sample_bilinear(self._levels[0], u, v)
+
+        lod = np.clip(lod, 0, len(self._levels) - 1)
+        if self.texture_filter == TextureFilter.Bilinear:
+            return self._sample_levels(np.rint(lod).astype(np.intp), u, v)
+
+        lower = np.floor(lod).astype(np.intp)
+        upper = np.minimum(lower + 1, len(self._levels) - 1)
+        t = (lod - lower)[:, np.newaxis]
+        return self._sample_levels(lower, u, v) * (1 - t) + self._sample_levels(upper, u, v) * t
+
+    def _sample_levels(self, levels: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """
+        Bilinear samples of each coordinate at its own level.
+        """
+        result = np.empty((len(u), self._levels[0].shape[2]))
+        for level in np.unique(levels):
+            selected = levels == level
+            result[selected] = self._sample_bilinear(self._levels[level], u[selected], v[selected])
+        return result
+
+    def _wrap_indexes(self, indexes: np.ndarray, size: int) -> np.ndarray:
+        if self.wrap == TextureWrap.Repeat:
+            return np.mod(indexes, size)
+        return np.clip(indexes, 0, size - 1)
+
+    def _sample_nearest(self, image, u, v):
+        height, width = image.shape[0], image.shape[1]
+        u_index = self._wrap_indexes(np.rint(u * width).astype(np.intp), width)
+        v_index = self._wrap_indexes(np.rint(v * height).astype(np.intp), height)
+        return image[v_index, u_index]
+
+    def _sample_bilinear(self, image, u, v):
+        height, width = image.shape[0], image.shape[1]
+        s, t = u * width, v * height
+        s0, t0 = np.floor(s), np.floor(t)
+        fs, ft = (s - s0)[:, np.newaxis], (t - t0)[:, np.newaxis]
+        s0, t0 = s0.astype(np.intp), t0.astype(np.intp)
+        u0, u1 = self._wrap_indexes(s0, width), self._wrap_indexes(s0 + 1, width)
+        v0, v1 = self._wrap_indexes(t0, height), self._wrap_indexes(t0 + 1, height)
+        bottom = image[v0, u0] * (1 - fs) + image[v0, u1] * fs
+        top = image[v1, u0] * (1 - fs) + image[v1, u1] * fs
+        return bottom * (1 - ft) + top * ft
@@ -0,0 +1,345 @@
+"""
+Tile-parallel rendering for the "numpy" backend of `TinyRenderer`.
+
+The image is split into square tiles, faces are binned to the tiles their bounding boxes overlap
+and each tile is rasterized and shaded by a process of a `concurrent.futures` pool. The frame
+buffers live in shared memory (`multiprocessing.shared_memory`), so workers write their tiles
+directly into the buffers used by the renderer, without copies.
+
+The pool is created with the buffers and kept for the next frames. The setup of each frame is
+pickled once into another shared memory block, which workers unpickle before their first tile of
+the frame. Large arrays which rarely change between frames (the texture) are copied into a third
+block only when they change, the pickled setup only refers to them.
+
+Tiles never overlap and visibility inside a tile doesn't depend on the order in which faces are
+processed (see `tiny_renderer.rasterizer`), so the result is the same for any number of workers.
+"""
+import io
+import multiprocessing
+import operator
+import pickle
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from tiny_renderer.rasterizer import FrameBuffers
+
+
+def tile_regions(width: int, height: int, tile_size: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Returns the (min_x, min_y, max_x, max_y) regions of the tiles covering a `width` x `height`
+    image, in row-major order.
+    """
+    return [
+        (x, y, min(x + tile_size, width) - 1, min(y + tile_size, height) - 1)
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def bin_faces(boxes: np.ndarray, width: int, height: int, tile_size: int) -> List[np.ndarray]:
+    """
+    Returns, for each tile of `tile_regions`, the indexes of the `boxes` overlapping it.
+    """
+    columns = (width + tile_size - 1) // tile_size
+    rows = (height + tile_size - 1) // tile_size
+    valid = np.flatnonzero((boxes[:, 2] >= boxes[:, 0]) & (boxes[:, 3] >= boxes[:, 1]))
+    first_column, first_row = boxes[valid, 0] // tile_size, boxes[valid, 1] // tile_size
+    num_columns = boxes[valid, 2] // tile_size - first_column + 1
+    num_rows = boxes[valid, 3] // tile_size - first_row + 1
+
+    # one entry for each (face, tile) pair
+    count = num_columns * num_rows
+    face = np.repeat(np.arange(len(valid)), count)
+    i = np.arange(len(face)) - np.repeat(np.cumsum(count) - count, count)
+    tile = (first_row[face] + i // num_columns[face]) * columns + first_column[face]
+    tile += i % num_columns[face]
+
+    order = np.argsort(tile, kind="stable")
+    splits = np.searchsorted(tile[order], np.arange(1, rows * columns))
+    return np.split(valid[face[order]], splits)
+
+
+class SharedFrameBuffers:
+    """
+    `FrameBuffers` allocated in a single shared memory block.
+    """
+
+    def __init__(self, height: int, width: int, depth_dtype=np.float64):
+        """
+        :param depth_dtype:
+            dtype of the z buffer, see `tiny_renderer.framebuffer.DepthFormat`.
+        """
+        self.shape = (height, width)
+        self.depth_dtype = np.dtype(depth_dtype)
+        size = self._layout(height, width, self.depth_dtype)[-1]
+        self._shm = SharedMemory(create=True, size=size)
+        self.buffers = self._create_views(self._shm, height, width, self.depth_dtype)
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+        self._pool = None
+        self._pool_workers = None
+        # pickled setup of the last frame, see `_share_setup`
+        self._setup_shm = None
+        self._setup_finalizer = None
+        self._setup_version = 0
+        # arrays shared with the workers, see `_share_arrays`
+        self._arrays = []
+        self._arrays_shm = None
+        self._arrays_finalizer = None
+        self._arrays_key = None
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._setup_finalizer is not None:
+            self._setup_finalizer()
+            self._setup_shm = self._setup_finalizer = None
+        if self._arrays_finalizer is not None:
+            self._arrays_finalizer()
+            self._arrays_shm = self._arrays_finalizer = None
+        self._arrays = []
+        self._arrays_key = None
+        self.buffers = None
+        self._finalizer()
+
+    @classmethod
+    def _layout(cls, height, width, depth_dtype):
+        """
+        Returns the offsets of the image, z buffer, face buffer and weights buffer plus the total
+        size in bytes.
+        """
+        depth_size = height * width * depth_dtype.itemsize
+        sizes = [height * width * 3, depth_size, height * width * 8, height * width * 24]
+        # keep every buffer aligned to 8 bytes
+        sizes = [(s + 7) // 8 * 8 for s in sizes]
+        return np.cumsum([0] + sizes).tolist()
+
+    @classmethod
+    def _create_views(cls, shm, height, width, depth_dtype) -> FrameBuffers:
+        offsets = cls._layout(height, width, depth_dtype)
+        buffer = shm.buf
+        return FrameBuffers(
+            np.ndarray((height, width, 3), np.uint8, buffer, offsets[0]),
+            np.ndarray((height, width), depth_dtype, buffer, offsets[1]),
+            np.ndarray((height, width), np.int64, buffer, offsets[2]),
+            np.ndarray((height, width, 3), np.float64, buffer, offsets[3]),
+        )
+
+    def render(
+        self,
+        setup,
+        tile_size: int,
+        workers: int,
+        *,
+        shared_arrays: Sequence[np.ndarray] = (),
+        progress=None,
+    ):
+        """
+        Renders `setup` (see `TinyRenderer`) into the buffers using `workers` processes, returns
+        the number of pixels depth tested and passed and the number of occluded faces skipped
+        (see `rasterizer.rasterize_faces`).
+
+        :param shared_arrays:
+            Arrays referenced by `setup` which are copied to the workers only when they aren't the
+            same objects as in the last frame, instead of being pickled with every frame. They
+            must not be modified in place afterwards.
+        :param progress:
+            Called with the fraction of tiles rendered each time a tile is finished, if it raises
+            the tiles not started yet are cancelled.
+        """
+        height, width = self.shape
+        regions = tile_regions(width, height, tile_size)
+        tile_faces = bin_faces(setup.boxes, width, height, tile_size)
+        tasks = [(region, faces) for region, faces in zip(regions, tile_faces) if len(faces)]
+        if not tasks:
+            return 0, 0, 0
+
+        pool = self._get_pool(workers)
+        shared_setup = self._share_setup(setup, shared_arrays)
+        futures = [pool.submit(_render_tile, shared_setup, *task) for task in tasks]
+        counts = []
+        try:
+            for future in as_completed(futures):
+                counts.append(future.result())
+                if progress is not None:
+                    progress(len(counts) / len(tasks))
+        except BaseException as error:
+            # the pool is kept, only wait for the tiles already started
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            if isinstance(error, BrokenProcessPool):
+                # a worker died, the next frame starts a new pool
+                self._pool = None
+            raise
+        return tuple(np.sum(counts, axis=0).tolist())
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        """
+        Returns the pool of `workers` processes attached to the buffers, created the first time.
+        """
+        if self._pool is None or self._pool_workers != workers:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_get_pool_context(),
+                initializer=_init_worker,
+                initargs=(self.name, self.shape, self.depth_dtype),
+            )
+            self._pool_workers = workers
+        return self._pool
+
+    def _share_setup(self, setup, shared_arrays: Sequence[np.ndarray]) -> tuple:
+        """
+        Pickles `setup` into shared memory (reusing the block of the last frame if large
+        enough), `shared_arrays` are only pickled as their index (see `_share_arrays`). Returns
+        the (name, size, version, arrays key) of the block sent to the workers with the tiles.
+        """
+        arrays_key = self._share_arrays(shared_arrays)
+        indexes = {id(array): i for i, array in enumerate(self._arrays)}
+        stream = io.BytesIO()
+        pickler = pickle.Pickler(stream, protocol=pickle.HIGHEST_PROTOCOL)
+        # the shared arrays are kept alive by `self._arrays`, so their ids can't be reused
+        pickler.persistent_id = lambda obj: indexes.get(id(obj))
+        pickler.dump(setup)
+        data = stream.getbuffer()
+        if self._setup_shm is None or self._setup_shm.size < len(data):
+            if self._setup_finalizer is not None:
+                self._setup_finalizer()
+            self._setup_shm = SharedMemory(create=True, size=len(data))
+            self._setup_finalizer = weakref.finalize(self, _release, self._setup_shm)
+        self._setup_shm.buf[: len(data)] = data
+        self._setup_version += 1
+        return self._setup_shm.name, len(data), self._setup_version, arrays_key
+
+    def _share_arrays(self, arrays: Sequence[np.ndarray]) -> tuple:
+        """
+        Copies `arrays` into a new shared memory block if they aren't the ones of the last frame,
+        returns the (name, layout) key of the block, the layout being the (offset, shape, dtype)
+        of each array.
+        """
+        if len(arrays) == len(self._arrays) and all(map(operator.is_, arrays, self._arrays)):
+            return self._arrays_key
+        if self._arrays_finalizer is not None:
+            self._arrays_finalizer()
+            self._arrays_shm = self._arrays_finalizer = None
+        self._arrays = list(arrays)
+        self._arrays_key = None
+        if not arrays:
+            return None
+
+        layout = []
+        size = 0
+        for array in arrays:
+            layout.append((size, array.shape, array.dtype.str))
+            # keep every array aligned to 8 bytes
+            size += (array.nbytes + 7) // 8 * 8
+        self._arrays_shm = SharedMemory(create=True, size=max(size, 1))
+        self._arrays_finalizer = weakref.finalize(self, _release, self._arrays_shm)
+        for array, view in zip(arrays, _create_array_views(self._arrays_shm, layout)):
+            view[...] = array
+        self._arrays_key = (self._arrays_shm.name, tuple(layout))
+        return self._arrays_key
+
+
+def _create_array_views(shm: SharedMemory, layout) -> List[np.ndarray]:
+    views = []
+    for offset, shape, dtype in layout:
+        views.append(np.ndarray(shape, dtype, shm.buf, offset))
+    return views
+
+
+def _release(shm: SharedMemory):
+    try:
+        shm.close()
+    except BufferError:
+        # arrays created from the buffers are still alive, the memory is released with them
+        pass
+    shm.unlink()
+
+
+def _get_pool_context():
+    # forking starts workers faster, they don't need to import the modules again
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+_worker_shm = None
+_worker_buffers = None
+# (name, size, version, arrays key) of the shared setup unpickled last, and the setup
+_worker_setup_key = None
+_worker_setup = None
+# key and views of the arrays shared by `SharedFrameBuffers._share_arrays`
+_worker_arrays_key = None
+_worker_arrays_shm = None
+_worker_arrays = []
+
+
+def _init_worker(shm_name, shape, depth_dtype):
+    global _worker_shm, _worker_buffers
+    _worker_shm = SharedMemory(name=shm_name)
+    _worker_buffers = SharedFrameBuffers._create_views(_worker_shm, *shape, depth_dtype)
+
+
+def _get_worker_arrays(arrays_key) -> List[np.ndarray]:
+    """
+    Returns read-only views of the arrays shared by `SharedFrameBuffers._share_arrays`, attached
+    only once.
+    """
+    global _worker_arrays_key, _worker_arrays_shm, _worker_arrays
+    if arrays_key != _worker_arrays_key:
+        if _worker_arrays_shm is not None:
+            _worker_arrays = []
+            try:
+                _worker_arrays_shm.close()
+            except BufferError:
+                # views are still referenced, the block is released with them
+                pass
+            _worker_arrays_shm = None
+        if arrays_key is not None:
+            name, layout = arrays_key
+            _worker_arrays_shm = SharedMemory(name=name)
+            _worker_arrays = _create_array_views(_worker_arrays_shm, layout)
+            for array in _worker_arrays:
+                array.flags.writeable = False
+        _worker_arrays_key = arrays_key
+    return _worker_arrays
+
+
+def _get_worker_setup(shared_setup):
+    """
+    Returns the setup shared by `SharedFrameBuffers._share_setup`, unpickled only once per frame.
+    """
+    global _worker_setup_key, _worker_setup
+    if shared_setup != _worker_setup_key:
+        name, size, _, arrays_key = shared_setup
+        # the setup of the last frame may refer to the arrays replaced below
+        _worker_setup = None
+        arrays = _get_worker_arrays(arrays_key)
+        shm = SharedMemory(name=name)
+        try:
+            unpickler = pickle.Unpickler(io.BytesIO(shm.buf[:size]))
+            unpickler.persistent_load = arrays.__getitem__
+            _worker_setup = unpickler.load()
+        finally:
+            shm.close()
+        _worker_setup_key = shared_setup
+    return _worker_setup
+
+
+def _render_tile(shared_setup, region, faces):
+    setup = _get_worker_setup(shared_setup)
+    counts = setup.rasterize(_worker_buffers, region, setup.faces[faces], setup.boxes[faces])
+    setup.shade(_worker_buffers, region)
+    return counts
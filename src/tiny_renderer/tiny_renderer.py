@@ -1,19 +1,35 @@
 import random
+import time
 from collections import namedtuple
+from contextlib import nullcontext
 from enum import IntEnum
+from math import sqrt
 from pathlib import Path
-from typing import Sequence, Union
+from typing import Callable, Optional, Sequence, Union
 
 import numpy as np
 from PIL import Image
 
+import batch_math
 from math_utils import Vec2, Vec3, apply_weights
+from tiny_renderer import jit_kernels, mesh_cache, rasterizer, texture_cache, tiles
 from tiny_renderer.bitmap import Bitmap
-from tiny_renderer.model import Model
+from tiny_renderer.frame_stats import FrameStats
+from tiny_renderer.framebuffer import DepthFormat, DepthMetric, FrameBuffer
+from tiny_renderer.hierarchical_z import HierarchicalZ, nearest_distance
+from tiny_renderer.model import Model, _read_only
+from tiny_renderer.texture_sampler import TextureFilter, TextureSampler, TextureWrap
+from tiny_renderer.transform import Transform
 
 Color = namedtuple("Color", "r g b a")
 
 
+class RenderCancelled(Exception):
+    """
+    Raised by the `progress` callback of `TinyRenderer.render` to stop rendering a frame.
+    """
+
+
 class Colors:
     White = Color(255, 255, 255, 255)
     Red = Color(255, 0, 0, 255)
@@ -67,19 +83,336 @@ class RenderingMode(IntEnum):
         return [RenderingMode.get_caption(i) for i in RenderingMode]
 
 
+class RasterizationStrategy(IntEnum):
+    """
+    How the "python" backend of `TinyRenderer` finds the pixels covered by a triangle
+    """
+
+    BoundingBox = 0
+    EdgeFunction = 1
+
+    @classmethod
+    def get_caption(cls, index):
+        captions = {
+            cls.BoundingBox: "Bounding box",
+            cls.EdgeFunction: "Edge functions",
+        }
+        return captions[index]
+
+    @classmethod
+    def get_captions(cls):
+        return [RasterizationStrategy.get_caption(i) for i in RasterizationStrategy]
+
+
+BACKENDS = ("python", "numpy")
+
+# faces drawn by the "python" backend between calls to the progress callback of `render`
+PROGRESS_INTERVAL = 256
+
+# pixels per side of the blocks of the passes of `TinyRenderer.render_progressive`
+PROGRESSIVE_STEPS = (8, 4, 2, 1)
+
+# texture passed to the JIT compiled kernels when rendering without texture
+_EMPTY_TEXTURE = np.zeros((1, 1, 3), np.uint8)
+_EMPTY_UVS = np.zeros((3, 2))
+
+
+class _FaceSetup:
+    """
+    Screen space faces of the model, which of them are drawn and their bounding boxes, plus the
+    per face attributes used for shading, gathered the first time a frame needs them. They only
+    depend on the model, its transforms, the resolution and back face culling, so `TinyRenderer`
+    reuses them for frames with other render or lighting modes, see `TinyRenderer.cache_setup`.
+    """
+
+    def __init__(self, renderer: "TinyRenderer", screen_verts: np.ndarray):
+        """
+        :param screen_verts:
+            (N,3) screen space vertices of the model, see `TinyRenderer._transform_vertices`.
+        """
+        self.triangles = rasterizer.gather_faces(screen_verts, renderer._model.faces)
+        culled = rasterizer.offscreen_faces(self.triangles, renderer._width, renderer._height)
+        if renderer._cull_back_faces:
+            culled |= rasterizer.back_faces(self.triangles)
+        self.num_culled = int(np.count_nonzero(culled))
+        self.degenerated = culled | rasterizer.degenerated_faces(self.triangles)
+        drawable = ~self.degenerated & (rasterizer.barycentric_denominators(self.triangles) != 0)
+        self.faces = np.flatnonzero(drawable)
+        self.boxes = rasterizer.bounding_boxes(
+            self.triangles[self.faces], renderer._width, renderer._height
+        )
+
+        self._uvs = None
+        self._untextured = None
+        self._smooth_normals = None
+        self._flat_normals = None
+        # keyed on the random seed
+        self._colors = {}
+        # keyed on the texture sampler, only the last one is kept
+        self._texture_lod = {}
+
+    def get_colors(self, random_seed) -> np.ndarray:
+        """
+        Returns the (F,3) colors of `RenderingMode.RandomColors`.
+        """
+        if random_seed not in self._colors:
+            # same sequence of random numbers as drawing the faces one by one
+            rand = random.Random(random_seed)
+            colors = np.zeros((len(self.triangles), 3))
+            for i in np.flatnonzero(~self.degenerated):
+                colors[i] = (rand.randint(0, 255), rand.randint(0, 255), rand.randint(0, 255))
+            self._colors[random_seed] = colors
+        return self._colors[random_seed]
+
+    def get_uvs(self, model: Model) -> np.ndarray:
+        """
+        Returns the (F,3,2) texture coordinates of the faces, zero for `Model.untextured_faces`.
+        """
+        if self._uvs is None:
+            indexes = model.texture_coordinates_indexes
+            untextured = model.untextured_faces
+            if untextured.any():
+                self._uvs = np.zeros(indexes.shape + (2,))
+                self._uvs[~untextured] = model.uvs[indexes[~untextured]]
+                self._untextured = untextured
+            else:
+                self._uvs = model.uvs.astype(np.float64)[indexes]
+        return self._uvs
+
+    def get_untextured(self, model: Model) -> Optional[np.ndarray]:
+        """
+        Returns `Model.untextured_faces`, `None` if all faces have texture coordinates.
+        """
+        self.get_uvs(model)
+        return self._untextured
+
+    def get_texture_lod(self, model: Model, texture: TextureSampler) -> Optional[np.ndarray]:
+        """
+        Returns the (F,) levels of detail the faces sample `texture` at, `None` for
+        `TextureFilter.Nearest`.
+        """
+        if texture.texture_filter == TextureFilter.Nearest:
+            return None
+        if texture not in self._texture_lod:
+            uvs = self.get_uvs(model)
+            self._texture_lod = {
+                texture: texture.level_of_detail(
+                    batch_math.triangle_areas(uvs[:, 0], uvs[:, 1], uvs[:, 2]),
+                    batch_math.triangle_areas(
+                        self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2]
+                    ),
+                )
+            }
+        return self._texture_lod[texture]
+
+    def get_normals(self, light_mode: LightingMode, model: Model, normals: np.ndarray):
+        """
+        Returns the (F,3,3) normals of the vertices of the faces for `LightingMode.Smooth`,
+        otherwise the (F,3) normals of the faces.
+
+        :param normals:
+            (N,3) camera space normals of the model, see `TinyRenderer._transform_normals`.
+        """
+        if light_mode == LightingMode.Smooth:
+            if self._smooth_normals is None:
+                self._smooth_normals = normals.astype(np.float64)[model.normal_indexes]
+            return self._smooth_normals
+        if self._flat_normals is None:
+            self._flat_normals = rasterizer.flat_normals(self.triangles)
+        return self._flat_normals
+
+
+class _FrameSetup:
+    """
+    Everything the "numpy" backend needs to render a frame: screen space faces, their bounding
+    boxes and the attributes used for shading. It doesn't reference the renderer, so it can be
+    sent to other processes to render tiles of the image.
+    """
+
+    def __init__(self, renderer: "TinyRenderer", face_setup: _FaceSetup):
+        """
+        :param face_setup:
+            The faces of the model, see `TinyRenderer._get_face_setup`.
+        """
+        model = renderer._model
+        self.render_mode = renderer._render_mode
+        self.light_mode = renderer._light_mode
+        self.camera = renderer._get_camera_array()
+        self.depth_encoding = renderer._framebuffer.depth_encoding
+        self.hierarchical_z = renderer._use_hierarchical_z
+        self.sort_front_to_back = renderer._sort_front_to_back
+        light_direction = renderer._get_light_direction()
+        self.light_direction = np.array(
+            [light_direction.x, light_direction.y, light_direction.z], np.float64
+        )
+
+        self.triangles = face_setup.triangles
+        self.num_culled = face_setup.num_culled
+        self.faces = face_setup.faces
+        self.boxes = face_setup.boxes
+
+        self.colors = None
+        self.uvs = None
+        self.untextured = None
+        self.texture = None
+        self.texture_lod = None
+        if self.render_mode == RenderingMode.RandomColors:
+            self.colors = face_setup.get_colors(renderer._random_seed)
+        elif self.render_mode == RenderingMode.Texturized:
+            self.uvs = face_setup.get_uvs(model)
+            self.untextured = face_setup.get_untextured(model)
+            self.texture = renderer._texture_sampler
+            self.texture_lod = face_setup.get_texture_lod(model, self.texture)
+        self.normals = face_setup.get_normals(self.light_mode, model, renderer._transform_normals())
+
+    def rasterize(self, buffers, region, faces, boxes, grid=rasterizer.FULL_GRID):
+        """
+        Resolves the visibility of `faces` (with bounding `boxes`) inside `region`, returns the
+        number of pixels depth tested and passed and the number of occluded faces skipped.
+
+        :param grid:
+            Only pixels of this `rasterizer.PixelGrid` are rasterized.
+        """
+        return rasterizer.rasterize_faces(
+            self.triangles,
+            faces,
+            rasterizer.clip_boxes(boxes, region),
+            self.camera,
+            buffers.z_buffer,
+            buffers.face_buffer,
+            buffers.weights_buffer,
+            grid,
+            self.depth_encoding,
+            hierarchical_z=self.hierarchical_z,
+            sort_front_to_back=self.sort_front_to_back,
+        )
+
+    def shade(self, buffers, region, grid=rasterizer.FULL_GRID):
+        """
+        Computes the color of the pixels inside `region` (and `grid`) whose visible face is
+        already known.
+        """
+        rows, cols = rasterizer.grid_slices(region, grid)
+        face_buffer = buffers.face_buffer[rows, cols]
+        covered = face_buffer >= 0
+        face = face_buffer[covered]
+        weights = buffers.weights_buffer[rows, cols][covered]
+
+        if self.render_mode == RenderingMode.Texturized:
+            uv = batch_math.apply_weights(self.uvs[face], weights)
+            lod = self.texture_lod[face] if self.texture_lod is not None else None
+            color = self.texture.sample(uv[:, 0], uv[:, 1], lod)
+            if self.untextured is not None:
+                color[self.untextured[face]] = Colors.White[:3]
+        elif self.render_mode == RenderingMode.RandomColors:
+            color = self.colors[face]
+        else:
+            color = np.array(Colors.White[:3])
+
+        if self.light_mode == LightingMode.Smooth:
+            normal = batch_math.apply_weights(self.normals[face], weights)
+        else:
+            normal = self.normals[face]
+
+        light_intensity = np.abs(batch_math.dot(self.light_direction, normal))
+        buffers.image[rows, cols][covered] = color * light_intensity[:, np.newaxis]
+
+
 class TinyRenderer:
     """
     My own version of the original Tiny Renderer:
     https://github.com/ssloy/tinyrenderer/wiki
     """
 
-    def __init__(self, *, bind_texture=True):
+    def __init__(
+        self,
+        *,
+        bind_texture=True,
+        backend="python",
+        workers=1,
+        tile_size=128,
+        random_seed=0,
+        cull_back_faces=False,
+        rasterization=RasterizationStrategy.BoundingBox,
+        jit=None,
+        texture_filter=TextureFilter.Nearest,
+        texture_wrap=TextureWrap.Clamp,
+        depth_format=DepthFormat.Float64,
+        depth_metric=DepthMetric.Distance,
+        hierarchical_z=False,
+        sort_front_to_back=False,
+        cache_setup=False,
+    ):
         """
         :param bind_texture:
             If `True`, `TinyRenderer` will create a `tiny_renderer.bitmap.Bitmap` instance
             binding any rendered image to an OpenGL texture. This can be disabled for tests
             so they don't need to initialize an OpenGL context.
+        :param backend:
+            Which implementation rasterizes triangles, one of `BACKENDS`:
+            "python" walks every pixel of a triangle's bounding box using `math_utils`,
+            "numpy" processes all faces of the model at once as arrays (see
+            `tiny_renderer.rasterizer`). Both produce the same image.
+        :param workers:
+            Number of processes used to render the image, split into tiles of `tile_size` x
+            `tile_size` pixels (see `tiny_renderer.tiles`). Only supported by the "numpy"
+            backend, the image doesn't depend on the number of workers.
+        :param random_seed:
+            Seed of the colors used by `RenderingMode.RandomColors`, every render with the same
+            seed uses the same colors.
+        :param cull_back_faces:
+            If `True`, faces which aren't counterclockwise in screen space (facing away from the
+            camera) are skipped before rasterization, see `cull_back_faces`.
+        :param rasterization:
+            `RasterizationStrategy` used by the "python" backend, see
+            `set_rasterization_strategy`.
+        :param jit:
+            Whether the "python" backend draws triangles (with `RasterizationStrategy.BoundingBox`)
+            and lines with the Numba compiled kernels of `tiny_renderer.jit_kernels`, which
+            produce the same image. `None` uses them if Numba is installed.
+        :param texture_filter:
+            `TextureFilter` used to sample the texture, see `set_texture_sampling`.
+        :param texture_wrap:
+            `TextureWrap` used to sample the texture, see `set_texture_sampling`.
+        :param depth_format:
+            How the z buffer stores distances, see `set_depth_format`.
+        :param depth_metric:
+            Which distance to the camera the z buffer stores, see `set_depth_metric`.
+        :param hierarchical_z:
+            If `True`, triangles behind the pixels already drawn are skipped before rasterizing
+            them, see `hierarchical_z`.
+        :param sort_front_to_back:
+            If `True`, the "numpy" backend rasterizes triangles from the nearest to the farthest
+            one, see `sort_front_to_back`.
+        :param cache_setup:
+            If `True`, the transformed model, the setup of its faces and the visibility of its
+            pixels are reused by the next frames until they change, see `cache_setup`.
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        if workers > 1 and backend != "numpy":
+            raise ValueError("Rendering with multiple workers requires the 'numpy' backend")
+        if jit and not jit_kernels.AVAILABLE:
+            raise ValueError("JIT compiled kernels require Numba, which isn't installed")
+        self._backend = backend
+        self._workers = workers
+        self._use_jit = jit_kernels.AVAILABLE if jit is None else jit
+        self._tile_size = tile_size
+        # frame buffers in shared memory, used when rendering with multiple workers
+        self._tiles = None
+        self._random_seed = random_seed
+        self._random = random.Random(random_seed)
+        self._cull_back_faces = cull_back_faces
+        self._use_hierarchical_z = hierarchical_z
+        # tiles of the z buffer used to skip occluded triangles while the "python" backend draws
+        # a frame, `None` if disabled
+        self._hierarchical_z = None
+        self._sort_front_to_back = False
+        self.sort_front_to_back = sort_front_to_back
+        self._cache_setup = cache_setup
+        self._rasterization = RasterizationStrategy.BoundingBox
+        self.set_rasterization_strategy(rasterization)
+
         self._height = 800
         self._width = 800
         self._depth = 800
@@ -87,109 +420,827 @@ class TinyRenderer:
         self._scale_x = 1.0
         self._scale_y = 1.0
         self._scale_z = 1.0
+        # model, view, projection and viewport transforms, see `transform`
+        self._transform = Transform()
+        # screen space vertices and camera space normals of the model, reused until the model
+        # or `_transform` change, see `_transform_vertices`
+        self._transformed = None
+        self._transformed_key = None
+        self._screen_vertices = None
+        # faces of the model, see `_get_face_setup` and `_get_face_attributes`
+        self._face_setup = None
+        self._face_setup_key = None
+        self._face_attributes = None
+        self._face_attributes_key = None
+        # (model, edges) drawn by `_draw_wireframe`
+        self._edges = None
+        # what the visibility resolved by the last frame depends on (see
+        # `_get_visibility_key`), `None` unless the face, weights and z buffers still hold it
+        self._visibility_key = None
 
-        self._image = np.zeros((self._height, self._width, 3), np.uint8)
-        self._z_buffer = np.full((self._height, self._width, 1), np.inf)
+        # frame buffers reused by every frame, `_image`, `_z_buffer`, `_face_buffer` and
+        # `_weights_buffer` are views of its buffers
+        self._depth_format = DepthFormat(depth_format)
+        self._depth_metric = DepthMetric(depth_metric)
+        self._framebuffer = FrameBuffer(self._width, self._height, self._depth_format)
+        self._framebuffer.set_depth_metric(self._depth_metric)
+        self._image = self._framebuffer.image
+        self._z_buffer = self._framebuffer.z_buffer[..., np.newaxis]
+        # used by the "numpy" backend to defer shading until visibility is resolved:
+        self._face_buffer = None
+        self._weights_buffer = None
         self._camera_postion = Vec3(0, 0, -1)
+        # `None` uses the direction of the camera
+        self._light_direction = None
         self._model = None
         self.set_scale(0.45, 0.45, 0.45)
 
         self._render_mode = None
         self._light_mode = None
+        # statistics of the frame being rendered, `None` unless requested
+        self._stats = None
+        # progress callback of the frame being rendered, see `render`
+        self._progress = None
+        # callback and steps of the frame being rendered by `render_progressive`
+        self._on_pass = None
+        self._progressive_steps = PROGRESSIVE_STEPS
+        self._last_frame_stats = None
         self._bind_texture = bind_texture
         self._bitmap = Bitmap(self.get_image()) if bind_texture else None
-        self._texture_image = None
+        self._texture_sampler = None
+        self._texture_filter = TextureFilter(texture_filter)
+        self._texture_wrap = TextureWrap(texture_wrap)
 
-    def setup_model(self, model_filename: Union[str, Path], texture_filename: Union[str, Path]):
+    def setup_model(
+        self,
+        model_filename: Union[str, Path],
+        texture_filename: Union[str, Path],
+        *,
+        use_mesh_cache=False,
+    ):
         """
         Defines a model (.obj) and texture for this `TinyRenderer`.
+
+        :param texture_filename:
+            An image or a raw `.npy` texture, decoded textures and their mip chains are shared
+            through the cache of `tiny_renderer.texture_cache`.
+        :param use_mesh_cache:
+            If `True` the parsed model is loaded from (or stored to) the on-disk cache, see
+            `tiny_renderer.mesh_cache`.
         """
-        self.load_model(Path(model_filename))
-        self._texture_image = np.flipud(Image.open(texture_filename))[..., ::-1]
+        self.load_model(Path(model_filename), use_mesh_cache=use_mesh_cache)
+        self._texture_sampler = TextureSampler.from_levels(
+            texture_cache.load_mip_chain(texture_filename),
+            texture_filter=self._texture_filter,
+            wrap=self._texture_wrap,
+        )
 
     @property
     def bitmap(self) -> Bitmap:
         return self._bitmap
 
-    def render(self, render_mode: RenderingMode, light_mode: LightingMode):
-        self.clear()
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def cull_back_faces(self) -> bool:
+        """
+        Whether faces facing away from the camera are skipped. Faces entirely outside of the
+        viewport are always skipped. For a closed mesh this halves the rasterization work, but
+        back faces seen through holes of an open mesh are missing from the image.
+        """
+        return self._cull_back_faces
+
+    @cull_back_faces.setter
+    def cull_back_faces(self, value: bool):
+        self._cull_back_faces = value
 
-        self._render_mode = render_mode
-        self._light_mode = light_mode
-        self._rasterize()
+    @property
+    def hierarchical_z(self) -> bool:
+        """
+        Whether triangles are tested against the largest distance stored in each 8 x 8 tile of
+        the z buffer (see `tiny_renderer.hierarchical_z`) before rasterizing them: triangles
+        behind every tile they overlap are skipped. It doesn't change the image, it saves work
+        when many triangles are hidden behind the ones already drawn. The "numpy" backend tests
+        triangles in groups, see `rasterizer.rasterize_faces`.
+        """
+        return self._use_hierarchical_z
+
+    @hierarchical_z.setter
+    def hierarchical_z(self, value: bool):
+        self._use_hierarchical_z = value
+
+    @property
+    def sort_front_to_back(self) -> bool:
+        """
+        Whether the "numpy" backend rasterizes triangles from the nearest to the farthest one,
+        so `hierarchical_z` skips more of them. It doesn't change the image. The "python" backend
+        draws triangles in the order of the model, the colors of `RenderingMode.RandomColors`
+        depend on it.
+        """
+        return self._sort_front_to_back
+
+    @sort_front_to_back.setter
+    def sort_front_to_back(self, value: bool):
+        if value and self._backend != "numpy":
+            raise ValueError("Sorting triangles front to back requires the 'numpy' backend")
+        self._sort_front_to_back = value
+
+    @property
+    def cache_setup(self) -> bool:
+        """
+        Whether the work that doesn't depend on the render and lighting modes is reused by the
+        next frames: the transformed vertices and normals of the model, the culling, bounding
+        boxes and attributes of its faces and, for frames rasterized by the batched rasterizer
+        (the "numpy" backend and `render_progressive`), the visibility of every pixel. Frames
+        which only change the render mode, lighting mode, light, texture sampling or random seed
+        then only shade the image again. Everything is computed again when the model, its
+        transforms (see `transform`), the resolution, the camera position, the depth format or
+        metric or `cull_back_faces` change. The image doesn't depend on it, but frames reusing
+        the visibility don't rasterize any pixel (see `FrameStats.visibility_reused`). Disabled
+        by default.
+        """
+        return self._cache_setup
+
+    @cache_setup.setter
+    def cache_setup(self, value: bool):
+        self._cache_setup = value
+
+    @property
+    def last_frame_stats(self) -> Optional[FrameStats]:
+        """
+        Statistics of the last frame rendered with `stats=True`.
+        """
+        return self._last_frame_stats
+
+    def render(
+        self,
+        render_mode: RenderingMode,
+        light_mode: LightingMode,
+        *,
+        stats=False,
+        progress: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        :param stats:
+            If `True`, the time spent in each stage and counters of the work done are collected
+            into a `FrameStats`, available at `last_frame_stats`.
+        :param progress:
+            Called from time to time with the fraction of the frame rendered so far (from 0 to
+            1). It may raise `RenderCancelled` to stop rendering, leaving a partial image.
+        """
+        self._stats = FrameStats() if stats else None
+        self._progress = progress
+        try:
+            self._random = random.Random(self._random_seed)
+            self._render_mode = render_mode
+            self._light_mode = light_mode
+            reuse_visibility = self._can_reuse_visibility()
+            with self._stage("clear"):
+                if reuse_visibility:
+                    self._image.fill(0)
+                else:
+                    self.clear()
+            self._rasterize(reuse_visibility)
+        except BaseException:
+            self._stats = None
+            raise
+        finally:
+            self._progress = None
+        if progress is not None:
+            progress(1.0)
         if self._bind_texture:
-            self._bitmap.bind_texture(pixels=self.get_image())
+            with self._stage("bind_texture"):
+                self._bitmap.bind_texture(pixels=self.get_image())
+
+        if self._stats is not None:
+            self._stats.pixels_covered = self._framebuffer.count_covered_pixels()
+            self._last_frame_stats = self._stats
+            self._stats = None
+
+    def render_progressive(
+        self,
+        render_mode: RenderingMode,
+        light_mode: LightingMode,
+        on_pass: Callable[[int, np.ndarray], None],
+        *,
+        steps: Sequence[int] = PROGRESSIVE_STEPS,
+        stats=False,
+        progress: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Renders a frame in passes of increasing resolution, publishing a preview after each one.
+        The first pass renders one pixel out of `steps[0]` x `steps[0]`, the next passes only
+        the pixels missing for their step (see `rasterizer.refinement_grids`). Every pass reuses
+        the transformed vertices and triangle setup and every pixel is rendered once, so the
+        whole frame costs about the same as `render`, which produces the same final image.
+
+        Passes are rasterized in this process by the batched rasterizer of the "numpy" backend
+        (which produces the same pixels as the "python" one), whatever the backend and number of
+        workers. Wireframes are drawn in a single pass.
+
+        :param on_pass:
+            Called after each pass with its step and a new (H,W,3) preview image (see
+            `get_image`), where every rendered pixel fills its `step` x `step` block. The image
+            of the last pass (step 1) is the final one.
+        :param steps:
+            Steps of the passes, see `rasterizer.refinement_grids`.
+        :param stats:
+            See `render`, counters and stage times are the sum of all passes.
+        :param progress:
+            See `render`.
+        """
+        rasterizer.refinement_grids(steps)
+        self._on_pass = on_pass
+        self._progressive_steps = steps
+        try:
+            self.render(render_mode, light_mode, stats=stats, progress=progress)
+        finally:
+            self._on_pass = None
+        if render_mode == RenderingMode.Wireframe:
+            on_pass(1, np.ascontiguousarray(self.get_image()))
+
+    def _stage(self, name):
+        """
+        Context manager timing the stage `name` of the current frame, if collecting stats.
+        """
+        if self._stats is None:
+            return nullcontext()
+        return self._stats.stage(name)
 
     def clear(self):
-        self._image = np.zeros((self._height, self._width, 3), np.uint8)
-        self._z_buffer = np.full((self._height, self._width, 1), np.inf)
+        """
+        Clears the frame buffers in place. They're only allocated again when the resolution or
+        the depth format changed, in shared memory when rendering with multiple workers.
+
+        The image returned by `get_image` is a view of the buffers, overwritten by the next frame.
+        """
+        self._visibility_key = None
+        shape = (self._height, self._width)
+        framebuffer = self._framebuffer
+        if (
+            (framebuffer.height, framebuffer.width) != shape
+            or framebuffer.depth_format != self._depth_format
+            or (self._workers > 1 and self._tiles is None)
+        ):
+            self.close()
+            if self._workers > 1:
+                depth_dtype = FrameBuffer.get_depth_dtype(self._depth_format)
+                self._tiles = tiles.SharedFrameBuffers(*shape, depth_dtype)
+                buffers = self._tiles.buffers
+            else:
+                buffers = None
+            framebuffer = FrameBuffer(
+                self._width, self._height, self._depth_format, buffers=buffers
+            )
+            self._framebuffer = framebuffer
+
+        framebuffer.set_depth_range(self._get_depth_range())
+        framebuffer.set_depth_metric(self._depth_metric)
+        framebuffer.clear(
+            deferred=self._backend == "numpy" or self._on_pass is not None or self._workers > 1
+        )
+        self._use_framebuffer(framebuffer)
+
+    def _use_framebuffer(self, framebuffer: FrameBuffer):
+        self._framebuffer = framebuffer
+        self._image, z_buffer, self._face_buffer, self._weights_buffer = framebuffer.buffers
+        self._z_buffer = z_buffer[..., np.newaxis]
+
+    def _get_depth_range(self) -> float:
+        """
+        Returns the distance from the camera to the farthest corner of the screen space box the
+        model is scaled to (see `set_scale`), the largest distance stored by integer depth
+        formats.
+        """
+        size = 2 * self._transform.viewport_size
+        camera = self._get_camera_array()
+        farthest = np.maximum(np.abs(camera), np.abs(camera - size))
+        return max(float(np.linalg.norm(farthest)), 1.0)
+
+    def close(self):
+        """
+        Shuts down the worker processes and releases the shared memory used to render with
+        multiple workers, keeping a copy of the image.
+        """
+        if self._tiles is not None:
+            self._use_framebuffer(self._framebuffer.copy())
+            self._tiles.close()
+            self._tiles = None
+
+    def set_rasterization_strategy(self, strategy: RasterizationStrategy):
+        """
+        `RasterizationStrategy.BoundingBox` computes the barycentric weights of every pixel of
+        a triangle's bounding box from scratch, `RasterizationStrategy.EdgeFunction` steps edge
+        functions and attributes incrementally (see `_draw_triangle_edge_functions`). The
+        "numpy" backend has its own batched rasterizer and only supports the former.
+        """
+        if self._backend == "numpy" and strategy != RasterizationStrategy.BoundingBox:
+            raise ValueError("The 'numpy' backend only supports bounding box rasterization")
+        self._rasterization = RasterizationStrategy(strategy)
+
+    @property
+    def texture_sampler(self) -> Optional[TextureSampler]:
+        return self._texture_sampler
+
+    def set_texture_sampling(self, texture_filter: TextureFilter, texture_wrap: TextureWrap):
+        """
+        Defines how the texture is sampled by `RenderingMode.Texturized`, see
+        `tiny_renderer.texture_sampler`. Filters other than `TextureFilter.Nearest` read smaller
+        mip levels for triangles that are small on screen.
+        """
+        self._texture_filter = TextureFilter(texture_filter)
+        self._texture_wrap = TextureWrap(texture_wrap)
+        if self._texture_sampler is not None:
+            self._texture_sampler.texture_filter = self._texture_filter
+            self._texture_sampler.wrap = self._texture_wrap
+
+    def set_resolution(self, width: int, height: int, depth: Optional[int] = None):
+        """
+        Sets the size of the rendered image. The model is scaled to it (see `set_scale`), `depth`
+        scales z and defaults to the largest of `width` and `height`.
+        """
+        self._width = width
+        self._height = height
+        self._depth = max(width, height) if depth is None else depth
+        self._update_viewport()
+        self.clear()
+
+    @property
+    def depth_format(self) -> DepthFormat:
+        return self._depth_format
+
+    def set_depth_format(self, depth_format: DepthFormat):
+        """
+        Sets how the z buffer stores distances to the camera, see
+        `tiny_renderer.framebuffer.DepthFormat`. `DepthFormat.Float64` (the default) is as
+        precise as the "python" backend's arithmetic, smaller formats use less memory but pixels
+        at almost the same distance may be drawn in a different order.
+        """
+        self._depth_format = DepthFormat(depth_format)
+        self.clear()
+
+    @property
+    def depth_metric(self) -> DepthMetric:
+        return self._depth_metric
+
+    def set_depth_metric(self, depth_metric: DepthMetric):
+        """
+        Sets which distance to the camera the z buffer stores, see
+        `tiny_renderer.framebuffer.DepthMetric`. `DepthMetric.Distance` (the default) produces
+        the reference images, `DepthMetric.ScreenZ` skips a square root for every pixel and
+        orders pixels by their unrounded depth, so a few pixels where faces intersect or touch
+        may show a different face.
+        """
+        self._depth_metric = DepthMetric(depth_metric)
+        self._framebuffer.set_depth_metric(self._depth_metric)
+
+    def set_camera_position(self, x, y, z):
+        """
+        Sets the position of the camera in screen space (pixels, with z scaled by the depth),
+        pixels closer to it are drawn over farther ones. By default the camera is at (0, 0, -1),
+        right in front of the image.
+        """
+        self._camera_postion = Vec3(x, y, z)
+
+    def set_light_direction(self, x, y, z):
+        """
+        Sets the direction of the (directional) light, it's normalized. By default the light
+        comes from the camera, see `set_camera_position`.
+        """
+        self._light_direction = Vec3(x, y, z).normalized()
+
+    def _get_light_direction(self) -> Vec3:
+        if self._light_direction is None:
+            return self._camera_postion.normalized()
+        return self._light_direction
 
     def set_scale(self, x, y, z):
+        """
+        Sets the fraction of the resolution (and depth) the model is scaled to: normalized device
+        coordinates from -1 to 1 cover twice this fraction, see `tiny_renderer.transform`.
+        """
         self._scale_x = x
         self._scale_y = y
         self._scale_z = z
+        self._update_viewport()
+
+    def _update_viewport(self):
+        self._transform.set_viewport(
+            self._width * self._scale_x,
+            self._height * self._scale_y,
+            self._depth * self._scale_z,
+        )
+
+    @property
+    def transform(self) -> Transform:
+        """
+        Model, view, projection and viewport transforms applied to the vertices of the model, see
+        `tiny_renderer.transform`. The viewport follows `set_resolution` and `set_scale`.
+        """
+        return self._transform
+
+    def set_model_matrix(self, matrix: np.ndarray):
+        """
+        Sets the (4,4) matrix placing the model in the scene, e.g. a
+        `tiny_renderer.transform.rotation` to turn it around. Normals are transformed too, so the
+        light stays still while the model turns.
+        """
+        self._transform.model = matrix
 
-    def load_model(self, filename):
+    def set_view_matrix(self, matrix: np.ndarray):
+        """
+        Sets the (4,4) matrix from the scene to camera space, see
+        `tiny_renderer.transform.look_at`. Pixels are still depth tested against the screen space
+        camera position, see `set_camera_position`.
+        """
+        self._transform.view = matrix
+
+    def set_projection_matrix(self, matrix: np.ndarray):
+        """
+        Sets the (4,4) projection matrix, see `tiny_renderer.transform.perspective`. By default
+        the projection is orthographic.
+        """
+        self._transform.projection = matrix
+
+    def load_model(self, filename, *, use_mesh_cache=False):
+        if use_mesh_cache:
+            self._model = mesh_cache.load_model(filename)
+            return
         self._model = Model()
         self._model.load_from_obj(filename)
 
     def _draw_wireframe(self):
-        for i in range(self._model.num_faces()):
-            face = self._model.get_face_at(i)
-            for j in range(3):
-                v0 = self._model.get_vertex_at(face[j])
-                v1 = self._model.get_vertex_at(face[(j + 1) % 3])
-                # scale down the model
-                x0 = (v0[0] + 1.0) * (self._width * self._scale_x)
-                y0 = (v0[1] + 1.0) * (self._height * self._scale_y)
-                x1 = (v1[0] + 1.0) * (self._width * self._scale_x)
-                y1 = (v1[1] + 1.0) * (self._height * self._scale_y)
-
-                x0, y0, x1, y1 = round(x0), round(y0), round(x1), round(y1)
-                self.draw_line(Vec3(x0, y0), Vec3(x1, y1), Colors.White, Colors.White)
-
-    def _rasterize(self):
+        """
+        Draws every edge of the model once, walking all of them at once, see
+        `rasterizer.draw_lines`. The image is the same as calling `draw_line` for the three
+        edges of every face.
+        """
+        screen_verts = self._transform_vertices()[:, :2]
+        if not self._cache_setup or self._edges is None or self._edges[0] is not self._model:
+            self._edges = (self._model, rasterizer.unique_edges(self._model.faces))
+        edges = self._edges[1]
+        tested, passed = rasterizer.draw_lines(
+            screen_verts[edges[:, 0]],
+            screen_verts[edges[:, 1]],
+            self._get_camera_array(),
+            self._z_buffer[..., 0],
+            self._image,
+            Colors.White,
+            Colors.White,
+            self._framebuffer.depth_encoding,
+        )
+        if self._stats is not None:
+            self._stats.pixels_tested, self._stats.pixels_passed = tested, passed
+
+    def _rasterize(self, reuse_visibility=False):
+        """
+        :param reuse_visibility:
+            If `True` the face, weights and z buffers still hold the visibility resolved by the
+            last frame, only the image is shaded, see `cache_setup`.
+        """
         if self._render_mode == RenderingMode.Wireframe:
-            self._draw_wireframe()
+            with self._stage("wireframe"):
+                self._draw_wireframe()
             return
 
-        for i in range(self._model.num_faces()):
-            face = self._model.get_face_at(i)
-            verts = [self._model.get_vertex_at(face[x]) for x in range(3)]
-            uvs = self._model.get_uvs_from_face(i)
-            # scale the model
-            verts = [
-                Vec3(
-                    (v[0] + 1.0) * (self._width * self._scale_x),
-                    (v[1] + 1.0) * (self._height * self._scale_y),
-                    (v[2] + 1.0) * (self._depth * self._scale_z),
-                )
-                for v in verts
-            ]
-            light_dir = self._camera_postion
-            normals = self._model.get_normals_from_face(i)
-            vertices = (
-                Vec3(round(verts[0].x), round(verts[0].y), verts[0].z),
-                Vec3(round(verts[1].x), round(verts[1].y), verts[1].z),
-                Vec3(round(verts[2].x), round(verts[2].y), verts[2].z),
-            )
+        if self._on_pass is not None:
+            self._rasterize_progressive(reuse_visibility)
+            return
+
+        if self._backend == "numpy":
+            self._rasterize_batched(reuse_visibility)
+            return
+
+        stats = self._stats
+        if stats is not None:
+            stats.triangles_submitted = self._model.num_faces()
+            start = time.perf_counter()
+
+        if self._use_hierarchical_z:
+            self._hierarchical_z = HierarchicalZ(self._z_buffer[..., 0])
+        try:
+            self._draw_faces()
+        finally:
+            self._hierarchical_z = None
+
+        if stats is not None:
+            # texture lookups are timed separately by `draw_triangle`
+            elapsed = time.perf_counter() - start
+            stats.add_time("rasterize", elapsed - stats.stage_times.get("texture", 0.0))
+
+    def _draw_faces(self):
+        """
+        Draws the faces of the model one by one, with `draw_triangle`.
+        """
+        stats = self._stats
+        progress = self._progress
+        num_faces = self._model.num_faces()
+        face_attributes = self._get_face_attributes()
+        light_dir = self._get_light_direction()
+        for i in range(num_faces):
+            if progress is not None and i % PROGRESS_INTERVAL == 0:
+                progress(i / num_faces)
+            vertices, uvs, normals = face_attributes[i]
+            if self._is_culled(vertices):
+                if stats is not None:
+                    stats.triangles_culled += 1
+                continue
             self.draw_triangle(
                 vertices, uvs, normals, light_dir,
             )
 
-    def _get_rgb_from_uv(self, uv: tuple) -> tuple:
+    def _is_culled(self, vertices: Sequence[Vec3]) -> bool:
+        """
+        Returns `True` if the screen space triangle `vertices` is entirely outside of the
+        viewport or, when culling back faces, isn't counterclockwise.
+        """
+        p0, p1, p2 = vertices
+        if max(p0.x, p1.x, p2.x) < 0 or min(p0.x, p1.x, p2.x) >= self._width:
+            return True
+        if max(p0.y, p1.y, p2.y) < 0 or min(p0.y, p1.y, p2.y) >= self._height:
+            return True
+        return self._cull_back_faces and not Vec3.is_counterclockwise(p0, p1, p2)
+
+    def _transform_vertices(self) -> np.ndarray:
+        """
+        Returns the (N,3) screen space positions of all vertices of the model (read-only), x and y
+        are rounded to pixel coordinates. They're transformed again only when the model or its
+        transforms change, so frames with other render or lighting modes reuse them.
+        """
+        return self._get_transformed()[0]
+
+    def _transform_normals(self) -> np.ndarray:
+        """
+        Returns the (N,3) normals of the model in camera space (read-only), see
+        `Transform.apply_to_normals`.
+        """
+        return self._get_transformed()[1]
+
+    def _get_transformed(self):
+        model = self._model
+        key = (model, self._transform.version)
+        if self._cache_setup and self._transformed_key == key:
+            return self._transformed
+
+        screen = self._screen_vertices
+        if screen is None or screen.shape != model.vertices.shape:
+            screen = self._screen_vertices = np.empty(model.vertices.shape)
+        self._transform.apply(model.vertices, out=screen)
+        np.round(screen[:, :2], out=screen[:, :2])
+        normals = self._transform.apply_to_normals(model.normals)
+        self._transformed = (_read_only(screen), _read_only(normals))
+        self._transformed_key = key
+        return self._transformed
+
+    def _get_face_setup(self, screen_verts: np.ndarray) -> _FaceSetup:
+        """
+        Returns the `_FaceSetup` of the model, reused until the faces change, see `cache_setup`.
+
+        :param screen_verts:
+            See `_transform_vertices`.
+        """
+        key = self._get_face_setup_key()
+        if not self._cache_setup or self._face_setup_key != key:
+            self._face_setup = _FaceSetup(self, screen_verts)
+            self._face_setup_key = key
+        return self._face_setup
+
+    def _get_face_setup_key(self) -> tuple:
+        return (
+            self._model,
+            self._transform.version,
+            self._width,
+            self._height,
+            self._cull_back_faces,
+        )
+
+    def _get_face_attributes(self) -> list:
+        """
+        Returns the screen space vertices (`Vec3` with integer x and y), uvs and camera space
+        normals of each face, as drawn by the "python" backend, reused until the model or its
+        transforms change, see `cache_setup`.
+        """
+        key = (self._model, self._transform.version)
+        if self._cache_setup and self._face_attributes_key == key:
+            return self._face_attributes
+
+        model = self._model
+        screen_verts = self._transform_vertices().tolist()
+        camera_normals = self._transform_normals().tolist()
+        attributes = []
+        for i, (face, normal_indexes) in enumerate(
+            zip(model.faces.tolist(), model.normal_indexes.tolist())
+        ):
+            vertices = tuple(
+                Vec3(int(screen_verts[v][0]), int(screen_verts[v][1]), screen_verts[v][2])
+                for v in face
+            )
+            uvs = model.get_uvs_from_face(i)
+            normals = [Vec3(*camera_normals[n]) for n in normal_indexes]
+            attributes.append((vertices, uvs, normals))
+        self._face_attributes = attributes
+        self._face_attributes_key = key
+        return attributes
+
+    def _get_visibility_key(self) -> tuple:
+        """
+        Returns everything the visibility resolved by the batched rasterizer depends on, besides
+        the faces (see `_get_face_setup`).
+        """
+        return (
+            self._get_face_setup_key(),
+            tuple(self._get_camera_array()),
+            self._framebuffer,
+            self._depth_format,
+            self._depth_metric,
+        )
+
+    def _can_reuse_visibility(self) -> bool:
+        """
+        Returns `True` if the frame being rendered can shade the visibility resolved by the last
+        one instead of rasterizing the faces again, see `cache_setup`.
+        """
+        if not self._cache_setup or self._visibility_key is None:
+            return False
+        if self._render_mode == RenderingMode.Wireframe:
+            return False
+        if self._backend != "numpy" and self._on_pass is None:
+            return False
+        return self._visibility_key == self._get_visibility_key()
+
+    def _rasterize_batched(self, reuse_visibility=False):
+        """
+        Rasterizes all faces of the model at once, see `tiny_renderer.rasterizer`. With more than
+        one worker the image is split into tiles rendered in parallel, see `tiny_renderer.tiles`.
+        """
+        with self._stage("transform"):
+            screen_verts = self._transform_vertices()
+        with self._stage("setup"):
+            setup = _FrameSetup(self, self._get_face_setup(screen_verts))
+
+        if reuse_visibility:
+            # shaded in this process, the visible face of every pixel is already known
+            buffers = self._get_frame_buffers()
+            if self._progress is None:
+                regions = [(0, 0, self._width - 1, self._height - 1)]
+            else:
+                regions = tiles.tile_regions(self._width, self._height, self._tile_size)
+            for i, region in enumerate(regions):
+                if self._progress is not None:
+                    self._progress(i / len(regions))
+                with self._stage("shade"):
+                    setup.shade(buffers, region)
+            self._record_setup_stats(setup, None)
+            return
+
+        if self._workers > 1:
+            # the texture is only sent to the workers when it changes, not with every frame
+            texture_levels = setup.texture.levels if setup.texture is not None else ()
+            with self._stage("tiles"):
+                counts = self._tiles.render(
+                    setup,
+                    self._tile_size,
+                    self._workers,
+                    shared_arrays=texture_levels,
+                    progress=self._progress,
+                )
+        elif self._progress is not None:
+            # tile by tile, so progress can be reported (and rendering cancelled) in between
+            counts = self._rasterize_tiles(setup)
+        else:
+            buffers = self._get_frame_buffers()
+            region = (0, 0, self._width - 1, self._height - 1)
+            with self._stage("rasterize"):
+                counts = setup.rasterize(buffers, region, setup.faces, setup.boxes)
+            with self._stage("shade"):
+                setup.shade(buffers, region)
+        self._record_setup_stats(setup, counts)
+        self._visibility_key = self._get_visibility_key()
+
+    def _rasterize_progressive(self, reuse_visibility=False):
+        """
+        Rasterizes the passes of `render_progressive`, see `_rasterize_batched`.
+        """
+        with self._stage("transform"):
+            screen_verts = self._transform_vertices()
+        with self._stage("setup"):
+            setup = _FrameSetup(self, self._get_face_setup(screen_verts))
+
+        buffers = self._get_frame_buffers()
+        region = (0, 0, self._width - 1, self._height - 1)
+        steps = self._progressive_steps
+        done = tested = passed = occluded = 0
+        for step, grids in zip(steps, rasterizer.refinement_grids(steps)):
+            for grid in grids:
+                if self._progress is not None:
+                    self._progress(done / (self._width * self._height))
+                if not reuse_visibility:
+                    with self._stage("rasterize"):
+                        counts = setup.rasterize(buffers, region, setup.faces, setup.boxes, grid)
+                    tested += counts[0]
+                    passed += counts[1]
+                    occluded += counts[2]
+                with self._stage("shade"):
+                    setup.shade(buffers, region, grid)
+                rows, cols = rasterizer.grid_slices(region, grid)
+                done += len(range(self._height)[rows]) * len(range(self._width)[cols])
+            self._on_pass(step, self._get_preview(step))
+        if reuse_visibility:
+            self._record_setup_stats(setup, None)
+        else:
+            self._record_setup_stats(setup, (tested, passed, occluded))
+            self._visibility_key = self._get_visibility_key()
+
+    def _get_preview(self, step: int) -> np.ndarray:
+        """
+        Returns a copy of the image where the pixels with coordinates multiple of `step` fill
+        their `step` x `step` block, see `render_progressive`.
+        """
+        image = self._image
+        if step > 1:
+            image = np.repeat(np.repeat(image[::step, ::step], step, axis=0), step, axis=1)
+            image = image[: self._height, : self._width]
+        return np.ascontiguousarray(np.flipud(image))
+
+    def _record_setup_stats(self, setup: _FrameSetup, counts):
+        """
+        :param counts:
+            Pixels tested, passed and triangles occluded, `None` if the visibility of the last
+            frame was reused.
+        """
+        if self._stats is not None:
+            self._stats.triangles_submitted = len(setup.triangles)
+            self._stats.triangles_culled = setup.num_culled
+            self._stats.triangles_degenerated = (
+                len(setup.triangles) - setup.num_culled - len(setup.faces)
+            )
+            if counts is None:
+                self._stats.visibility_reused = True
+                return
+            (
+                self._stats.pixels_tested,
+                self._stats.pixels_passed,
+                self._stats.triangles_occluded,
+            ) = counts
+
+    def _rasterize_tiles(self, setup: _FrameSetup):
         """
-        Returns the RGB color for an (u,v) normalized coordinate for `self._texture_image`
+        Rasterizes and shades `setup` one tile after the other in this process, reporting
+        progress after each tile.
         """
-        u, v = uv
-        height, width = self._texture_image.shape[0], self._texture_image.shape[1]
-        u_index = round(u * width)
-        v_index = round(v * height)
-        # reverse because values are stored as BGR:
-        return tuple(reversed(self._texture_image[v_index][u_index]))
+        buffers = self._get_frame_buffers()
+        regions = tiles.tile_regions(self._width, self._height, self._tile_size)
+        tile_faces = tiles.bin_faces(setup.boxes, self._width, self._height, self._tile_size)
+        tested = passed = occluded = 0
+        for i, (region, faces) in enumerate(zip(regions, tile_faces)):
+            self._progress(i / len(regions))
+            if not len(faces):
+                continue
+            with self._stage("rasterize"):
+                counts = setup.rasterize(buffers, region, setup.faces[faces], setup.boxes[faces])
+            with self._stage("shade"):
+                setup.shade(buffers, region)
+            tested += counts[0]
+            passed += counts[1]
+            occluded += counts[2]
+        return tested, passed, occluded
+
+    def _get_camera_array(self) -> np.ndarray:
+        camera = self._camera_postion
+        return np.array([camera.x, camera.y, camera.z], np.float64)
+
+    def _get_frame_buffers(self) -> rasterizer.FrameBuffers:
+        return self._framebuffer.buffers
+
+    def _get_rgb_from_uv(self, uv: tuple, lod: float = 0.0):
+        """
+        Returns the RGB color for an (u,v) normalized coordinate of the texture, see
+        `TextureSampler`.
+        """
+        sampler = self._texture_sampler
+        if sampler.texture_filter == TextureFilter.Nearest:
+            return sampler.sample_texel(*uv)
+        return sampler.sample(np.array([uv[0]]), np.array([uv[1]]), np.array([lod]))[0]
+
+    def _get_texture_lod(self, vertices: Sequence[Vec3], uvs: Sequence[Vec2]) -> float:
+        """
+        Returns the level of detail used to sample the texture for a triangle, see
+        `TextureSampler.level_of_detail`.
+        """
+        if self._texture_sampler.texture_filter == TextureFilter.Nearest:
+            return 0.0
+        uv_area = Vec3.triangle_area(*uvs)
+        screen_area = Vec3.triangle_area(*vertices)
+        return float(self._texture_sampler.level_of_detail(uv_area, screen_area))
 
     def get_image(self):
-        return np.flipud(self._image)
+        """
+        Returns a view of the image with the first row at the top, it's overwritten by the next
+        frame, see `clear`.
+        """
+        return self._framebuffer.get_image()
 
     def save_image(self, filename):
         """
@@ -203,6 +1254,23 @@ class TinyRenderer:
         """
         Draws a line to `self._image`, from (x0, y0) to (x1, y1) using Bresenham's algorithm
         """
+        if self._use_jit:
+            jit_kernels.draw_line(
+                self._image,
+                self._z_buffer[..., 0],
+                v0.x,
+                v0.y,
+                v0.z,
+                v1.x,
+                v1.y,
+                v1.z,
+                np.array(c0[:3], np.float64),
+                np.array(c1[:3], np.float64),
+                self._get_camera_array(),
+                *self._framebuffer.depth_encoding,
+            )
+            return
+
         if v0 == v1:
             # This is a point, not a line.
             return
@@ -230,10 +1298,14 @@ class TinyRenderer:
         # if a line is horizontal the slope is zero
         # if a line is vertical the slope is undefined
         d_error = abs(dy / dx)
+        depth_encoding = self._framebuffer.depth_encoding
+        screen_z = depth_encoding.screen_z
+        encode_depth = depth_encoding.scale or depth_encoding.float32
         error = 0
         y = v0.y
+        p = Vec3()
         for x in range(v0.x, v1.x + 1):
-            p = Vec3(x, y, 0)
+            p.x, p.y, p.z = x, y, 0
             distance_p_v0 = p.distance_2d(v0)
             distance_v0_v1 = v0.distance_2d(v1)
 
@@ -241,7 +1313,12 @@ class TinyRenderer:
             dz = v0.dz(v1)
             p.z = v0.z + (dz * percentage)
 
-            distance_to_camera = p.distance(self._camera_postion)
+            if screen_z:
+                distance_to_camera = abs(p.z - self._camera_postion.z)
+            else:
+                distance_to_camera = p.distance(self._camera_postion)
+            if encode_depth:
+                distance_to_camera = rasterizer.encode_depth(distance_to_camera, depth_encoding)
 
             # if transposed, de−transpose
             pixel_x, pixel_y = (p.y, p.x) if steep else (p.x, p.y)
@@ -271,67 +1348,165 @@ class TinyRenderer:
     def draw_triangle(
         self,
         vertices: Sequence[Vec3],
-        uvs: Sequence[Vec2],
+        uvs: Optional[Sequence[Vec2]],
         normals: Sequence[Vec2],
         light_direction: Vec3,
     ):
         """
         Draws a triangle into self._image
+
+        :param uvs:
+            `None` for faces without texture coordinates, drawn white in `RenderingMode.Texturized`.
         """
+        if self._backend == "numpy":
+            self._draw_triangle_numpy(vertices, uvs, normals, light_direction)
+            return
+
         p0, p1, p2 = vertices
+        stats = self._stats
         if (p0 in (p1, p2)) or (p1 == p2):
             # triangle is degenerated
+            if stats is not None:
+                stats.triangles_degenerated += 1
             return
 
-        uv0, uv1, uv2 = uvs
         n0, n1, n2 = normals
+        final_color = final_normal = None
+        # faces without texture coordinates aren't texturized
+        texturized = self._render_mode == RenderingMode.Texturized and uvs is not None
+
+        if self._render_mode == RenderingMode.LightOnly or (
+            self._render_mode == RenderingMode.Texturized and not texturized
+        ):
+            final_color = Colors.White
+        elif self._render_mode == RenderingMode.RandomColors:
+            rand = self._random
+            final_color = (rand.randint(0, 255), rand.randint(0, 255), rand.randint(0, 255))
+
+        if Vec3.triangle_area(p0, p1, p2) == 0:
+            # collinear vertices on screen, the color is drawn anyway to keep the random sequence
+            if stats is not None:
+                stats.triangles_degenerated += 1
+            return
 
         if self._light_mode == LightingMode.Flat:
             edge = p2.sub(p0)
             other_edge = p1.sub(p0)
-            final_normal = edge.cross(other_edge).normalized()
+            final_normal = edge.cross(other_edge)
+            final_normal.normalize_inplace()
 
-        if self._render_mode == RenderingMode.LightOnly:
-            final_color = Colors.White
-        elif self._render_mode == RenderingMode.RandomColors:
-            final_color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        # create 4 points representing the bounding box of the triangle, clipped to the image
+        min_x = max(min(p0.x, min(p1.x, p2.x)), 0)
+        max_x = min(max(p0.x, max(p1.x, p2.x)), self._width - 1)
+        min_y = max(min(p0.y, min(p1.y, p2.y)), 0)
+        max_y = min(max(p0.y, max(p1.y, p2.y)), self._height - 1)
+        box = (min_x, min_y, max_x, max_y)
+        if self._hierarchical_z is not None and self._is_occluded(vertices, box):
+            if stats is not None:
+                stats.triangles_occluded += 1
+            return
+
+        texture_lod = self._get_texture_lod(vertices, uvs) if texturized else 0.0
+        # the compiled kernel only samples the nearest texel
+        jit_texture = (
+            not texturized or self._texture_sampler.texture_filter == TextureFilter.Nearest
+        )
+        if (
+            self._use_jit
+            and jit_texture
+            and self._rasterization == RasterizationStrategy.BoundingBox
+        ):
+            tested, passed = jit_kernels.draw_triangle(
+                self._image,
+                self._z_buffer[..., 0],
+                np.array([[p.x, p.y, p.z] for p in vertices], np.float64),
+                np.array([[uv.x, uv.y] for uv in uvs] if texturized else _EMPTY_UVS, np.float64),
+                np.array([[n.x, n.y, n.z] for n in normals], np.float64),
+                np.array([light_direction.x, light_direction.y, light_direction.z], np.float64),
+                self._get_camera_array(),
+                np.array(final_color[:3] if final_color is not None else (0, 0, 0), np.float64),
+                np.array(
+                    [final_normal.x, final_normal.y, final_normal.z]
+                    if final_normal is not None
+                    else (0.0, 0.0, 0.0)
+                ),
+                self._texture_sampler.image if texturized else _EMPTY_TEXTURE,
+                texturized,
+                self._texture_sampler is not None
+                and self._texture_sampler.wrap == TextureWrap.Repeat,
+                self._light_mode == LightingMode.Smooth,
+                np.array(box, np.int64),
+                *self._framebuffer.depth_encoding,
+            )
+            self._count_drawn_pixels(box, tested, passed)
+            return
+
+        if self._rasterization == RasterizationStrategy.EdgeFunction:
+            tested, passed = self._draw_triangle_edge_functions(
+                vertices,
+                uvs,
+                normals,
+                light_direction,
+                final_color,
+                final_normal,
+                box,
+            )
+            self._count_drawn_pixels(box, tested, passed)
+            return
 
-        # create 4 points representing the bounding box of the triangle
-        min_x = min(p0.x, min(p1.x, p2.x))
-        max_x = max(p0.x, max(p1.x, p2.x))
-        min_y = min(p0.y, min(p1.y, p2.y))
-        max_y = max(p0.y, max(p1.y, p2.y))
+        depth_encoding = self._framebuffer.depth_encoding
+        screen_z = depth_encoding.screen_z
+        encode_depth = depth_encoding.scale or depth_encoding.float32
+        # vectors reused for every pixel, instead of allocating new ones
+        p = Vec2()
+        p3d = Vec3()
+        if self._light_mode == LightingMode.Smooth:
+            final_normal = Vec3()
+        if texturized:
+            uv0, uv1, uv2 = uvs
 
+        tested = passed = 0
         for y in range(min_y, max_y + 1):
             for x in range(min_x, max_x + 1):
-                p = Vec2(x, y)
+                p.x, p.y = x, y
 
                 barycentric_weights = Vec2.obtain_barycentric_weights(p, p0, p1, p2)
                 is_part_of_triangle = all(w >= 0 for w in barycentric_weights)
                 if not is_part_of_triangle:
                     continue
 
-                p3d = Vec3(p.x, p.y, round(apply_weights([p0.z, p1.z, p2.z], barycentric_weights)))
-
-                distance_to_camera = p3d.distance(self._camera_postion)
+                tested += 1
+                if screen_z:
+                    z = apply_weights([p0.z, p1.z, p2.z], barycentric_weights)
+                    distance_to_camera = abs(z - self._camera_postion.z)
+                else:
+                    p3d.x, p3d.y = p.x, p.y
+                    p3d.z = round(apply_weights([p0.z, p1.z, p2.z], barycentric_weights))
+                    distance_to_camera = p3d.distance(self._camera_postion)
+                if encode_depth:
+                    distance_to_camera = rasterizer.encode_depth(distance_to_camera, depth_encoding)
                 if distance_to_camera > self._z_buffer[y, x]:
                     # ignore hidden pixel
                     continue
+                passed += 1
                 self._z_buffer[y, x] = distance_to_camera
 
-                if self._render_mode == RenderingMode.Texturized:
+                if texturized:
                     final_uv = (
                         apply_weights([uv0.x, uv1.x, uv2.x], barycentric_weights),
                         apply_weights([uv0.y, uv1.y, uv2.y], barycentric_weights),
                     )
-                    final_color = self._get_rgb_from_uv(final_uv)
+                    if stats is None:
+                        final_color = self._get_rgb_from_uv(final_uv, texture_lod)
+                    else:
+                        start = time.perf_counter()
+                        final_color = self._get_rgb_from_uv(final_uv, texture_lod)
+                        stats.add_time("texture", time.perf_counter() - start)
 
                 if self._light_mode == LightingMode.Smooth:
-                    final_normal = Vec3(
-                        apply_weights([n0.x, n1.x, n2.x], barycentric_weights),
-                        apply_weights([n0.y, n1.y, n2.y], barycentric_weights),
-                        apply_weights([n0.z, n1.z, n2.z], barycentric_weights),
-                    )
+                    final_normal.x = apply_weights([n0.x, n1.x, n2.x], barycentric_weights)
+                    final_normal.y = apply_weights([n0.y, n1.y, n2.y], barycentric_weights)
+                    final_normal.z = apply_weights([n0.z, n1.z, n2.z], barycentric_weights)
 
                 light_intensity = abs(light_direction.dot(final_normal))
                 self.set_pixel(
@@ -344,3 +1519,299 @@ class TinyRenderer:
                         255,
                     ),
                 )
+
+        self._count_drawn_pixels(box, tested, passed)
+
+    def _is_occluded(self, vertices: Sequence[Vec3], box) -> bool:
+        """
+        Returns `True` if the triangle `vertices` can't pass the depth test of any pixel of its
+        clipped bounding `box`, according to `_hierarchical_z`.
+        """
+        min_x, min_y, max_x, max_y = box
+        if min_x > max_x or min_y > max_y:
+            return False
+        p0, p1, p2 = vertices
+        camera = self._camera_postion
+        depth_encoding = self._framebuffer.depth_encoding
+        nearest = nearest_distance(
+            box,
+            min(p0.z, p1.z, p2.z),
+            max(p0.z, p1.z, p2.z),
+            (camera.x, camera.y, camera.z),
+            screen_z=depth_encoding.screen_z,
+        )
+        nearest = rasterizer.encode_depth(nearest, depth_encoding)
+        return nearest > self._hierarchical_z.max_depth(box)
+
+    def _count_drawn_pixels(self, box, tested: int, passed: int):
+        """
+        Adds the pixels of a triangle inside `box` depth tested and passed to the stats and
+        updates `_hierarchical_z`.
+        """
+        stats = self._stats
+        if stats is not None:
+            stats.pixels_tested += tested
+            stats.pixels_passed += passed
+        if passed and self._hierarchical_z is not None:
+            self._hierarchical_z.update(box)
+
+    def _draw_triangle_edge_functions(
+        self,
+        vertices: Sequence[Vec3],
+        uvs: Sequence[Vec2],
+        normals: Sequence[Vec3],
+        light_direction: Vec3,
+        color: Optional[tuple],
+        normal: Optional[Vec3],
+        box: tuple,
+    ):
+        """
+        Scanline version of the pixel loop of `draw_triangle`.
+
+        The numerators of the barycentric weights are edge functions `a * x + b * y + c`, which
+        are stepped by `b` from one row to the next. Each row is intersected with the three
+        half-planes `e >= 0` to find the span of covered pixels, so rows (and pixels) outside
+        of the triangle are never visited. Attributes are evaluated at the start of each span
+        and then advanced by constant per pixel deltas.
+
+        The covered pixels are the same as in `draw_triangle`, but the incremental attributes can
+        differ from `apply_weights` in the last bits, so in rare cases the depth of a pixel may be
+        rounded differently.
+
+        :param color:
+            Color of the triangle, `None` when it's read from the texture.
+        :param normal:
+            Normal of the triangle, `None` when normals are interpolated.
+        :param box:
+            (min_x, min_y, max_x, max_y) bounding box of the triangle clipped to the image.
+        :return:
+            The number of pixels depth tested and passed.
+        """
+        p0, p1, p2 = vertices
+        min_x, min_y, max_x, max_y = box
+        denominator = (p1.y - p2.y) * (p0.x - p2.x) + (p2.x - p1.x) * (p0.y - p2.y)
+        if denominator == 0:
+            return 0, 0
+        # flip the edge functions so the inside of the triangle is always `e >= 0`
+        sign = 1 if denominator > 0 else -1
+        denominator *= sign
+
+        a1, b1 = sign * (p1.y - p2.y), sign * (p2.x - p1.x)
+        a2, b2 = sign * (p2.y - p0.y), sign * (p0.x - p2.x)
+        a3, b3 = -a1 - a2, -b1 - b2
+        # value of the edge functions at (min_x, min_y)
+        e1 = a1 * (min_x - p2.x) + b1 * (min_y - p2.y)
+        e2 = a2 * (min_x - p2.x) + b2 * (min_y - p2.y)
+        e3 = denominator - e1 - e2
+
+        def interpolate(values, w1, w2, w3):
+            return values[0] * w1 + values[1] * w2 + values[2] * w3
+
+        # per pixel deltas of the weights and of the attributes
+        dw1, dw2, dw3 = a1 / denominator, a2 / denominator, a3 / denominator
+        depths = (p0.z, p1.z, p2.z)
+        dz = interpolate(depths, dw1, dw2, dw3)
+        texturized = color is None
+        if texturized:
+            us, vs = (uvs[0].x, uvs[1].x, uvs[2].x), (uvs[0].y, uvs[1].y, uvs[2].y)
+            du, dv = interpolate(us, dw1, dw2, dw3), interpolate(vs, dw1, dw2, dw3)
+            texture_lod = self._get_texture_lod(vertices, uvs)
+        smooth = self._light_mode == LightingMode.Smooth
+        if smooth:
+            nxs = (normals[0].x, normals[1].x, normals[2].x)
+            nys = (normals[0].y, normals[1].y, normals[2].y)
+            nzs = (normals[0].z, normals[1].z, normals[2].z)
+            dnx = interpolate(nxs, dw1, dw2, dw3)
+            dny = interpolate(nys, dw1, dw2, dw3)
+            dnz = interpolate(nzs, dw1, dw2, dw3)
+        else:
+            light_intensity = abs(light_direction.dot(normal))
+
+        camera = self._camera_postion
+        z_buffer = self._z_buffer
+        depth_encoding = self._framebuffer.depth_encoding
+        screen_z = depth_encoding.screen_z
+        encode_depth = depth_encoding.scale or depth_encoding.float32
+        tested = passed = 0
+        for y in range(min_y, max_y + 1):
+            row_e1, row_e2, row_e3 = e1, e2, e3
+            e1, e2, e3 = e1 + b1, e2 + b2, e3 + b3
+            # span of the row where all edge functions are non negative
+            start, end = 0, max_x - min_x
+            for a, e in ((a1, row_e1), (a2, row_e2), (a3, row_e3)):
+                if a > 0:
+                    start = max(start, -(e // a))
+                elif a < 0:
+                    end = min(end, e // -a)
+                elif e < 0:
+                    end = -1
+            # pixels exactly on the third edge are rejected by `draw_triangle` when
+            # `1 - w1 - w2` rounds to a negative number, do the same to cover the same pixels
+            if a3 > 0 and start <= end and row_e3 + a3 * start == 0:
+                start += self._is_rounded_outside(row_e1, row_e2, a1, a2, start, denominator)
+            elif a3 < 0 and start <= end and row_e3 + a3 * end == 0:
+                end -= self._is_rounded_outside(row_e1, row_e2, a1, a2, end, denominator)
+            if start > end:
+                continue
+            skipped = ()
+            if a3 == 0 and row_e3 == 0:
+                skipped = {
+                    i
+                    for i in range(start, end + 1)
+                    if self._is_rounded_outside(row_e1, row_e2, a1, a2, i, denominator)
+                }
+
+            w1 = (row_e1 + a1 * start) / denominator
+            w2 = (row_e2 + a2 * start) / denominator
+            w3 = 1 - w1 - w2
+            z = interpolate(depths, w1, w2, w3)
+            if texturized:
+                u, v = interpolate(us, w1, w2, w3), interpolate(vs, w1, w2, w3)
+            if smooth:
+                nx = interpolate(nxs, w1, w2, w3)
+                ny = interpolate(nys, w1, w2, w3)
+                nz = interpolate(nzs, w1, w2, w3)
+
+            dy = y - camera.y
+            for x in range(min_x + start, min_x + end + 1):
+                if skipped and x - min_x in skipped:
+                    z += dz
+                    if texturized:
+                        u, v = u + du, v + dv
+                    if smooth:
+                        nx, ny, nz = nx + dnx, ny + dny, nz + dnz
+                    continue
+                tested += 1
+                if screen_z:
+                    distance_to_camera = abs(z - camera.z)
+                else:
+                    dx, dz_camera = x - camera.x, round(z) - camera.z
+                    distance_to_camera = sqrt(dx * dx + dy * dy + dz_camera * dz_camera)
+                if encode_depth:
+                    distance_to_camera = rasterizer.encode_depth(distance_to_camera, depth_encoding)
+                if distance_to_camera <= z_buffer[y, x]:
+                    passed += 1
+                    z_buffer[y, x] = distance_to_camera
+                    if texturized:
+                        color = self._get_rgb_from_uv((u, v), texture_lod)
+                    if smooth:
+                        light_intensity = abs(
+                            light_direction.x * nx + light_direction.y * ny + light_direction.z * nz
+                        )
+                    self.set_pixel(
+                        x,
+                        y,
+                        Color(
+                            color[0] * light_intensity,
+                            color[1] * light_intensity,
+                            color[2] * light_intensity,
+                            255,
+                        ),
+                    )
+
+                z += dz
+                if texturized:
+                    u, v = u + du, v + dv
+                if smooth:
+                    nx, ny, nz = nx + dnx, ny + dny, nz + dnz
+        return tested, passed
+
+    @classmethod
+    def _is_rounded_outside(cls, e1, e2, a1, a2, offset, denominator) -> bool:
+        w1 = (e1 + a1 * offset) / denominator
+        w2 = (e2 + a2 * offset) / denominator
+        return 1 - w1 - w2 < 0
+
+    def _draw_triangle_numpy(
+        self,
+        vertices: Sequence[Vec3],
+        uvs: Sequence[Vec2],
+        normals: Sequence[Vec3],
+        light_direction: Vec3,
+    ):
+        """
+        Same as `draw_triangle`, but the barycentric weights, coverage, depth, uvs and normals
+        are computed for the whole bounding box at once. Operations are done in the same order
+        as in `math_utils` so both backends produce the exact same pixels.
+        """
+        p0, p1, p2 = vertices
+        stats = self._stats
+        if (p0 in (p1, p2)) or (p1 == p2):
+            # triangle is degenerated
+            if stats is not None:
+                stats.triangles_degenerated += 1
+            return
+
+        # faces without texture coordinates aren't texturized
+        texturized = self._render_mode == RenderingMode.Texturized and uvs is not None
+        if self._render_mode == RenderingMode.LightOnly or (
+            self._render_mode == RenderingMode.Texturized and not texturized
+        ):
+            final_color = Colors.White
+        elif self._render_mode == RenderingMode.RandomColors:
+            rand = self._random
+            final_color = (rand.randint(0, 255), rand.randint(0, 255), rand.randint(0, 255))
+
+        denominator = (p1.y - p2.y) * (p0.x - p2.x) + (p2.x - p1.x) * (p0.y - p2.y)
+        if denominator == 0:
+            if stats is not None:
+                stats.triangles_degenerated += 1
+            return
+
+        if self._light_mode == LightingMode.Flat:
+            edge = p2.sub(p0)
+            other_edge = p1.sub(p0)
+            final_normal = edge.cross(other_edge).normalized()
+
+        # clip the bounding box to the image, pixels outside of it can't be drawn anyway
+        min_x = max(min(p0.x, p1.x, p2.x), 0)
+        max_x = min(max(p0.x, p1.x, p2.x), self._width - 1)
+        min_y = max(min(p0.y, p1.y, p2.y), 0)
+        max_y = min(max(p0.y, p1.y, p2.y), self._height - 1)
+        if min_x > max_x or min_y > max_y:
+            return
+
+        y, x = np.mgrid[min_y : max_y + 1, min_x : max_x + 1]
+        v0, v1, v2 = (np.array([p.x, p.y]) for p in vertices)
+        w1, w2, w3 = batch_math.barycentric_weights((x, y), v0, v1, v2)
+        inside = (w1 >= 0) & (w2 >= 0) & (w3 >= 0)
+
+        x, y, w1, w2, w3 = x[inside], y[inside], w1[inside], w2[inside], w3[inside]
+        z = p0.z * w1 + p1.z * w2 + p2.z * w3
+        distance_to_camera = rasterizer.camera_depth(
+            x, y, z, self._get_camera_array(), self._framebuffer.depth_encoding
+        )
+        visible = distance_to_camera <= self._z_buffer[y, x, 0]
+        if stats is not None:
+            stats.pixels_tested += len(visible)
+            stats.pixels_passed += int(np.count_nonzero(visible))
+        if not visible.any():
+            return
+
+        x, y, w1, w2, w3 = x[visible], y[visible], w1[visible], w2[visible], w3[visible]
+        self._z_buffer[y, x, 0] = distance_to_camera[visible]
+
+        if texturized:
+            uv0, uv1, uv2 = uvs
+            u = uv0.x * w1 + uv1.x * w2 + uv2.x * w3
+            v = uv0.y * w1 + uv1.y * w2 + uv2.y * w3
+            lod = np.full(len(u), self._get_texture_lod(vertices, uvs))
+            color = self._texture_sampler.sample(u, v, lod)
+        else:
+            color = np.array(final_color[:3])
+
+        if self._light_mode == LightingMode.Smooth:
+            n0, n1, n2 = normals
+            normal_x = n0.x * w1 + n1.x * w2 + n2.x * w3
+            normal_y = n0.y * w1 + n1.y * w2 + n2.y * w3
+            normal_z = n0.z * w1 + n1.z * w2 + n2.z * w3
+        else:
+            normal_x, normal_y, normal_z = final_normal.x, final_normal.y, final_normal.z
+
+        light_intensity = np.abs(
+            light_direction.x * normal_x
+            + light_direction.y * normal_y
+            + light_direction.z * normal_z
+        )
+        light_intensity = np.broadcast_to(light_intensity, x.shape)
+        self._image[y, x] = color * light_intensity[:, np.newaxis]
@@ -1,9 +1,12 @@
-import time
-
 import imgui
 
 from scene import Scene
-from tiny_renderer.tiny_renderer import LightingMode, RenderingMode, TinyRenderer
+from tiny_renderer.background_renderer import BackgroundRenderer
+from tiny_renderer.bitmap import Bitmap
+from tiny_renderer.framebuffer import DepthFormat, DepthMetric
+from tiny_renderer.texture_sampler import TextureFilter, TextureWrap
+from tiny_renderer.tiny_renderer import (
+    LightingMode, RasterizationStrategy, RenderingMode, TinyRenderer)
 
 
 class TinyRendererEditor(Scene):
@@ -14,24 +17,93 @@ class TinyRendererEditor(Scene):
         self._light_mode_captions = LightingMode.get_captions()
         self._light_mode = LightingMode.Flat
 
-        self._renderer = TinyRenderer()
-        self._renderer.setup_model(
-            "../resources/african_head.obj", "../resources/african_head_diffuse.jpg"
+        self._rasterization_captions = RasterizationStrategy.get_captions()
+        self._rasterization = RasterizationStrategy.BoundingBox
+
+        self._texture_filter_captions = TextureFilter.get_captions()
+        self._texture_filter = TextureFilter.Nearest
+
+        self._texture_wrap_captions = TextureWrap.get_captions()
+        self._texture_wrap = TextureWrap.Clamp
+
+        self._depth_format_captions = DepthFormat.get_captions()
+        self._depth_format = DepthFormat.Float64
+
+        self._depth_metric_captions = DepthMetric.get_captions()
+        self._depth_metric = DepthMetric.Distance
+
+        self._cull_back_faces = False
+        self._hierarchical_z = False
+        # show coarse previews while rendering, see `TinyRenderer.render_progressive`
+        self._progressive = True
+
+        # switching modes only shades the image again, see `TinyRenderer.cache_setup`
+        renderer = TinyRenderer(bind_texture=False, cache_setup=True)
+        renderer.setup_model(
+            "../resources/african_head.obj",
+            "../resources/african_head_diffuse.jpg",
+            use_mesh_cache=True,
         )
+        # frames are rendered on a worker thread, only uploading them happens in `update`
+        self._background = BackgroundRenderer(renderer)
+        self._bitmap = Bitmap(renderer.get_image())
+        self._has_image = False
+        # settings of the last requested frame
+        self._requested_settings = None
         self._time_to_render = 0
+        self._stats = None
+
+    def _get_settings(self):
+        return (
+            self._render_mode,
+            self._light_mode,
+            self._rasterization,
+            self._texture_filter,
+            self._texture_wrap,
+            self._depth_format,
+            self._depth_metric,
+            self._cull_back_faces,
+            self._hierarchical_z,
+            self._progressive,
+        )
 
     def on_click_render(self):
-        self._renderer.render(self._render_mode, self._light_mode)
+        """
+        Requests a frame with the current settings, superseding the one being rendered.
+        """
+        settings = self._get_settings()
+        rasterization, texture_filter, texture_wrap, depth_format, depth_metric = settings[2:7]
+        cull_back_faces, hierarchical_z, progressive = settings[7:10]
 
-    def update(self):
-        bitmap = self._renderer.bitmap
-        if bitmap is None:
-            return
+        def configure(renderer):
+            renderer.set_rasterization_strategy(rasterization)
+            renderer.set_texture_sampling(texture_filter, texture_wrap)
+            if renderer.depth_format != depth_format:
+                renderer.set_depth_format(depth_format)
+            renderer.set_depth_metric(depth_metric)
+            renderer.cull_back_faces = cull_back_faces
+            renderer.hierarchical_z = hierarchical_z
+
+        self._requested_settings = settings
+        self._background.submit(
+            self._render_mode, self._light_mode, configure, progressive=progressive
+        )
 
-        imgui.begin("Tiny Renderer")
+    def update(self):
+        result = self._background.take_result()
+        if result is not None:
+            self._bitmap.bind_texture(pixels=result.image)
+            self._has_image = True
+            if result.stats is not None:
+                self._time_to_render = result.elapsed
+                self._stats = result.stats
 
-        imgui.image(bitmap.get_texture_id(), bitmap.get_width(), bitmap.get_height())
-        imgui.end()
+        if self._has_image:
+            imgui.begin("Tiny Renderer")
+            bitmap = self._bitmap
+            uv0, uv1 = bitmap.get_uvs()
+            imgui.image(bitmap.get_texture_id(), bitmap.get_width(), bitmap.get_height(), uv0, uv1)
+            imgui.end()
 
         imgui.begin("Rendering")
         _, self._render_mode = imgui.combo(
@@ -40,14 +112,49 @@ class TinyRendererEditor(Scene):
         _, self._light_mode = imgui.combo(
             "Lighting Mode", self._light_mode, self._light_mode_captions
         )
+        _, self._rasterization = imgui.combo(
+            "Rasterization", self._rasterization, self._rasterization_captions
+        )
+        _, self._texture_filter = imgui.combo(
+            "Texture Filter", self._texture_filter, self._texture_filter_captions
+        )
+        _, self._texture_wrap = imgui.combo(
+            "Texture Wrap", self._texture_wrap, self._texture_wrap_captions
+        )
+        _, self._depth_format = imgui.combo(
+            "Depth Format", self._depth_format, self._depth_format_captions
+        )
+        _, self._depth_metric = imgui.combo(
+            "Depth Metric", self._depth_metric, self._depth_metric_captions
+        )
+        _, self._cull_back_faces = imgui.checkbox("Cull back faces", self._cull_back_faces)
+        _, self._hierarchical_z = imgui.checkbox("Hierarchical Z", self._hierarchical_z)
+        _, self._progressive = imgui.checkbox("Progressive preview", self._progressive)
+
+        # changing the settings while rendering supersedes the frame being rendered
+        if self._background.busy and self._get_settings() != self._requested_settings:
+            self.on_click_render()
 
         imgui.separator()
         if imgui.button("Render"):
-            t = time.time()
             self.on_click_render()
-            self._time_to_render = time.time() - t
+        progress = self._background.progress
+        if progress is not None:
+            imgui.same_line()
+            if imgui.button("Cancel"):
+                self._background.cancel()
+            imgui.progress_bar(progress, (0, 0), f"{progress:.0%}")
 
         imgui.label_text("", f"Time to render: {self._time_to_render: .2f}s")
+        error = self._background.error
+        if error is not None:
+            imgui.text(f"Rendering failed: {error!r}")
         imgui.separator()
 
+        stats = self._stats
+        if stats is not None:
+            for line in str(stats).splitlines():
+                imgui.text(line)
+            imgui.separator()
+
         imgui.end()
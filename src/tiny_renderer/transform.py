@@ -0,0 +1,213 @@
+"""
+Transform stage of `TinyRenderer`: model, view, projection and viewport transforms of the vertices
+of a model, applied to all of them at once.
+
+Positions are (N,4) homogeneous coordinates multiplied by the model-view-projection matrix,
+divided by w and mapped to the viewport:
+
+    screen = (ndc + 1) * viewport_size
+
+so normalized device coordinates from -1 to 1 cover `2 * viewport_size` pixels (x and y) and
+depth units (z). With identity matrices (the default) this is the scaling `TinyRenderer` always
+did. Screen space is left-handed: x goes right, y up and z away from the camera, which looks along
++z (see `TinyRenderer.set_camera_position`).
+"""
+from math import cos, sin
+from typing import Optional, Sequence
+
+import numpy as np
+
+from tiny_renderer.model import _read_only
+
+
+def translation(x: float, y: float, z: float) -> np.ndarray:
+    """
+    Returns the (4,4) matrix moving points by (x, y, z).
+    """
+    matrix = np.eye(4)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+def scaling(x: float, y: float, z: float) -> np.ndarray:
+    """
+    Returns the (4,4) matrix scaling each axis.
+    """
+    return np.diag([x, y, z, 1.0])
+
+
+def rotation(angle: float, axis: Sequence[float] = (0.0, 1.0, 0.0)) -> np.ndarray:
+    """
+    Returns the (4,4) matrix rotating `angle` radians around `axis`, the vertical axis by
+    default.
+    """
+    x, y, z = np.asarray(axis, np.float64) / np.linalg.norm(axis)
+    c, s = cos(angle), sin(angle)
+    t = 1.0 - c
+    matrix = np.eye(4)
+    matrix[:3, :3] = [
+        [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+        [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+        [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+    ]
+    return matrix
+
+
+def look_at(
+    eye: Sequence[float],
+    target: Sequence[float] = (0.0, 0.0, 0.0),
+    up: Sequence[float] = (0.0, 1.0, 0.0),
+) -> np.ndarray:
+    """
+    Returns the view matrix of a camera at `eye` looking at `target`: it rotates the scene around
+    `target` so the camera looks along +z with `up` pointing up, and moves `target` to the origin,
+    like the original Tiny Renderer. The distance from `eye` to `target` is used by `perspective`.
+    """
+    eye, target, up = (np.asarray(v, np.float64) for v in (eye, target, up))
+    forward = target - eye
+    forward /= np.linalg.norm(forward)
+    right = np.cross(up, forward)
+    right /= np.linalg.norm(right)
+    matrix = np.eye(4)
+    matrix[:3, :3] = [right, np.cross(forward, right), forward]
+    matrix[:3, 3] = -matrix[:3, :3] @ target
+    return matrix
+
+
+def perspective(distance: float) -> np.ndarray:
+    """
+    Returns the projection matrix of a camera at `distance` from the origin, on the -z side:
+    points are divided by w = 1 + z / distance, so farther points get closer to the center.
+    Vertices must be in front of the camera (z > -distance), triangles aren't clipped.
+    """
+    matrix = np.eye(4)
+    matrix[3, 2] = 1.0 / distance
+    return matrix
+
+
+class Transform:
+    """
+    Model, view, projection and viewport transforms. The product of the matrices is computed
+    once, when first needed after a change, and `version` changes every time any transform
+    changes, so transformed vertices can be cached until then.
+    """
+
+    def __init__(self):
+        self._model = np.eye(4)
+        self._view = np.eye(4)
+        self._projection = np.eye(4)
+        self._viewport_size = np.ones(3)
+        self._model_view_projection = None
+        # (N,4) homogeneous coordinates of the last transformed vertices, reused for models with
+        # the same number of vertices
+        self._homogeneous = None
+        self.version = 0
+
+    @property
+    def model(self) -> np.ndarray:
+        """
+        (4,4) matrix from model space to world space.
+        """
+        return _read_only(self._model)
+
+    @model.setter
+    def model(self, matrix: np.ndarray):
+        self._model = self._set_matrix(self._model, matrix)
+
+    @property
+    def view(self) -> np.ndarray:
+        """
+        (4,4) matrix from world space to camera space, see `look_at`.
+        """
+        return _read_only(self._view)
+
+    @view.setter
+    def view(self, matrix: np.ndarray):
+        self._view = self._set_matrix(self._view, matrix)
+
+    @property
+    def projection(self) -> np.ndarray:
+        """
+        (4,4) matrix from camera space to clip space, see `perspective`.
+        """
+        return _read_only(self._projection)
+
+    @projection.setter
+    def projection(self, matrix: np.ndarray):
+        self._projection = self._set_matrix(self._projection, matrix)
+
+    @property
+    def viewport_size(self) -> np.ndarray:
+        """
+        (3,) half of the size of the screen space box normalized device coordinates are mapped
+        to, see the module docstring.
+        """
+        return _read_only(self._viewport_size)
+
+    def set_viewport(self, width: float, height: float, depth: float):
+        """
+        Sets `viewport_size`, `TinyRenderer` uses its resolution times its scale.
+        """
+        viewport_size = np.array([width, height, depth], np.float64)
+        if not np.array_equal(viewport_size, self._viewport_size):
+            self._viewport_size = viewport_size
+            self.version += 1
+
+    def _set_matrix(self, current: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.array(matrix, np.float64)
+        if matrix.shape != (4, 4):
+            raise ValueError(f"Expected a (4,4) matrix, got {matrix.shape}")
+        if not np.array_equal(matrix, current):
+            self._model_view_projection = None
+            self.version += 1
+        return matrix
+
+    @property
+    def model_view_projection(self) -> np.ndarray:
+        if self._model_view_projection is None:
+            self._model_view_projection = _read_only(self._projection @ self._view @ self._model)
+        return self._model_view_projection
+
+    @property
+    def normal_matrix(self) -> Optional[np.ndarray]:
+        """
+        (3,3) matrix transforming normals to camera space (the inverse transpose of the
+        model-view matrix), `None` if normals don't change.
+        """
+        model_view = (self._view @ self._model)[:3, :3]
+        if np.array_equal(model_view, np.eye(3)):
+            return None
+        return np.linalg.inv(model_view).T
+
+    def apply(self, vertices: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the (N,3) screen space positions of (N,3) model space `vertices`, into `out` if
+        given.
+        """
+        homogeneous = self._homogeneous
+        if homogeneous is None or len(homogeneous) != len(vertices):
+            homogeneous = self._homogeneous = np.ones((len(vertices), 4))
+        homogeneous[:, :3] = vertices
+        clip = homogeneous @ self.model_view_projection.T
+        if out is None:
+            out = np.empty((len(vertices), 3))
+        if np.array_equal(self.model_view_projection[3], (0.0, 0.0, 0.0, 1.0)):
+            # affine transforms (no perspective) keep w = 1
+            out[:] = clip[:, :3]
+        else:
+            np.divide(clip[:, :3], clip[:, 3:], out=out)
+        out += 1.0
+        out *= self._viewport_size
+        return out
+
+    def apply_to_normals(self, normals: np.ndarray) -> np.ndarray:
+        """
+        Returns (N,3) model space unitary `normals` in camera space, `normals` themselves if the
+        model and view matrices don't change them (see `normal_matrix`).
+        """
+        normal_matrix = self.normal_matrix
+        if normal_matrix is None:
+            return normals
+        result = normals @ normal_matrix.T
+        result /= np.linalg.norm(result, axis=1, keepdims=True)
+        return result